@@ -14,6 +14,8 @@ from app.db.session import Base
 from app.models.user import User
 from app.models.token import RefreshToken
 from app.models.analysis import Analysis_Requirement, Analysis_Result
+from app.models.blob import Content_Blob
+from app.models.idempotency import Idempotency_Key
 
 # Alembic Config object
 config = context.config
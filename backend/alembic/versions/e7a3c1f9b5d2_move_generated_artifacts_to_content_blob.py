@@ -0,0 +1,185 @@
+"""move generated artifacts to content blob
+
+Revision ID: e7a3c1f9b5d2
+Revises: d2b6e8f1a4c9
+Create Date: 2026-10-19 18:04:37.226915
+
+"""
+import hashlib
+import json
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+import zstandard
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e7a3c1f9b5d2'
+down_revision: Union[str, Sequence[str], None] = 'd2b6e8f1a4c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, column, is_json) for every artifact moved out of line
+ARTIFACTS = [
+    ('Analysis_Result', 'graph_suggestions', True),
+    ('Analysis_Result', 'dashboard_code', False),
+    ('Analysis_Dashboard', 'dashboard_code', False),
+]
+BATCH = 500
+# names the foreign keys below; batch mode on SQLite needs it to find them again on downgrade
+NAMING = {'fk': 'fk_%(table_name)s_%(column_0_name)s'}
+
+content_blob = sa.table(
+    'Content_Blob',
+    sa.column('sha256', sa.String),
+    sa.column('codec', sa.String),
+    sa.column('media_type', sa.String),
+    sa.column('size', sa.Integer),
+    sa.column('data', sa.LargeBinary),
+    sa.column('created_at', sa.DateTime(timezone=True)),
+)
+
+
+def _blob_row(value, is_json: bool) -> dict:
+    # same encoding as Content_Blob.from_text / from_json at this revision
+    if is_json:
+        raw = json.dumps(value, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    else:
+        raw = value.encode('utf-8')
+    compress = len(raw) >= 256
+    return {
+        'sha256': hashlib.sha256(raw).hexdigest(),
+        'codec': 'zstd' if compress else 'raw',
+        'media_type': 'application/json' if is_json else 'text/plain',
+        'size': len(raw),
+        'data': zstandard.ZstdCompressor(level=3).compress(raw) if compress else raw,
+        'created_at': datetime.now(timezone.utc),
+    }
+
+
+def _blob_value(codec: str, data: bytes, size: int, is_json: bool):
+    raw = zstandard.ZstdDecompressor().decompress(data, max_output_size=size) if codec == 'zstd' else bytes(data)
+    return json.loads(raw) if is_json else raw.decode('utf-8')
+
+
+def _backfill(bind) -> None:
+    """Copy inline artifacts into Content_Blob (once per distinct content) and link them."""
+    stored: set[str] = set()
+    for table_name, column, is_json in ARTIFACTS:
+        table = sa.table(
+            table_name,
+            sa.column('id', sa.Integer),
+            sa.column(column, sa.JSON if is_json else sa.String),
+            sa.column(f'{column}_sha', sa.String),
+        )
+        last_id = 0
+        while True:
+            rows = bind.execute(
+                sa.select(table.c.id, table.c[column])
+                .where(table.c.id > last_id, table.c[column].isnot(None))
+                .order_by(table.c.id)
+                .limit(BATCH)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+
+            links, new_blobs = [], {}
+            for row_id, value in rows:
+                if is_json and value is None:
+                    continue  # JSON null
+                blob = _blob_row(value, is_json)
+                if blob['sha256'] not in stored:
+                    new_blobs[blob['sha256']] = blob
+                links.append({'row_id': row_id, 'sha': blob['sha256']})
+            if new_blobs:
+                bind.execute(content_blob.insert(), list(new_blobs.values()))
+                stored.update(new_blobs)
+            if links:
+                bind.execute(
+                    table.update().where(table.c.id == sa.bindparam('row_id')).values({f'{column}_sha': sa.bindparam('sha')}),
+                    links,
+                )
+
+
+def _restore(bind) -> None:
+    for table_name, column, is_json in ARTIFACTS:
+        table = sa.table(
+            table_name,
+            sa.column('id', sa.Integer),
+            sa.column(column, sa.JSON if is_json else sa.String),
+            sa.column(f'{column}_sha', sa.String),
+        )
+        last_id = 0
+        while True:
+            rows = bind.execute(
+                sa.select(table.c.id, content_blob.c.codec, content_blob.c.data, content_blob.c.size)
+                .join(content_blob, content_blob.c.sha256 == table.c[f'{column}_sha'])
+                .where(table.c.id > last_id)
+                .order_by(table.c.id)
+                .limit(BATCH)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            bind.execute(
+                table.update().where(table.c.id == sa.bindparam('row_id')).values({column: sa.bindparam('value')}),
+                [{'row_id': row_id, 'value': _blob_value(codec, data, size, is_json)} for row_id, codec, data, size in rows],
+            )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### commands auto generated by Alembic - please adjust! ###
+    op.create_table('Content_Blob',
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('codec', sa.String(length=16), nullable=False),
+    sa.Column('media_type', sa.String(length=64), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('sha256')
+    )
+    with op.batch_alter_table('Analysis_Result') as batch_op:
+        batch_op.add_column(sa.Column('graph_suggestions_sha', sa.String(length=64), nullable=True))
+        batch_op.add_column(sa.Column('dashboard_code_sha', sa.String(length=64), nullable=True))
+        batch_op.create_foreign_key('fk_Analysis_Result_graph_suggestions_sha', 'Content_Blob', ['graph_suggestions_sha'], ['sha256'])
+        batch_op.create_foreign_key('fk_Analysis_Result_dashboard_code_sha', 'Content_Blob', ['dashboard_code_sha'], ['sha256'])
+    with op.batch_alter_table('Analysis_Dashboard') as batch_op:
+        batch_op.add_column(sa.Column('dashboard_code_sha', sa.String(length=64), nullable=True))
+        batch_op.create_foreign_key('fk_Analysis_Dashboard_dashboard_code_sha', 'Content_Blob', ['dashboard_code_sha'], ['sha256'])
+    # ### end Alembic commands ###
+
+    _backfill(op.get_bind())
+
+    with op.batch_alter_table('Analysis_Result') as batch_op:
+        batch_op.drop_column('graph_suggestions')
+        batch_op.drop_column('dashboard_code')
+    with op.batch_alter_table('Analysis_Dashboard') as batch_op:
+        batch_op.drop_column('dashboard_code')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('Analysis_Result') as batch_op:
+        batch_op.add_column(sa.Column('graph_suggestions', sa.JSON(), nullable=True))
+        batch_op.add_column(sa.Column('dashboard_code', sa.String(), nullable=True))
+    with op.batch_alter_table('Analysis_Dashboard') as batch_op:
+        batch_op.add_column(sa.Column('dashboard_code', sa.String(), nullable=True))
+
+    _restore(op.get_bind())
+
+    # ### commands auto generated by Alembic - please adjust! ###
+    with op.batch_alter_table('Analysis_Dashboard', naming_convention=NAMING) as batch_op:
+        batch_op.drop_constraint('fk_Analysis_Dashboard_dashboard_code_sha', type_='foreignkey')
+        batch_op.drop_column('dashboard_code_sha')
+    with op.batch_alter_table('Analysis_Result', naming_convention=NAMING) as batch_op:
+        batch_op.drop_constraint('fk_Analysis_Result_dashboard_code_sha', type_='foreignkey')
+        batch_op.drop_constraint('fk_Analysis_Result_graph_suggestions_sha', type_='foreignkey')
+        batch_op.drop_column('dashboard_code_sha')
+        batch_op.drop_column('graph_suggestions_sha')
+    op.drop_table('Content_Blob')
+    # ### end Alembic commands ###
@@ -0,0 +1,80 @@
+# Process-local caches for the authentication hot path
+#
+# Every authenticated request decodes its JWT and resolves the user. Both
+# results are cached here so steady-state traffic (dataset polls, history
+# pages) does no crypto and no User query:
+#   - tokens: raw access token -> decoded payload. Expiry is still checked on
+#     every hit, so a cached token never outlives its "exp".
+#   - users: user id -> CachedUser snapshot, for AUTH_USER_CACHE_TTL_SECONDS.
+#     That TTL is how long a deactivation can take to apply in another worker
+#     process. ORM updates/deletes of a User drop it from this process at once.
+#     Bulk UPDATE statements bypass the ORM events; call invalidate_user.
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from sqlalchemy import event
+
+from app.core.config import settings
+from app.core.security import decode_jwt
+from app.models.user import User
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: int
+    email: str
+    is_active: bool
+
+    @classmethod
+    def of(cls, user: User) -> "CachedUser":
+        return cls(id=user.id, email=user.email, is_active=user.is_active)
+
+
+_tokens: TTLCache = TTLCache(maxsize=settings.AUTH_CACHE_MAXSIZE, ttl=settings.AUTH_TOKEN_CACHE_TTL_SECONDS)
+_users: TTLCache = TTLCache(maxsize=settings.AUTH_CACHE_MAXSIZE, ttl=settings.AUTH_USER_CACHE_TTL_SECONDS)
+
+
+def decode_jwt_cached(token: str) -> Optional[dict[str, Any]]:
+    """decode_jwt with the signature check memoized; invalid tokens are never cached."""
+    if not settings.AUTH_CACHE_ENABLED:
+        return decode_jwt(token)
+    payload = _tokens.get(token)
+    if payload is None:
+        payload = decode_jwt(token)
+        if payload is None:
+            return None
+        _tokens[token] = payload
+    elif payload.get("exp", 0) <= time.time():
+        _tokens.pop(token, None)
+        return None
+    return payload
+
+
+def get_user(user_id: int) -> CachedUser | None:
+    if not settings.AUTH_CACHE_ENABLED:
+        return None
+    return _users.get(user_id)
+
+
+def put_user(user: User) -> CachedUser:
+    cached = CachedUser.of(user)
+    if settings.AUTH_CACHE_ENABLED:
+        _users[cached.id] = cached
+    return cached
+
+
+def invalidate_user(user_id: int) -> None:
+    _users.pop(user_id, None)
+
+
+def clear() -> None:
+    _tokens.clear()
+    _users.clear()
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _on_user_change(mapper, connection, target: User) -> None:
+    invalidate_user(target.id)
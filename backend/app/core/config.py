@@ -8,18 +8,89 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str
+    DB_POOL_SIZE: int = 5  # connections kept open
+    DB_MAX_OVERFLOW: int = 10  # extra connections opened under load, closed when returned
+    DB_POOL_TIMEOUT: float = 30  # seconds to wait for a free connection before failing the request
+    DB_POOL_PRE_PING: bool = True  # test connections on checkout; survives database restarts
+    DB_POOL_RECYCLE: int = 1800  # seconds; replace connections before server/proxy idle timeouts
+    DB_STATEMENT_CACHE_SIZE: int = 100  # asyncpg prepared statements per connection, 0 for pgbouncer
 
     # JWT
     JWT_SECRET_KEY: str
     JWT_ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    TOKEN_PURGE_INTERVAL_SECONDS: float = 3600  # how often expired/revoked refresh tokens are deleted; 0 disables
+    TOKEN_PURGE_BATCH_SIZE: int = 1000  # rows per DELETE, each in its own transaction
+    BLOB_PURGE_INTERVAL_SECONDS: float = 3600  # how often unreferenced Content_Blob rows are deleted; 0 disables
+    BLOB_PURGE_BATCH_SIZE: int = 500
+    BLOB_PURGE_GRACE_SECONDS: float = 3600  # unreferenced blobs put more recently than this are kept
+
+    # Auth caches (see app.core.auth_cache)
+    AUTH_CACHE_ENABLED: bool = True
+    AUTH_CACHE_MAXSIZE: int = 10_000  # entries per cache (tokens, users)
+    AUTH_TOKEN_CACHE_TTL_SECONDS: float = 300  # verified JWT payloads; expiry is checked on every hit
+    AUTH_USER_CACHE_TTL_SECONDS: float = 30  # upper bound on how long a deactivation takes in other workers
 
     # Security
-    BCRYPT_ROUNDS: int = 12
+    BCRYPT_ROUNDS: int = 12  # changing it rehashes each user's password on their next login
+    PASSWORD_HASH_WORKERS: int = 4  # bcrypt threads; 0 hashes inline on the event loop
+    PASSWORD_HASH_MAX_PENDING: int = 64  # queued + running; beyond this register/login answer 503
+    ADMIN_USER_IDS: list[int] = []  # may read /api/system/* and /metrics, e.g. [1]; empty = nobody
+    METRICS_TOKEN: str | None = None  # static bearer token a Prometheus scraper may use for /metrics
 
     # Google API Key
-    GOOGLE_API_KEY_FLASH: str
+    GOOGLE_API_KEY_FLASH: str | None = None
+
+    # LLM
+    LLM_PROVIDER: str = "gemini"  # "gemini", or "fake" for load tests and offline work
+    LLM_MODEL: str = "gemini-2.5-flash"
+    LLM_TEMPERATURE: float = 0
+    LLM_WARMUP: bool = False  # build the client and prompts at startup instead of on first request
+
+    # Fake LLM (LLM_PROVIDER=fake), see app.utils.fake_llm
+    FAKE_LLM_LATENCY: str = "fixed:0"  # fixed:<s> | uniform:<lo>,<hi> | lognormal:<median>,<sigma>
+    FAKE_LLM_RESPONSES_FILE: str | None = None
+    FAKE_LLM_SEED: int | None = None
+
+    # Data cleaning
+    CLEANING_PROFILE_ENABLED: bool = True  # per-stage timings stored with each analysis
+    CLEANING_PROFILE_TRACE_MEMORY: bool = False  # adds tracemalloc peaks; slows allocation-heavy stages
+    CLEANING_PROFILE_MEMORY_USAGE: bool = False  # adds the deep memory usage of every stage's output
+
+    # Cleaned datasets, one Parquet part per version (see app.utils.dataset_store)
+    DATASET_DIR: str = "app/uploads/datasets"
+
+    # Deadlines and hedged LLM calls
+    REQUEST_DEADLINE_SECONDS: float = 180  # upper bound; clients may ask for less via X-Request-Timeout
+    DISCONNECT_POLL_SECONDS: float = 1.0
+    LLM_HEDGE_ENABLED: bool = True
+    LLM_HEDGE_PERCENTILE: float = 0.9  # fire a duplicate once a call is slower than this latency percentile
+    LLM_HEDGE_DELAY_SECONDS: float = 30  # hedge delay until enough latency samples are collected
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_MAX_HEDGES: int = 1
+
+    # Analysis scheduling (see app.utils.scheduler)
+    ANALYSIS_MAX_CONCURRENT: int = 4  # analyses running at once in this process (cleaning + LLM calls)
+    ANALYSIS_MAX_CONCURRENT_PER_USER: int = 2
+    ANALYSIS_MAX_QUEUED_PER_USER: int = 4  # one user's waiting analyses beyond this get 429
+    ANALYSIS_MAX_QUEUED_COST: float = 64  # estimated cost of all waiting analyses; beyond it new ones get 429
+    ANALYSIS_COST_BYTES_PER_UNIT: int = 5_000_000  # cost = 1 + one unit per 5 MB uploaded ...
+    ANALYSIS_COST_COLUMNS_PER_UNIT: int = 20  # ... + one unit per 20 columns
+    ANALYSIS_USER_WEIGHTS: dict[int, float] = {}  # user id -> share of the slots, e.g. {"7": 2}; default 1
+
+    # Idempotency-Key on /analysis/analyze and /analysis/dashboard (see app.services.idempotency)
+    IDEMPOTENCY_KEY_TTL_SECONDS: float = 86_400  # how long a key replays its response; after that it can be reused
+    IDEMPOTENCY_PURGE_INTERVAL_SECONDS: float = 3600  # how often expired keys are deleted; 0 disables
+    IDEMPOTENCY_PURGE_BATCH_SIZE: int = 1000
+
+    # Telemetry: /metrics and request tracing (see app.core.metrics, app.core.tracing)
+    TELEMETRY_ENABLED: bool = True  # request metrics, DB timings and spans; LLM/upload spans are always timed
+    OTLP_ENDPOINT: str | None = None  # e.g. http://localhost:4318; spans are POSTed to <endpoint>/v1/traces
+    OTLP_SERVICE_NAME: str = "autoviz-backend"
+    OTLP_EXPORT_INTERVAL_SECONDS: float = 5
+    OTLP_MAX_QUEUE: int = 10_000  # finished spans waiting for export; the oldest are dropped past this
+    LOG_LEVEL: str = "INFO"  # level of the app.* loggers (purges, appends, dropped LLM suggestions...)
 
 
     class Config:
@@ -0,0 +1,179 @@
+# Process-local metrics in the Prometheus text exposition format, served at /metrics
+#
+# Counters and histograms are keyed by label values and updated from the event
+# loop and from worker threads (cleaning, bcrypt), hence the lock per metric.
+# Gauges are read from callbacks at scrape time so they never go stale.
+# Each worker process has its own registry; scrape every worker, or run one.
+import math
+import threading
+from typing import Callable, Iterable
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# seconds; the top buckets are for LLM calls and whole analyses
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        super().__init__(name, documentation, labels)
+        self._values: dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    """Value read from `fn` at scrape time; `fn` returns a number or {label values: number}."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, fn: Callable[[], float | dict], labels=()):
+        super().__init__(name, documentation, labels)
+        self.fn = fn
+
+    def collect(self) -> list[str]:
+        try:
+            value = self.fn()
+        except Exception:
+            return []  # a broken source should not take the whole scrape down
+        items = value.items() if isinstance(value, dict) else [((), value)]
+        return self.header() + [f"{self.name}{_labels(self.label_names, k)} {_number(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series: dict[tuple, list] = {}  # key -> [per-bucket counts..., sum]
+
+    def observe(self, value: float, **labels) -> None:
+        # nan fits no bucket and nan/inf would poison _sum for good; neither is a real duration
+        if not math.isfinite(value):
+            return
+        key = self._key(labels)
+        # index of the first bucket the value falls in; cumulated when collected
+        idx = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets) - 1)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * len(self.buckets) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def count(self, **labels) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[:-1]) if series else 0
+
+    def collect(self) -> list[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._series.items()]
+        lines = self.header()
+        for key, series in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, series):
+                cumulative += n
+                le = 'le="' + _number(bound) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        # modules may be re-imported (reload, tests); keep the first instance
+        return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, labels=()) -> Counter:
+        return self.register(Counter(name, documentation, labels))
+
+    def histogram(self, name, documentation, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def gauge(self, name, documentation, fn, labels=()) -> Gauge:
+        return self.register(Gauge(name, documentation, fn, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+
+# HTTP
+http_requests = registry.counter(
+    "http_requests_total", "Requests handled, by route template and status code.", ("method", "route", "status")
+)
+http_request_duration = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route template.", ("method", "route")
+)
+
+# spans (upload, cleaning stages, LLM calls, DB queries...), see app.core.tracing
+span_duration = registry.histogram("span_duration_seconds", "Duration of traced operations.", ("span",))
+
+# LLM
+llm_tokens = registry.counter(
+    "llm_tokens_total", "Tokens sent to and received from the LLM, per prompt.", ("prompt", "direction")
+)
+
+# DB
+db_query_duration = registry.histogram(
+    "db_query_duration_seconds", "Statement execution time by SQL verb.", ("verb",)
+)
+
+# background purges
+purged_rows = registry.counter("purged_rows_total", "Rows deleted by the background purges, by table.", ("table",))
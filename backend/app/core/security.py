@@ -1,11 +1,26 @@
+import asyncio
+import hashlib
+import threading
+import time
+import uuid
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta, timezone
 from typing import Any, Optional
+import numpy as np
 from jose import jwt, JWTError
 from passlib.context import CryptContext
 from app.core.config import settings
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# hashes made with any other cost are flagged by verify_and_update and rehashed on login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
 
 
 def hash_password(password: str) -> str:
@@ -17,6 +32,113 @@ def verify_password(password: str, password_hash: str) -> bool:
     return pwd_context.verify(password, password_hash)
 
 
+def verify_and_update_password(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    """(valid, new_hash); new_hash is set when the stored hash used another cost or scheme."""
+    return pwd_context.verify_and_update(password, password_hash)
+
+
+# -------------------------
+# bcrypt off the event loop
+# -------------------------
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when PASSWORD_HASH_MAX_PENDING calls are already waiting."""
+
+
+class PasswordHasher:
+    """
+    Runs bcrypt in a small dedicated thread pool (bcrypt releases the GIL), so a
+    login burst neither blocks the event loop nor starves the default executor
+    used by file and cleaning work. At most ``max_pending`` calls are queued or
+    running; beyond that callers get PasswordHasherBusy rather than an
+    unbounded wait. ``workers=0`` runs inline on the loop (the old behaviour).
+    """
+
+    def __init__(self, workers: int, max_pending: int, window: int = 1024):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt") if workers > 0 else None
+        self.pending = 0  # queued + running
+        self.running = 0
+        self._running_lock = threading.Lock()  # updated from the worker threads
+        self.completed = 0
+        self.rejected = 0
+        self._waits = deque(maxlen=window)  # seconds between submit and start
+        self._runs = deque(maxlen=window)  # seconds of bcrypt work
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations in progress, retry shortly")
+        self.pending += 1
+        submitted = time.perf_counter()
+
+        def timed():
+            started = time.perf_counter()
+            with self._running_lock:
+                self.running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._running_lock:
+                    self.running -= 1
+                self._waits.append(started - submitted)
+                self._runs.append(time.perf_counter() - started)
+
+        try:
+            if self._executor is None:
+                return timed()
+            return await asyncio.get_running_loop().run_in_executor(self._executor, timed)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict:
+        def pct(samples, q):
+            return float(np.percentile(np.fromiter(samples, dtype=np.float64), q)) * 1000 if samples else 0.0
+
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "pending": self.pending,
+            "running": self.running,
+            "completed_total": self.completed,
+            "rejected_total": self.rejected,
+            "queue_wait_p50_ms": pct(self._waits, 50),
+            "queue_wait_p95_ms": pct(self._waits, 95),
+            "hash_p50_ms": pct(self._runs, 50),
+            "hash_p95_ms": pct(self._runs, 95),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_hasher: PasswordHasher | None = None
+
+
+def password_hasher() -> PasswordHasher:
+    global _hasher
+    if _hasher is None:
+        _hasher = PasswordHasher(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+    return _hasher
+
+
+def shutdown_password_hasher() -> None:
+    global _hasher
+    if _hasher is not None:
+        _hasher.shutdown()
+        _hasher = None
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher().run(hash_password, password)
+
+
+async def verify_and_update_password_async(password: str, password_hash: str) -> tuple[bool, Optional[str]]:
+    return await password_hasher().run(verify_and_update_password, password, password_hash)
+
+
 
 
 def create_jwt_token(subject: str, expires_delta: timedelta, token_type: str) -> str:
@@ -26,12 +148,20 @@ def create_jwt_token(subject: str, expires_delta: timedelta, token_type: str) ->
         "type": token_type,
         "iat": int(now.timestamp()),
         "exp": int((now + expires_delta).timestamp()),
+        # unique per token: logins of one user within the same second must not collide
+        "jti": uuid.uuid4().hex,
     }
     return jwt.encode(payload, settings.JWT_SECRET_KEY, algorithm=settings.JWT_ALGORITHM)
 
 
 
 
+def token_digest(token: str) -> bytes:
+    """SHA-256 of a token; refresh tokens are stored and looked up by this, never in clear."""
+    return hashlib.sha256(token.encode("utf-8")).digest()
+
+
+
 def decode_jwt(token: str) -> Optional[dict[str, Any]]:
     try:
         return jwt.decode(token, settings.JWT_SECRET_KEY, algorithms=[settings.JWT_ALGORITHM])
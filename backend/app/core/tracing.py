@@ -0,0 +1,285 @@
+# Request tracing: spans around requests, uploads, cleaning stages, LLM calls and DB queries
+#
+# `with span("name", **attributes)` opens a child of the current span. The
+# current span lives in a ContextVar, so tasks started inside the block and
+# asyncio.to_thread work inherit it (hedged LLM attempts, threaded cleaning).
+# Every finished span feeds span_duration_seconds on /metrics; once
+# exporter.start() is called (OTLP_ENDPOINT) they are also batched to an
+# OpenTelemetry collector as OTLP/HTTP JSON.
+#
+# Nothing here reads settings, so the cleaning pipeline can import it standalone.
+import asyncio
+import logging
+import os
+import re
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+from app.core import metrics
+
+logger = logging.getLogger(__name__)
+
+# OTLP SpanKind
+INTERNAL, SERVER, CLIENT = 1, 2, 3
+
+_TRACEPARENT = re.compile(r"^[0-9a-f]{2}-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str = field(default_factory=lambda: _new_id(8))
+    parent_id: str | None = None
+    kind: int = INTERNAL
+    attributes: dict = field(default_factory=dict)
+    start_ns: int = field(default_factory=time.time_ns)
+    end_ns: int | None = None
+    error: str | None = None
+
+    def set(self, **attributes) -> None:
+        self.attributes.update(attributes)
+
+    def end(self, error: BaseException | None = None) -> None:
+        if self.end_ns is not None:
+            return
+        self.end_ns = time.time_ns()
+        if error is not None:
+            self.error = f"{type(error).__name__}: {error}"
+        if self.kind != SERVER:
+            # requests already have http_request_duration_seconds, by route
+            metrics.span_duration.observe((self.end_ns - self.start_ns) / 1e9, span=self.name)
+        exporter.offer(self)
+
+
+_current: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def start_span(name: str, *, kind: int = INTERNAL, **attributes) -> Span:
+    """Open a child of the current span without making it current; call .end() on it."""
+    parent = _current.get()
+    return Span(
+        name=name,
+        trace_id=parent.trace_id if parent else _new_id(16),
+        parent_id=parent.span_id if parent else None,
+        kind=kind,
+        attributes=attributes,
+    )
+
+
+@contextmanager
+def span(name: str, *, kind: int = INTERNAL, **attributes):
+    s = start_span(name, kind=kind, **attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except BaseException as e:  # cancellations too: a hedge that lost, a client that left
+        s.end(e)
+        raise
+    finally:
+        _current.reset(token)
+        s.end()
+
+
+# -------------------------
+# HTTP
+# -------------------------
+class TelemetryMiddleware:
+    """
+    ASGI middleware: one server span per request (continuing an incoming W3C
+    traceparent) and the http_requests_total / http_request_duration_seconds
+    metrics, labelled by route template so path parameters do not explode them.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        method = scope["method"]
+        root = Span(name=method, trace_id=_new_id(16), kind=SERVER, attributes={
+            "http.method": method,
+            "http.target": scope["path"],
+        })
+        for key, value in scope["headers"]:
+            if key == b"traceparent":
+                match = _TRACEPARENT.match(value.decode("latin-1").strip())
+                if match:
+                    root.trace_id, root.parent_id = match.groups()
+                break
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        token = _current.set(root)
+        started = time.perf_counter()
+        error = None
+        try:
+            await self.app(scope, receive, send_with_status)
+        except BaseException as e:
+            error = e
+            raise
+        finally:
+            _current.reset(token)
+            # set on the scope by the router once a route matched
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            metrics.http_requests.inc(method=method, route=route, status=status)
+            metrics.http_request_duration.observe(time.perf_counter() - started, method=method, route=route)
+            root.name = f"{method} {route}"
+            root.set(**{"http.route": route, "http.status_code": status})
+            root.end(error)
+
+
+# -------------------------
+# DB
+# -------------------------
+def _before_execute(conn, cursor, statement, parameters, context, executemany):
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+    s = None
+    if _current.get() is not None:  # only inside a trace; the purge loop etc. stay metrics-only
+        s = start_span("db.query", kind=CLIENT, **{
+            "db.system": conn.dialect.name,
+            "db.operation": verb,
+            "db.statement": statement[:500],
+        })
+    conn.info.setdefault("telemetry", []).append((verb, time.perf_counter(), s))
+
+
+def _after_execute(conn, cursor, statement, parameters, context, executemany):
+    stack = conn.info.get("telemetry")
+    if not stack:
+        return
+    verb, started, s = stack.pop()
+    metrics.db_query_duration.observe(time.perf_counter() - started, verb=verb)
+    if s is not None:
+        s.end()
+
+
+def _on_error(exception_context):
+    conn = exception_context.connection
+    stack = conn.info.get("telemetry") if conn is not None else None
+    if not stack:
+        return
+    verb, started, s = stack.pop()
+    metrics.db_query_duration.observe(time.perf_counter() - started, verb=verb)
+    if s is not None:
+        s.end(exception_context.original_exception)
+
+
+def install_db_tracing(engine) -> None:
+    """Time every statement and trace it under the current span; safe to call more than once."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _before_execute):
+        event.listen(sync_engine, "before_cursor_execute", _before_execute)
+        event.listen(sync_engine, "after_cursor_execute", _after_execute)
+        event.listen(sync_engine, "handle_error", _on_error)
+
+
+# -------------------------
+# OTLP export
+# -------------------------
+def _otlp_value(value) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_attributes(attributes: dict) -> list[dict]:
+    return [{"key": k, "value": _otlp_value(v)} for k, v in attributes.items() if v is not None]
+
+
+class OTLPExporter:
+    """
+    Buffers finished spans and POSTs them in batches to <endpoint>/v1/traces
+    (OTLP/HTTP, JSON encoding), which any OpenTelemetry collector accepts.
+    Spans are dropped, oldest first, while the collector is unreachable.
+    """
+
+    def __init__(self):
+        self.endpoint: str | None = None
+        self.service_name = ""
+        self._queue: deque = deque()
+        self.dropped = metrics.registry.counter("otlp_spans_dropped_total", "Spans dropped before export.")
+        self.exported = metrics.registry.counter("otlp_spans_exported_total", "Spans accepted by the collector.")
+
+    def offer(self, s: Span) -> None:
+        if self.endpoint is None:
+            return
+        if len(self._queue) == self._queue.maxlen:
+            self.dropped.inc()
+        self._queue.append(s)  # deque appends are thread-safe; spans end in worker threads too
+
+    def payload(self, spans: list[Span]) -> dict:
+        return {"resourceSpans": [{
+            "resource": {"attributes": _otlp_attributes({"service.name": self.service_name})},
+            "scopeSpans": [{
+                "scope": {"name": "app.core.tracing"},
+                "spans": [{
+                    "traceId": s.trace_id,
+                    "spanId": s.span_id,
+                    **({"parentSpanId": s.parent_id} if s.parent_id else {}),
+                    "name": s.name,
+                    "kind": s.kind,
+                    "startTimeUnixNano": str(s.start_ns),
+                    "endTimeUnixNano": str(s.end_ns),
+                    "attributes": _otlp_attributes(s.attributes),
+                    "status": {"code": 2, "message": s.error} if s.error else {"code": 0},
+                } for s in spans],
+            }],
+        }]}
+
+    async def flush(self, client, batch_size: int = 512) -> None:
+        while self._queue:
+            spans = [self._queue.popleft() for _ in range(min(batch_size, len(self._queue)))]
+            try:
+                res = await client.post(f"{self.endpoint}/v1/traces", json=self.payload(spans))
+                res.raise_for_status()
+            except Exception as e:
+                self.dropped.inc(len(spans))
+                logger.warning("OTLP export of %d spans to %s failed: %r", len(spans), self.endpoint, e)
+                return
+            self.exported.inc(len(spans))
+
+    def start(self, endpoint: str, *, service_name: str, interval: float, max_queue: int) -> asyncio.Task:
+        self.endpoint = endpoint.rstrip("/")
+        self.service_name = service_name
+        self._queue = deque(self._queue, maxlen=max_queue)
+        return asyncio.create_task(self._run(interval))
+
+    async def _run(self, interval: float) -> None:
+        import httpx
+
+        async with httpx.AsyncClient(timeout=10) as client:
+            try:
+                while True:
+                    await asyncio.sleep(interval)
+                    await self.flush(client)
+            finally:
+                # cancelled at shutdown: send what is left
+                await asyncio.shield(self.flush(client))
+
+
+exporter = OTLPExporter()
@@ -0,0 +1,69 @@
+# Connection pool gauges and acquisition latency
+import time
+from collections import deque
+
+import numpy as np
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """Counters fed by InstrumentedQueuePool; read them with snapshot(pool)."""
+
+    def __init__(self, window: int = 2048):
+        self.waiting = 0  # callers currently blocked waiting for a connection
+        self.acquired = 0
+        self.timeouts = 0
+        self.max_wait_s = 0.0
+        self._recent = deque(maxlen=window)  # latest acquisition latencies, seconds
+
+    def record(self, seconds: float) -> None:
+        self.acquired += 1
+        self.max_wait_s = max(self.max_wait_s, seconds)
+        self._recent.append(seconds)
+
+    def reset(self) -> None:
+        self.__init__(self._recent.maxlen)
+
+    def snapshot(self, pool) -> dict:
+        recent = np.fromiter(self._recent, dtype=np.float64)
+        p50, p95, p99 = np.percentile(recent, [50, 95, 99]) if recent.size else (0.0, 0.0, 0.0)
+        stats = {
+            "waiting": self.waiting,
+            "acquired_total": self.acquired,
+            "timeouts_total": self.timeouts,
+            "acquire_p50_ms": float(p50) * 1000,
+            "acquire_p95_ms": float(p95) * 1000,
+            "acquire_p99_ms": float(p99) * 1000,
+            "acquire_max_ms": self.max_wait_s * 1000,
+        }
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats.update({
+                "size": pool.size(),
+                "checked_out": pool.checkedout(),
+                "idle": pool.checkedin(),
+                # negative while the pool has not opened all pool_size connections yet
+                "overflow": max(0, pool.overflow()),
+                "max_overflow": pool._max_overflow,
+            })
+        return stats
+
+
+metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """The default async queue pool, timing every checkout."""
+
+    def _do_get(self):
+        metrics.waiting += 1
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            metrics.timeouts += 1
+            raise
+        finally:
+            metrics.waiting -= 1
+        metrics.record(time.perf_counter() - start)
+        return conn
@@ -0,0 +1,61 @@
+# Per-request count of database round trips (statements and commits)
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+
+@dataclass
+class QueryCount:
+    statements: int = 0
+    commits: int = 0
+    by_verb: dict = field(default_factory=dict)  # "SELECT" / "INSERT" / ... -> count
+
+    @property
+    def round_trips(self) -> int:
+        return self.statements + self.commits
+
+
+_current: ContextVar[QueryCount | None] = ContextVar("query_count", default=None)
+
+
+def _on_execute(conn, cursor, statement, parameters, context, executemany):
+    count = _current.get()
+    if count is None:
+        return
+    verb = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "?"
+    count.statements += 1
+    count.by_verb[verb] = count.by_verb.get(verb, 0) + 1
+
+
+def _on_commit(conn):
+    count = _current.get()
+    if count is not None:
+        count.commits += 1
+
+
+def install(engine) -> None:
+    """Hook the counters into an (async) engine; safe to call more than once."""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    if not event.contains(sync_engine, "before_cursor_execute", _on_execute):
+        event.listen(sync_engine, "before_cursor_execute", _on_execute)
+        event.listen(sync_engine, "commit", _on_commit)
+
+
+@contextmanager
+def count_queries():
+    """
+    Count the statements run inside the block, including in tasks and threads
+    started from it (they inherit the context). Requires install(engine).
+
+        with count_queries() as count:
+            await client.post(...)
+        print(count.round_trips)
+    """
+    count = QueryCount()
+    token = _current.set(count)
+    try:
+        yield count
+    finally:
+        _current.reset(token)
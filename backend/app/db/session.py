@@ -1,15 +1,42 @@
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncAttrs, create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, DeclarativeBase
 
 from app.core.config import settings
+from app.db.pool_metrics import InstrumentedQueuePool
 
 
-engine = create_async_engine(settings.DATABASE_URL)
+def _engine_options(database_url: str) -> dict:
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        # in-memory SQLite lives in a single connection; keep SQLAlchemy's default pool
+        return {}
+
+    options = {
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+    }
+    if url.get_driver_name() == "asyncpg":
+        # SQLAlchemy's prepared statement cache and asyncpg's own; both must be 0 behind pgbouncer
+        options["connect_args"] = {
+            "prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+            "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+        }
+    return options
+
+
+engine = create_async_engine(settings.DATABASE_URL, **_engine_options(settings.DATABASE_URL))
 
 
 SessionLocal = sessionmaker(
     autocommit=False,
     autoflush=False,
+    # objects stay usable after commit; values generated on insert come back through RETURNING
+    expire_on_commit=False,
     class_=AsyncSession,
     bind=engine,
 )
@@ -22,5 +49,5 @@ async def get_db():
         await session.close()
 
 
-class Base(DeclarativeBase):
+class Base(AsyncAttrs, DeclarativeBase):
     pass
\ No newline at end of file
@@ -1,11 +1,77 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
 from app.core.config import settings
+from app.core import metrics
+from app.core.tracing import TelemetryMiddleware, exporter, install_db_tracing
+from app.core.security import shutdown_password_hasher
+from app.db.session import SessionLocal, engine
+from app.services.token import purge_tokens_forever
+from app.services.blob import purge_blobs_forever
+from app.services.idempotency import purge_idempotency_keys_forever
 from app.routes.auth import router as auth_router
 from app.routes.analysis import router as analysis_router
+from app.routes.system import require_metrics_reader, router as system_router
 from fastapi.middleware.cors import CORSMiddleware
 
 
-app = FastAPI(title=settings.APP_NAME)
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.LLM_WARMUP:
+        from app.utils.llms import warmup_llm
+
+        # SDK imports and client construction are blocking, keep them off the loop
+        await asyncio.to_thread(warmup_llm)
+    purges = []
+    if settings.TOKEN_PURGE_INTERVAL_SECONDS > 0:
+        purges.append(asyncio.create_task(purge_tokens_forever(
+            SessionLocal,
+            interval=settings.TOKEN_PURGE_INTERVAL_SECONDS,
+            batch_size=settings.TOKEN_PURGE_BATCH_SIZE,
+        )))
+    if settings.BLOB_PURGE_INTERVAL_SECONDS > 0:
+        purges.append(asyncio.create_task(purge_blobs_forever(
+            SessionLocal,
+            interval=settings.BLOB_PURGE_INTERVAL_SECONDS,
+            batch_size=settings.BLOB_PURGE_BATCH_SIZE,
+            grace_seconds=settings.BLOB_PURGE_GRACE_SECONDS,
+        )))
+    if settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS > 0:
+        purges.append(asyncio.create_task(purge_idempotency_keys_forever(
+            SessionLocal,
+            interval=settings.IDEMPOTENCY_PURGE_INTERVAL_SECONDS,
+            batch_size=settings.IDEMPOTENCY_PURGE_BATCH_SIZE,
+        )))
+    export = None
+    if settings.OTLP_ENDPOINT:
+        export = exporter.start(
+            settings.OTLP_ENDPOINT,
+            service_name=settings.OTLP_SERVICE_NAME,
+            interval=settings.OTLP_EXPORT_INTERVAL_SECONDS,
+            max_queue=settings.OTLP_MAX_QUEUE,
+        )
+    yield
+    for purge in purges:
+        purge.cancel()
+    if export:
+        export.cancel()
+        # the exporter sends what is still queued before it exits
+        await asyncio.gather(export, return_exceptions=True)
+    shutdown_password_hasher()
+
+
+logging.basicConfig(format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+logging.getLogger("app").setLevel(settings.LOG_LEVEL)
+# SQLAlchemy names the pool logger after our pool class, and echoes every checkout at INFO
+logging.getLogger("app.db.pool_metrics").setLevel(logging.WARNING)
+
+app = FastAPI(title=settings.APP_NAME, lifespan=lifespan)
+
+if settings.TELEMETRY_ENABLED:
+    app.add_middleware(TelemetryMiddleware)
+    install_db_tracing(engine)
 
 
 app.add_middleware(
@@ -14,17 +80,24 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Dataset-Version"],
 )
 
 
 
 app.include_router(auth_router, prefix=settings.API_STARTING_PATH)
 app.include_router(analysis_router, prefix=settings.API_STARTING_PATH )
+app.include_router(system_router, prefix=settings.API_STARTING_PATH)
 
 @app.get("/")
 async def root():
     return {"message": "Hello World"}
 
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_metrics_reader)])
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
 # if __name__ == "__main__":
 #     import uvicorn
 
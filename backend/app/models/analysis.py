@@ -1,8 +1,9 @@
 import uuid
-from sqlalchemy import Column, String, JSON, ForeignKey, DateTime, Integer
+from sqlalchemy import Column, String, JSON, ForeignKey, DateTime, Integer, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime, timezone
 from app.db.session import Base  # assuming you already have Base from SQLAlchemy setup
+from app.models.blob import Content_Blob
 
 class Analysis_Requirement(Base):
     __tablename__ = "Analysis_Requirement"
@@ -12,6 +13,10 @@ class Analysis_Requirement(Base):
     file_name = Column(String, nullable=False)
     file_path = Column(String, nullable=False) 
     user_query = Column(String, nullable=False)
+    cleaning_recipe = Column(JSON(none_as_null=True), nullable=True)  # fitted cleaning statistics, reused for re-uploads and appends
+    source_digest = Column(String(64), nullable=True)  # sha256 of the uploaded file; identical bytes are the first recipe candidate
+    schema_hash = Column(String(16), nullable=True)  # schema_fingerprint of the upload; any same-schema recipe is a candidate
+    dataset_version = Column(Integer, nullable=False, default=0, server_default="0")  # latest cleaned Parquet part, 0 = none yet
     uploaded_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     # relationships
@@ -19,6 +24,14 @@ class Analysis_Requirement(Base):
     analysis_results = relationship("Analysis_Result", back_populates="requirement", cascade="all, delete-orphan")
     analysis_dashboards = relationship("Analysis_Dashboard", back_populates="requirement", cascade="all, delete-orphan")
 
+    __table_args__ = (
+        # per-user history, newest first, keyset on (uploaded_at, id)
+        Index("ix_Analysis_Requirement_user_id_uploaded_at_id", "user_id", "uploaded_at", "id"),
+        # recipe lookup for a re-upload of the same file, or of the same export with other rows
+        Index("ix_Analysis_Requirement_user_id_source_digest", "user_id", "source_digest"),
+        Index("ix_Analysis_Requirement_user_id_schema_hash", "user_id", "schema_hash"),
+    )
+
 
 class Analysis_Result(Base):
     __tablename__ = "Analysis_Result"
@@ -28,13 +41,22 @@ class Analysis_Result(Base):
     requirement_id = Column(Integer, ForeignKey("Analysis_Requirement.id", ondelete="CASCADE"), nullable=False)
 
     
-    graph_suggestions = Column(JSON, nullable=True)   # will hold list of graphs suggested by LLM
-    dashboard_code = Column(String, nullable=True)  # will hold the generated dashboard code
+    # graphs suggested by the LLM and the generated dashboard code, compressed in Content_Blob
+    graph_suggestions_sha = Column(String(64), ForeignKey("Content_Blob.sha256", name="fk_Analysis_Result_graph_suggestions_sha"), nullable=True)
+    dashboard_code_sha = Column(String(64), ForeignKey("Content_Blob.sha256", name="fk_Analysis_Result_dashboard_code_sha"), nullable=True)
+    cleaning_profile = Column(JSON, nullable=True)  # per-stage timings/memory of the cleaning run
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     # relationships
     user = relationship("User", back_populates="analysis_results")
     requirement = relationship("Analysis_Requirement", back_populates="analysis_results")
+    # loaded on access: `await result.awaitable_attrs.dashboard_code_blob`
+    graph_suggestions_blob = relationship(Content_Blob, foreign_keys=[graph_suggestions_sha], viewonly=True)
+    dashboard_code_blob = relationship(Content_Blob, foreign_keys=[dashboard_code_sha], viewonly=True)
+
+    __table_args__ = (
+        Index("ix_Analysis_Result_requirement_id_created_at", "requirement_id", "created_at"),
+    )
 
 
 class Analysis_Dashboard(Base):
@@ -44,9 +66,16 @@ class Analysis_Dashboard(Base):
     user_id = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"), nullable=False)
     requirement_id = Column(Integer, ForeignKey("Analysis_Requirement.id", ondelete="CASCADE"), nullable=False)
 
-    dashboard_code = Column(String, nullable=True)  # will hold the generated dashboard code
+    dashboard_code_sha = Column(String(64), ForeignKey("Content_Blob.sha256", name="fk_Analysis_Dashboard_dashboard_code_sha"), nullable=True)  # generated code, in Content_Blob
+    cleaning_profile = Column(JSON, nullable=True)  # per-stage timings/memory of the cleaning run
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     # relationships
     user = relationship("User", back_populates="analysis_dashboards")
     requirement = relationship("Analysis_Requirement", back_populates="analysis_dashboards")
+    dashboard_code_blob = relationship(Content_Blob, foreign_keys=[dashboard_code_sha], viewonly=True)
+
+    __table_args__ = (
+        Index("ix_Analysis_Dashboard_requirement_id_created_at", "requirement_id", "created_at"),
+    )
+
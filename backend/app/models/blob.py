@@ -0,0 +1,75 @@
+import hashlib
+import json
+from datetime import datetime, timezone
+
+import zstandard
+from sqlalchemy import Column, DateTime, Index, Integer, LargeBinary, String
+
+from app.db.session import Base
+
+
+# below this size zstd framing costs more than it saves
+_MIN_COMPRESS_BYTES = 256
+_ZSTD_LEVEL = 3
+
+
+class Content_Blob(Base):
+    """
+    Content-addressed, zstd-compressed storage for large generated artifacts
+    (dashboard code, graph specs). Rows are immutable and shared: identical
+    content is stored once, keyed by the sha256 of its uncompressed bytes.
+    Rows no longer referenced by any table are deleted by
+    BlobService.purge_unreferenced.
+    """
+    __tablename__ = "Content_Blob"
+
+    sha256 = Column(String(64), primary_key=True)
+    codec = Column(String(16), nullable=False)  # "zstd" | "raw"
+    media_type = Column(String(64), nullable=False)  # "text/plain" | "application/json"
+    size = Column(Integer, nullable=False)  # uncompressed bytes
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    # refreshed by every BlobService.put of this content; the purge leaves recently used rows alone
+    last_used_at = Column(DateTime(timezone=True), nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_Content_Blob_last_used_at", "last_used_at"),
+    )
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, media_type: str) -> "Content_Blob":
+        if len(raw) >= _MIN_COMPRESS_BYTES:
+            codec, data = "zstd", zstandard.ZstdCompressor(level=_ZSTD_LEVEL).compress(raw)
+        else:
+            codec, data = "raw", raw
+        now = datetime.now(timezone.utc)
+        return cls(
+            sha256=hashlib.sha256(raw).hexdigest(),
+            codec=codec,
+            media_type=media_type,
+            size=len(raw),
+            data=data,
+            created_at=now,
+            last_used_at=now,
+        )
+
+    @classmethod
+    def from_text(cls, text: str) -> "Content_Blob":
+        return cls.from_bytes(text.encode("utf-8"), "text/plain")
+
+    @classmethod
+    def from_json(cls, value) -> "Content_Blob":
+        # canonical form, so equal specs hash equal whatever their key order
+        raw = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return cls.from_bytes(raw.encode("utf-8"), "application/json")
+
+    def raw(self) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdDecompressor().decompress(self.data, max_output_size=self.size)
+        return bytes(self.data)
+
+    def text(self) -> str:
+        return self.raw().decode("utf-8")
+
+    def json(self):
+        return json.loads(self.raw())
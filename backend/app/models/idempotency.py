@@ -0,0 +1,28 @@
+from sqlalchemy import Column, String, ForeignKey, DateTime, Integer, Index
+from app.db.session import Base
+from app.models.blob import Content_Blob  # noqa: F401  response_sha references it
+
+
+class Idempotency_Key(Base):
+    """
+    One analysis submission per (user, Idempotency-Key): the hash of what was
+    sent and, once it has finished, the response to replay for repeats.
+    Rows are ignored once expired and deleted by the purge task.
+    """
+    __tablename__ = "Idempotency_Key"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("User.id", ondelete="CASCADE"), nullable=False)
+    key = Column(String(255), nullable=False)
+    request_hash = Column(String(64), nullable=False)  # sha256 of endpoint, form fields and uploaded file
+    status = Column(String(16), nullable=False)  # "pending" | "completed"
+    response_status = Column(Integer, nullable=True)
+    # response body, JSON in Content_Blob (the same dashboard code is stored once)
+    response_sha = Column(String(64), ForeignKey("Content_Blob.sha256", name="fk_Idempotency_Key_response_sha"), nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    expires_at = Column(DateTime(timezone=True), nullable=False)
+
+    __table_args__ = (
+        Index("ix_Idempotency_Key_user_id_key", "user_id", "key", unique=True),
+        Index("ix_Idempotency_Key_expires_at", "expires_at"),
+    )
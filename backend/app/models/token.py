@@ -1,4 +1,4 @@
-from sqlalchemy import ForeignKey, String, DateTime, Boolean
+from sqlalchemy import ForeignKey, DateTime, Boolean, LargeBinary
 from sqlalchemy.orm import Mapped, mapped_column
 from datetime import datetime, timezone
 from app.db.session import Base
@@ -10,7 +10,7 @@ class RefreshToken(Base):
 
     id: Mapped[int] = mapped_column(primary_key=True)
     user_id: Mapped[int] = mapped_column(ForeignKey("User.id", ondelete="CASCADE"), index=True)
-    token: Mapped[str] = mapped_column(String(512), unique=True, index=True)
-    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
+    token_digest: Mapped[bytes] = mapped_column(LargeBinary(32), unique=True, index=True)  # sha256 of the JWT
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)  # revoking also moves it to now
     revoked: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
\ No newline at end of file
@@ -1,21 +1,29 @@
 # app/api/v1/endpoints/analysis.py
-from fastapi import APIRouter, Depends, UploadFile, Form, HTTPException
+from fastapi import APIRouter, Depends, UploadFile, Form, Header, HTTPException, Query, Request, Response
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.ext.asyncio import AsyncSession
 import pandas as pd
 import numpy as np
 from app.db.session import get_db
-from app.utils.file import save_file
+from app.utils.file import remove_file, save_file
 from app.services.user import UserServices
-from app.schemas.anlysis import AnalysisRequirements, AnalysisRequirementIn, AnalysisTransactionOut
+from app.schemas.anlysis import AnalysisRequirements, AnalysisRequirementIn, AnalysisTransactionOut, DatasetAppendOut, AnalysisHistoryItem, AnalysisHistoryPage
 from app.models.user import User
 from app.models.analysis import Analysis_Requirement, Analysis_Result
-from app.services.analysis import AnalysisService
+from app.services.analysis import AnalysisService, AppendConflict, DatasetDrift, DatasetNotReady, SchemaMismatch
 from app.services.transaction import TransactionService
+from app.services.idempotency import IdempotencyInProgress, IdempotencyKeyInvalid, IdempotencyMismatch, IdempotencyService, fingerprint
+from app.utils.deadline import ClientDisconnected, DeadlineExceeded, request_timeout, run_request_bound
+from app.utils import dataset_store
+from app.utils.pagination import InvalidCursor, decode_cursor, encode_cursor
+from app.utils.scheduler import SchedulerSaturated, Ticket, analysis_scheduler, estimate_file_cost
 from fastapi.responses import JSONResponse
+import logging
+import math
 import os
 
 router = APIRouter(prefix="/analysis", tags=["analysis"])
+logger = logging.getLogger(__name__)
 
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -23,118 +31,272 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 current_dir = os.path.dirname(os.path.abspath(__file__))         # backend/app/routes
 backend_dir = os.path.dirname(os.path.dirname(current_dir))  
 
+
+def _admit(user_id: int, file_path: str, deadline: float | None = None) -> Ticket:
+    # turn the request away now rather than let it queue into a timeout
+    try:
+        return analysis_scheduler().admit(user_id, estimate_file_cost(file_path), deadline=deadline)
+    except SchedulerSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))})
+
+async def _idempotent(db: AsyncSession, user_id: int, key: str | None, endpoint: str, requirements: str,
+                      file: UploadFile | None, submit, status_code: int):
+    # a retried submission gets the first one's response instead of a second analysis
+    try:
+        return await IdempotencyService(db).run(
+            user_id=user_id,
+            key=key,
+            request_hash=lambda: fingerprint(endpoint, {"requirements": requirements}, file),
+            call=submit,
+            status_code=status_code,
+        )
+    except IdempotencyKeyInvalid as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except IdempotencyMismatch as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    except IdempotencyInProgress as e:
+        raise HTTPException(status_code=409, detail=str(e), headers={"Retry-After": "1"})
+
 @router.post("/analyze", response_model=AnalysisTransactionOut, status_code=201)
 async def return_analysis_dashboard(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     requirements: str = Form(...),
     file: UploadFile = None,
+    idempotency_key: str | None = Header(None),
     db: AsyncSession = Depends(get_db)
 ):
-    print("Received analysis request")
     user_services = UserServices(db)
     current_user = await user_services.get_current_user(token)
     if not current_user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    # Save file
-    try:
-        file_path = save_file(file, str(current_user.id))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"File error: {str(e)}")
+    async def submit():
+        # Save file
+        try:
+            file_path = save_file(file, str(current_user.id))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"File error: {str(e)}")
 
-    print("File saved at:", file_path)
-    # Store in DB
-    transaction_service = TransactionService(db)
-    transaction = await transaction_service.create_transaction(
-        user_id=current_user.id,
-        file_name=file.filename,
-        file_path=file_path,
-        user_query=requirements,
-    )
+        logger.debug("upload saved at %s", file_path)
+        try:
+            ticket = _admit(current_user.id, file_path, deadline=request_timeout(request))
+        except HTTPException:
+            # turned away before a requirement points at the upload; nothing else will remove it
+            remove_file(file_path)
+            raise
+        with ticket:
+            # Store in DB
+            transaction_service = TransactionService(db)
+            transaction = await transaction_service.create_transaction(
+                user_id=current_user.id,
+                file_name=file.filename,
+                file_path=file_path,
+                user_query=requirements,
+            )
 
-    """
-    Upload dataset + requirements.
-    Performs basic EDA and stores transaction.
-    """
+            """
+            Upload dataset + requirements.
+            Performs basic EDA and stores transaction.
+            """
 
-    print("Transaction created with ID:", transaction.id)
-    # try:
-    analysis_service = AnalysisService(db)
-    analysis_result = await analysis_service.perform_analysis(requirement_id=transaction.id)
-    # except Exception as e:
-    #     raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+            logger.info("requirement %d created for user %d", transaction.id, current_user.id)
+            analysis_service = AnalysisService(db)
+            try:
+                analysis_result = await run_request_bound(
+                    request,
+                    ticket.run(analysis_service.perform_analysis(transaction=transaction)),
+                    timeout=request_timeout(request),
+                )
+            except DeadlineExceeded:
+                raise HTTPException(status_code=504, detail="Analysis timed out")
+            except ClientDisconnected:
+                return Response(status_code=499)
+        # except Exception as e:
+        #     raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+
+        return AnalysisTransactionOut(
+            user_id=transaction.user_id,
+            transaction_id=transaction.id,
+            dataset_name=transaction.file_name,
+            requirements=transaction.user_query,
+            dashboard_code=(await analysis_result.awaitable_attrs.dashboard_code_blob).text(),
+            cleaning_profile=analysis_result.cleaning_profile
+        )
 
-    await db.refresh(analysis_result)
-    await db.refresh(transaction)
-    return AnalysisTransactionOut(
-        user_id=transaction.user_id,
-        transaction_id=transaction.id,
-        dataset_name=transaction.file_name,
-        requirements=transaction.user_query,
-        dashboard_code=analysis_result.dashboard_code
-    )
+    return await _idempotent(db, current_user.id, idempotency_key, "analyze", requirements, file, submit, 201)
 
 
 @router.post("/dashboard", status_code=200, response_model=AnalysisTransactionOut)
 async def get_dashboard_code(
+    request: Request,
     token: str = Depends(oauth2_scheme),
     requirements: str = Form(...),
     file: UploadFile = None,
+    idempotency_key: str | None = Header(None),
+    db: AsyncSession = Depends(get_db)
+):
+    user_services = UserServices(db)
+    current_user = await user_services.get_current_user(token)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    async def submit():
+        # Save file
+        try:
+            file_path = save_file(file, str(current_user.id))
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"File error: {str(e)}")
+
+        logger.debug("upload saved at %s", file_path)
+        try:
+            ticket = _admit(current_user.id, file_path, deadline=request_timeout(request))
+        except HTTPException:
+            # turned away before a requirement points at the upload; nothing else will remove it
+            remove_file(file_path)
+            raise
+        with ticket:
+            # Store in DB
+            transaction_service = TransactionService(db)
+            transaction = await transaction_service.create_transaction(
+                user_id=current_user.id,
+                file_name=file.filename,
+                file_path=file_path,
+                user_query=requirements,
+            )
+
+            """
+            Upload dataset + requirements.
+            Performs basic EDA and stores transaction.
+            """
+
+            logger.info("requirement %d created for user %d", transaction.id, current_user.id)
+            try:
+                analysis_service = AnalysisService(db)
+                analysis_result = await run_request_bound(
+                    request,
+                    ticket.run(analysis_service.generate_dashboard_code(transaction=transaction)),
+                    timeout=request_timeout(request),
+                )
+
+
+            except DeadlineExceeded:
+                raise HTTPException(status_code=504, detail="Dashboard generation timed out")
+            except ClientDisconnected:
+                # nobody is waiting for the result; the LLM calls were cancelled with the task
+                return Response(status_code=499)
+            except Exception as e:
+                raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+        try:
+            return AnalysisTransactionOut(
+                user_id=transaction.user_id,
+                transaction_id=transaction.id,
+                dataset_name=transaction.file_name,
+                requirements=transaction.user_query,
+                dashboard_code=(await analysis_result.awaitable_attrs.dashboard_code_blob).text(),
+                cleaning_profile=analysis_result.cleaning_profile
+            )
+        except Exception as e:
+            return JSONResponse({"error": str(e)}, status_code=500)
+
+    return await _idempotent(db, current_user.id, idempotency_key, "dashboard", requirements, file, submit, 200)
+
+
+@router.get("/history", response_model=AnalysisHistoryPage)
+async def get_analysis_history(
+    token: str = Depends(oauth2_scheme),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = Query(None, description="next_cursor from the previous page"),
     db: AsyncSession = Depends(get_db)
 ):
-    print("Received analysis request")
+    """The current user's analyses, newest first."""
     user_services = UserServices(db)
     current_user = await user_services.get_current_user(token)
     if not current_user:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    # Save file
     try:
-        file_path = save_file(file, str(current_user.id))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"File error: {str(e)}")
+        before = decode_cursor(cursor) if cursor else None
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    print("File saved at:", file_path)
-    # Store in DB
     transaction_service = TransactionService(db)
-    transaction = await transaction_service.create_transaction(
-        user_id=current_user.id,
-        file_name=file.filename,
-        file_path=file_path,
-        user_query=requirements,
-    )
+    rows, has_more = await transaction_service.list_history(user_id=current_user.id, limit=limit, before=before)
+    items = [
+        AnalysisHistoryItem(
+            transaction_id=row.id,
+            dataset_name=row.file_name,
+            requirements=row.user_query,
+            uploaded_at=row.uploaded_at,
+            dataset_version=row.dataset_version,
+            result_count=row.result_count,
+            dashboard_count=row.dashboard_count,
+            last_generated_at=max(filter(None, (row.last_result_at, row.last_dashboard_at)), default=None),
+        )
+        for row in rows
+    ]
+    next_cursor = encode_cursor(rows[-1].uploaded_at, rows[-1].id) if has_more else None
+    return AnalysisHistoryPage(items=items, next_cursor=next_cursor)
+
 
+@router.post("/{requirement_id}/append", status_code=201, response_model=DatasetAppendOut)
+async def append_dataset_rows(
+    requirement_id: int,
+    token: str = Depends(oauth2_scheme),
+    file: UploadFile = None,
+    db: AsyncSession = Depends(get_db)
+):
     """
-    Upload dataset + requirements.
-    Performs basic EDA and stores transaction.
+    Append new rows to an analysed dataset. The rows are cleaned with the
+    statistics fitted on the original upload and stored, as uploaded and
+    cleaned, as the next version. 422 when the columns differ or the rows
+    drifted from the fitted data.
     """
+    user_services = UserServices(db)
+    current_user = await user_services.get_current_user(token)
+    if not current_user:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+
+    transaction_service = TransactionService(db)
+    transaction = await transaction_service.get_transaction(requirement_id)
+    if not transaction or transaction.user_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Transaction not found")
 
-    print("Transaction created with ID:", transaction.id)
     try:
-        analysis_service = AnalysisService(db)
-        analysis_result = await analysis_service.generate_dashboard_code(requirement_id=transaction.id)
+        file_path = save_file(file, f"{current_user.id}_{requirement_id}_append")
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"File error: {str(e)}")
 
+    try:
+        ticket = _admit(current_user.id, file_path)
+    except HTTPException:
+        remove_file(file_path)
+        raise
 
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Analysis error: {str(e)}")
+    analysis_service = AnalysisService(db)
     try:
+        with ticket:
+            result = await ticket.run(analysis_service.append_rows(transaction=transaction, file_path=file_path))
+    except DatasetNotReady as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except AppendConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except (SchemaMismatch, DatasetDrift) as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    finally:
+        # the rows now live in the dataset artifact
+        remove_file(file_path)
 
-        # await db.refresh(analysis_result)
-        await db.refresh(transaction)
-        return AnalysisTransactionOut(
-            user_id=transaction.user_id,
-            transaction_id=transaction.id,
-            dataset_name=transaction.file_name,
-            requirements=transaction.user_query,
-            dashboard_code=analysis_result.dashboard_code
-        )
-    except Exception as e:
-        return JSONResponse({"error": str(e)}, status_code=500)
+    logger.info("appended %d rows to requirement %d as version %d",
+                result["rows_appended"], requirement_id, result["dataset_version"])
+    return DatasetAppendOut(**result)
 
 
 @router.get("/dataset/{requirement_id}", status_code=200)
 async def get_dataset_preview(
     requirement_id: int,
+    since_version: int = Query(0, ge=0, description="Only return rows added after this dataset version"),
+    cleaned: bool = Query(False, description="Rows cleaned with the dataset's recipe instead of as uploaded"),
     # token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
 ):
@@ -148,6 +310,19 @@ async def get_dataset_preview(
     # if not transaction or transaction.user_id != current_user.id:
     #     raise HTTPException(status_code=404, detail="Transaction not found")
 
+    if transaction and transaction.dataset_version:
+        # versioned copy of the uploaded rows; clients poll with the X-Dataset-Version they last saw
+        try:
+            available = dataset_store.versions(requirement_id)
+            current = available[-1] if available else 0
+            df = dataset_store.read_since(requirement_id, since_version, up_to_version=current, cleaned=cleaned)
+            # same placeholders as the CSV path below; categories (cleaned parts) cannot take a new value
+            df = df.astype({col: object for col in df.select_dtypes("category").columns})
+            df = df.replace([np.inf, -np.inf], np.nan).fillna(0)
+            body = df.to_json(orient="records", date_format="iso") if not df.empty else "[]"
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"File read error: {str(e)}")
+        return Response(content=body, media_type="application/json", headers={"X-Dataset-Version": str(current)})
 
     try:
         df = pd.read_csv(transaction.file_path)
@@ -164,5 +339,5 @@ async def get_dataset_preview(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File read error: {str(e)}")
 
-    return JSONResponse(content=data)
+    return JSONResponse(content=data, headers={"X-Dataset-Version": "0"})
     # return preview
\ No newline at end of file
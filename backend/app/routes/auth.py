@@ -6,7 +6,7 @@ from app.schemas.user import UserOut, UserCreate
 from app.schemas.auth import TokenPair, RefreshRequest
 from app.services.auth import AuthService
 from app.models.user import User 
-from app.core.security import decode_jwt
+from app.core.security import PasswordHasherBusy, decode_jwt
 from app.services.user import UserServices
 from app.services.token import TokenServices
 
@@ -18,17 +18,15 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 @router.post("/register", response_model=UserOut, status_code=201)
 async def register(payload: UserCreate, db: AsyncSession = Depends(get_db)):
     service = AuthService(db)
-    print(service)
     try:
         user = await service.register_user(email=payload.email, password=payload.password, full_name=payload.full_name)
         await db.commit()
-        await db.refresh(user)
-        print(user)
-        print(user.email)
         return UserOut.model_validate(user, from_attributes=True)
     except ValueError as e:
         await db.rollback()
         raise HTTPException(status_code=400, detail=str(e))
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
     
 
 @router.post("/login", response_model=TokenPair)
@@ -41,6 +39,8 @@ async def login(form: OAuth2PasswordRequestForm = Depends(), db: AsyncSession =
     except ValueError as e:
         await db.rollback()
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail=str(e))
+    except PasswordHasherBusy as e:
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e), headers={"Retry-After": "1"})
 
 
 
@@ -59,14 +59,11 @@ async def refresh_tokens(payload: RefreshRequest, db: AsyncSession = Depends(get
 
 @router.get("/me", response_model=UserOut)
 async def read_me( token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db),):
-    # Minimal inline validation to avoid circular deps; alternatively, use deps.get_current_user
-    
-    payload = decode_jwt(token)
-    if not payload or payload.get("type") != "access":
-        raise HTTPException(status_code=401, detail="Invalid token")
-
     repo = UserServices(db)
-    user = await repo.get(int(payload["sub"]))
+    # same token check, cache and inactive-user rule as every other authenticated route
+    current_user = await repo.get_current_user(token)
+    # the cached snapshot only has id/email/is_active; the profile needs the full row
+    user = await repo.get(current_user.id)
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
     return user
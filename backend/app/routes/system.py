@@ -0,0 +1,57 @@
+import hmac
+
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.auth_cache import CachedUser
+from app.core.config import settings
+from app.core.metrics import registry
+from app.core.security import password_hasher
+from app.db.pool_metrics import metrics
+from app.db.session import engine, get_db
+from app.services.user import UserServices
+from app.utils.scheduler import analysis_scheduler
+
+oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+
+
+async def require_admin(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> CachedUser:
+    # capacity and saturation figures tell a client exactly when the 429/503 limits bite
+    user = await UserServices(db).get_current_user(token)
+    if user.id not in settings.ADMIN_USER_IDS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Not allowed")
+    return user
+
+
+async def require_metrics_reader(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)) -> None:
+    # /metrics carries the same saturation gauges; a scraper has no user, so it may present METRICS_TOKEN
+    if settings.METRICS_TOKEN and hmac.compare_digest(token.encode(), settings.METRICS_TOKEN.encode()):
+        return
+    await require_admin(token, db)
+
+
+router = APIRouter(prefix="/system", tags=["system"], dependencies=[Depends(require_admin)])
+
+# the same gauges on /metrics, read at scrape time
+registry.gauge("db_pool_checked_out", "Connections currently checked out of the pool.", lambda: engine.pool.checkedout())
+registry.gauge("db_pool_waiting", "Callers waiting for a pool connection.", lambda: metrics.waiting)
+registry.gauge("password_hash_pending", "bcrypt calls queued or running.", lambda: password_hasher().pending)
+
+
+@router.get("/db-pool")
+async def db_pool_stats():
+    """Connection pool gauges (checked out, waiting, overflow) and checkout latency."""
+    return metrics.snapshot(engine.pool)
+
+
+@router.get("/password-hasher")
+async def password_hasher_stats():
+    """bcrypt executor: pending/running calls, rejections, queue wait and hash time."""
+    return password_hasher().stats()
+
+
+@router.get("/analysis-scheduler")
+async def analysis_scheduler_stats():
+    """Analysis slots in use, queue depth and cost, rejections by reason and queue wait."""
+    return analysis_scheduler().stats()
@@ -17,6 +17,29 @@ class AnalysisTransactionOut(BaseModel):
     dataset_name: str
     requirements: str
     dashboard_code: str
+    cleaning_profile: Optional[List[dict]] = None
 
     class Config:
-        orm_mode = True
\ No newline at end of file
+        orm_mode = True
+
+
+class DatasetAppendOut(BaseModel):
+    requirement_id: int
+    dataset_version: int
+    rows_appended: int
+    rows_cleaned: int  # rows_appended minus the rows cleaning dropped (blanks, duplicates)
+
+class AnalysisHistoryItem(BaseModel):
+    transaction_id: int
+    dataset_name: str
+    requirements: str
+    uploaded_at: datetime
+    dataset_version: int
+    result_count: int
+    dashboard_count: int
+    last_generated_at: Optional[datetime] = None
+
+
+class AnalysisHistoryPage(BaseModel):
+    items: List[AnalysisHistoryItem]
+    next_cursor: Optional[str] = None  # pass back as ?cursor= for the next page; None on the last page
@@ -0,0 +1,73 @@
+from pydantic import BaseModel, Field
+from typing import Any, Literal, Optional, List
+
+
+GRAPH_TYPES = (
+    "bar",
+    "grouped_bar",
+    "stacked_bar",
+    "full_stacked_bar",
+    "line",
+    "dual_line",
+    "bar_line",
+    "area",
+    "scatter",
+    "bubble",
+    "pie",
+    "donut",
+    "histogram",
+    "box",
+    "heatmap",
+    "radar",
+)
+AGGREGATIONS = ("sum", "avg", "count", "min", "max", "none")
+
+GraphType = Literal[GRAPH_TYPES]
+Aggregation = Literal[AGGREGATIONS]
+
+
+class GraphAxis(BaseModel):
+    feature: str
+    aggregation: Aggregation = "none"
+    label: Optional[str] = None
+
+
+class GraphXAxis(GraphAxis):
+    bin_size: Optional[int] = None
+
+
+class GraphFilter(BaseModel):
+    feature: str
+    condition: str
+    value: Any = None
+
+
+class GraphParams(BaseModel):
+    stacked: bool = False
+    normalized: bool = False
+    show_trendline: bool = False
+    bins: Optional[int] = None
+
+
+class GraphSpec(BaseModel):
+    title: str
+    graph_type: GraphType
+    x_axis: GraphXAxis
+    y_axis: Optional[GraphAxis] = None  # pie/histogram specs often only have one axis
+    group_by: Optional[str] = None
+    filters: List[GraphFilter] = Field(default_factory=list)
+    color_scheme: Optional[str] = None
+    additional_params: GraphParams = Field(default_factory=GraphParams)
+
+    def features(self) -> List[str]:
+        names = [self.x_axis.feature]
+        if self.y_axis is not None:
+            names.append(self.y_axis.feature)
+        if self.group_by:
+            names.append(self.group_by)
+        names.extend(f.feature for f in self.filters)
+        return names
+
+
+class GraphSuggestions(BaseModel):
+    graphs: List[GraphSpec]
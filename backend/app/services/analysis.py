@@ -1,28 +1,53 @@
+import asyncio
 from app.db.session import get_db
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.utils.data_cleaning import clean_pipeline
+from app.core.config import settings
+from app.core.tracing import span
+from app.utils.data_cleaning import StageHook, StageProfiler, StageSpans
+from app.utils import dataset_store
+from app.utils.cleaning_recipe import (
+    RECIPE_VERSION, CleaningRecipe, RecipeNotApplicable, clean_with_recipe, file_digest, schema_fingerprint, transform,
+)
+from app.models.analysis import Analysis_Requirement
 from app.services.transaction import TransactionService
-from app.utils.llms import llm, get_graphs_suggestions_llm, generate_dashboard, generate_graphs_dashboard
+from app.utils.llms import get_llm, get_graphs_suggestions_llm, generate_dashboard, generate_graphs_dashboard
 import pandas as pd
 
 
+class DatasetNotReady(Exception):
+    pass
+
+
+class SchemaMismatch(Exception):
+    pass
+
+
+class DatasetDrift(Exception):
+    """The new rows differ too much from the data the recipe was fitted on."""
+
+
+class AppendConflict(Exception):
+    pass
+
+
 class AnalysisService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.transaction_service = TransactionService(db)
     
-    async def perform_analysis(self, *, requirement_id: str = None):
-        # fetch transaction details
-        transaction = await self.transaction_service.get_transaction(requirement_id)
+    async def perform_analysis(self, *, transaction: Analysis_Requirement):
+        # the route's loaded requirement is carried through; no re-fetch
+        requirement_id = transaction.id
         file_path = transaction.file_path
 
         # perform data cleaning
-        cleaned_df = clean_pipeline(file_path)
+        profiler = self._cleaning_profiler()
+        cleaned_df = await self._clean(transaction, hooks=self._cleaning_hooks(profiler))
         cols = cleaned_df.columns.tolist()
         user_query = transaction.user_query
 
         # get graph suggestions from LLM
-        graphs_to_plot = await get_graphs_suggestions_llm(col_names=cols, user_query=user_query, llm=llm)
+        graphs_to_plot = await get_graphs_suggestions_llm(col_names=cols, user_query=user_query, llm=get_llm())
 
         # get dataset schema
         columns = []
@@ -42,25 +67,27 @@ class AnalysisService:
         }
 
         
-        code = await generate_dashboard(dataset_schema=output, graph_suggestions=graphs_to_plot, llm=llm, requirement_id=requirement_id)
+        code = await generate_dashboard(dataset_schema=output, graph_suggestions=graphs_to_plot, llm=get_llm(), requirement_id=requirement_id)
 
         # Store analysis result in DB
         analysis_result = await self.transaction_service.create_analysis_result(
-            transaction_id=requirement_id,
+            transaction=transaction,
             graph_suggestions=graphs_to_plot,
-            dashboard_code=code
+            dashboard_code=code,
+            cleaning_profile=profiler.to_list() if profiler else None
         )
 
         return analysis_result
         
 
 
-    async def generate_dashboard_code(self, *, requirement_id: str = None):
-        transaction = await self.transaction_service.get_transaction(requirement_id)
+    async def generate_dashboard_code(self, *, transaction: Analysis_Requirement):
+        requirement_id = transaction.id
         file_path = transaction.file_path
 
         # perform data cleaning
-        cleaned_df = clean_pipeline(file_path)
+        profiler = self._cleaning_profiler()
+        cleaned_df = await self._clean(transaction, hooks=self._cleaning_hooks(profiler))
         cols = cleaned_df.columns.tolist()
         user_query = transaction.user_query
 
@@ -76,16 +103,114 @@ class AnalysisService:
             user_query=user_query,
             data_preview=df.head(1).to_dict(orient="records"),
             requirement_id=requirement_id,
-            llm=llm
+            llm=get_llm()
         )
 
         analysis_result = await self.transaction_service.create_analysis_dashboard(
-            transaction_id=requirement_id,
-            dashboard_code=code
+            transaction=transaction,
+            dashboard_code=code,
+            cleaning_profile=profiler.to_list() if profiler else None
         )
 
         return analysis_result
         
 
+    async def _clean(self, transaction, hooks=None):
+        if not transaction.schema_hash:
+            # one load of the upload gives its schema and, on the first analysis, version 1 of
+            # the dataset artifact: the uploaded rows, not the cleaned frame; appends add further versions
+            requirement_id, file_path = transaction.id, transaction.file_path
+            first_version = not transaction.dataset_version
+
+            def inspect():
+                raw = dataset_store.raw_frame(file_path)
+                if first_version:
+                    dataset_store.write_version(requirement_id, raw, 1)
+                return file_digest(file_path), schema_fingerprint(raw)
+
+            transaction.source_digest, transaction.schema_hash = await asyncio.to_thread(inspect)
+            if first_version:
+                transaction.dataset_version = 1
+
+        # a recipe fitted on these bytes or on the same columns; drift is checked when it is applied
+        stored = await self.transaction_service.find_cleaning_recipe(transaction)
+        recipe = CleaningRecipe.from_dict(stored) if stored else None
+        with span("cleaning", requirement_id=transaction.id) as s:
+            # CPU-bound; keep it off the event loop so deadlines, disconnects and other requests still get served
+            cleaned_df, recipe, reused = await asyncio.to_thread(
+                clean_with_recipe, transaction.file_path, recipe, hooks, transaction.source_digest
+            )
+            s.set(recipe="reused" if reused else "fitted", rows=len(cleaned_df))
+        if not reused or transaction.cleaning_recipe is None:
+            transaction.cleaning_recipe = recipe.to_dict()
+            # version 1 cleaned with the requirement's recipe; appends are cleaned with the same one
+            await asyncio.to_thread(dataset_store.write_version, transaction.id, cleaned_df, 1, True)
+
+        # save the recipe now and hand the connection back to the pool: the LLM calls
+        # that follow can take minutes and must not pin a connection while they run
+        await self.db.commit()
+        return cleaned_df
+
+    async def append_rows(self, *, transaction: Analysis_Requirement, file_path: str) -> dict:
+        """
+        Store the rows of file_path as the next dataset version: as uploaded,
+        like version 1, and cleaned with the statistics fitted on the analysed
+        upload. Nothing is re-fitted; rows with other columns or column types
+        are rejected, and so are rows that drifted from the fit (see
+        CleaningRecipe.check).
+        """
+        requirement_id = transaction.id
+        if not transaction.cleaning_recipe or not transaction.dataset_version:
+            raise DatasetNotReady("Dataset has not been analysed yet")
+        recipe = CleaningRecipe.from_dict(transaction.cleaning_recipe)
+        if recipe.version != RECIPE_VERSION:
+            raise DatasetNotReady("Dataset was cleaned with an older recipe; analyse it again before appending")
+
+        # nothing is pending; end the read transaction so no connection is held while parsing
+        await self.db.commit()
+        with span("append", requirement_id=requirement_id) as s:
+            # parsing, cleaning and the Parquet writes are CPU-bound; keep them off the event loop
+            df = await asyncio.to_thread(dataset_store.raw_frame, file_path)
+            if schema_fingerprint(df) != recipe.schema_hash:
+                raise SchemaMismatch("Columns do not match the existing dataset")
+            try:
+                cleaned = await asyncio.to_thread(transform, df, recipe)
+            except RecipeNotApplicable as e:
+                raise DatasetDrift(f"New rows differ from the analysed data: {e}")
+            staged = await asyncio.to_thread(dataset_store.stage_part, requirement_id, df)
+            staged_cleaned = await asyncio.to_thread(dataset_store.stage_part, requirement_id, cleaned)
+            s.set(rows=len(df), rows_cleaned=len(cleaned))
+
+        version = await self.transaction_service.claim_dataset_version(transaction)
+        if version is None:
+            dataset_store.discard_part(staged)
+            dataset_store.discard_part(staged_cleaned)
+            raise AppendConflict("Another append is in progress, retry")
+        # the version becomes visible with its raw part, so the cleaned one goes first
+        dataset_store.publish_part(staged_cleaned, requirement_id, version, cleaned=True)
+        dataset_store.publish_part(staged, requirement_id, version)
+        return {
+            "requirement_id": requirement_id,
+            "dataset_version": version,
+            "rows_appended": len(df),
+            "rows_cleaned": len(cleaned),
+        }
+
+    @staticmethod
+    def _cleaning_profiler() -> StageProfiler | None:
+        if not settings.CLEANING_PROFILE_ENABLED:
+            return None
+        return StageProfiler(
+            trace_memory=settings.CLEANING_PROFILE_TRACE_MEMORY,
+            memory_usage=settings.CLEANING_PROFILE_MEMORY_USAGE,
+        )
+
+    @staticmethod
+    def _cleaning_hooks(profiler: StageProfiler | None) -> list[StageHook] | None:
+        hooks = [profiler] if profiler else []
+        if settings.TELEMETRY_ENABLED:
+            hooks.append(StageSpans())
+        return hooks or None
+
     def get_tableau_file(self, *, file_path:str):
         pass
\ No newline at end of file
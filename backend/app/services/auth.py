@@ -1,7 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import timedelta, datetime, timezone
 from app.core.config import settings
-from app.core.security import hash_password, verify_password, create_jwt_token
+from app.core.security import create_jwt_token, decode_jwt, hash_password_async, verify_and_update_password_async
 from app.services.user import UserServices
 from app.services.token import TokenServices
 from app.models.user import User
@@ -15,10 +15,11 @@ class AuthService:
 
 
     async def register_user(self, *, email: str, password: str, full_name: str | None) -> User:
+        # hash before the lookup so no connection is checked out while bcrypt runs
+        hpw = await hash_password_async(password)
         existing = await self.users.get_by_email(email)
         if existing:
             raise ValueError("Email already registered")
-        hpw = hash_password(password)
         user = await self.users.create(email=email, hashed_password=hpw, full_name=full_name)
         return user
 
@@ -27,8 +28,12 @@ class AuthService:
         user = await self.users.get_by_email(email)
         if not user:
             raise ValueError("Invalid credentials")
-        if not verify_password(password, user.hashed_password):
+        valid, new_hash = await verify_and_update_password_async(password, user.hashed_password)
+        if not valid:
             raise ValueError("Invalid credentials")
+        if new_hash:
+            # BCRYPT_ROUNDS changed since this hash was made; saved with the login's commit
+            user.hashed_password = new_hash
         access = create_jwt_token(
             subject=str(user.id),
             expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
@@ -50,10 +55,10 @@ class AuthService:
 
 
     async def refresh_tokens(self, *, refresh_token: str) -> tuple[str, str]:
-        rec = await self.tokens.get_valid(refresh_token)
-        if not rec:
+        payload = decode_jwt(refresh_token)
+        if not payload or payload.get("type") != "refresh":
             raise ValueError("Invalid refresh token")
-        user_id = str(rec.user_id)
+        user_id = str(payload["sub"])
         access = create_jwt_token(
             subject=user_id,
             expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES),
@@ -65,11 +70,13 @@ class AuthService:
             expires_delta=refresh_exp,
             token_type="refresh",
         )
-        # Rotate: revoke old, store new
-        await self.tokens.revoke(refresh_token)
-        await self.tokens.store_refresh(
+        # Rotate: revoke old, store new; fails if the old one was revoked, expired or unknown
+        rotated = await self.tokens.rotate(
             user_id=int(user_id),
-            token=new_refresh,
+            old_token=refresh_token,
+            new_token=new_refresh,
             expires_at=datetime.now(timezone.utc) + refresh_exp,
         )
-        return access, new_refresh
\ No newline at end of file
+        if not rotated:
+            raise ValueError("Invalid refresh token")
+        return access, new_refresh
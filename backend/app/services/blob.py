@@ -0,0 +1,108 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core import metrics
+from app.models.blob import Content_Blob
+# the tables pointing at Content_Blob must be in the metadata before the purge looks for references
+import app.models.analysis, app.models.idempotency  # noqa: F401,E401
+
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+logger = logging.getLogger(__name__)
+
+
+def _referencing_columns() -> list:
+    # every foreign key to Content_Blob.sha256 in the metadata, so a new artifact table is covered without edits here
+    target = Content_Blob.__table__.c.sha256
+    return [
+        fk.parent
+        for table in Content_Blob.metadata.tables.values()
+        for fk in table.foreign_keys
+        if fk.column is target
+    ]
+
+
+class BlobService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def put(self, *blobs: Content_Blob) -> list[Content_Blob]:
+        """
+        Store blobs built with Content_Blob.from_text/from_json in one round trip.
+        Content that is already stored only has its last_used_at refreshed (rows
+        are immutable), so concurrent writers of the same content do not
+        conflict, and the purge does not delete a row about to be referenced.
+        Not committed.
+        """
+        unique = {blob.sha256: blob for blob in blobs if blob is not None}
+        if not unique:
+            return list(blobs)
+        rows = [
+            {c.name: getattr(blob, c.key) for c in Content_Blob.__table__.columns}
+            for blob in unique.values()
+        ]
+        insert = _UPSERT_DIALECTS.get(self.db.bind.dialect.name)
+        if insert is not None:
+            stmt = insert(Content_Blob.__table__)
+            await self.db.execute(
+                stmt.on_conflict_do_update(index_elements=["sha256"], set_={"last_used_at": stmt.excluded.last_used_at}),
+                rows,
+            )
+        else:
+            existing = set((await self.db.execute(
+                select(Content_Blob.sha256).where(Content_Blob.sha256.in_(unique))
+            )).scalars())
+            if existing:
+                await self.db.execute(
+                    update(Content_Blob)
+                    .where(Content_Blob.sha256.in_(existing))
+                    .values(last_used_at=datetime.now(timezone.utc))
+                )
+            new_rows = [row for row in rows if row["sha256"] not in existing]
+            if new_rows:
+                await self.db.execute(Content_Blob.__table__.insert(), new_rows)
+        return list(blobs)
+
+    async def get(self, sha256: str) -> Content_Blob | None:
+        return await self.db.get(Content_Blob, sha256)
+
+    async def purge_unreferenced(self, *, batch_size: int, grace_seconds: float) -> int:
+        """
+        Delete blobs no row points at any more (deleted requirements, expired
+        idempotency keys...) and that nobody has put for `grace_seconds`,
+        committing every `batch_size` rows.
+        """
+        unreferenced = [~exists().where(col == Content_Blob.sha256) for col in _referencing_columns()]
+        removed = 0
+        while True:
+            stale = Content_Blob.last_used_at < datetime.now(timezone.utc) - timedelta(seconds=grace_seconds)
+            batch = select(Content_Blob.sha256).where(stale, *unreferenced).limit(batch_size).scalar_subquery()
+            res = await self.db.execute(
+                # stale is checked again on the row itself: a concurrent put may have just refreshed it
+                delete(Content_Blob).where(Content_Blob.sha256.in_(batch), stale).execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+            removed += res.rowcount
+            if res.rowcount < batch_size:
+                return removed
+            await asyncio.sleep(0)  # let request handlers in between batches
+
+
+async def purge_blobs_forever(session_factory: sessionmaker, *, interval: float, batch_size: int, grace_seconds: float) -> None:
+    """Background task started by the app lifespan."""
+    while True:
+        try:
+            async with session_factory() as db:
+                removed = await BlobService(db).purge_unreferenced(batch_size=batch_size, grace_seconds=grace_seconds)
+            metrics.purged_rows.inc(removed, table=Content_Blob.__tablename__)
+            if removed:
+                logger.info("purged %d unreferenced blobs", removed)
+        except Exception:
+            logger.exception("blob purge failed")
+        await asyncio.sleep(interval)
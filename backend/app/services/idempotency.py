@@ -0,0 +1,248 @@
+import asyncio
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable
+
+from fastapi import Response, UploadFile
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+from sqlalchemy import delete, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core import metrics
+from app.core.config import settings
+from app.models.blob import Content_Blob
+from app.models.idempotency import Idempotency_Key
+from app.services.blob import BlobService
+
+
+_UPSERT_DIALECTS = {"postgresql": postgresql.insert, "sqlite": sqlite.insert}
+MAX_KEY_LENGTH = 255
+logger = logging.getLogger(__name__)
+
+# submissions running in this process, by (user id, key): (request hash, future of (status, body))
+_in_flight: dict[tuple[int, str], tuple[str, asyncio.Future]] = {}
+
+
+class IdempotencyKeyInvalid(ValueError):
+    pass
+
+
+class IdempotencyMismatch(Exception):
+    """The key was already used for a different submission."""
+
+
+class IdempotencyInProgress(Exception):
+    """The first submission with this key is still running in another process."""
+
+
+def fingerprint(endpoint: str, fields: dict, file: UploadFile | None) -> str:
+    """sha256 of everything that makes a submission: endpoint, form fields, file name and bytes."""
+    digest = hashlib.sha256()
+    digest.update(json.dumps([endpoint, fields], sort_keys=True).encode("utf-8"))
+    if file is not None:
+        digest.update(b"\0" + (file.filename or "").encode("utf-8") + b"\0")
+        while chunk := file.file.read(1 << 20):
+            digest.update(chunk)
+        file.file.seek(0)  # still to be saved by the first submission
+    return digest.hexdigest()
+
+
+def replay(status: int, body: Any) -> Response:
+    headers = {"Idempotent-Replayed": "true"}
+    if body is None:
+        return Response(status_code=status, headers=headers)
+    return JSONResponse(body, status_code=status, headers=headers)
+
+
+def _outcome(result: Any, status_code: int) -> tuple[int, Any]:
+    if isinstance(result, BaseModel):
+        return status_code, result.model_dump(mode="json")
+    if isinstance(result, JSONResponse):
+        return result.status_code, json.loads(result.body)
+    if isinstance(result, Response):
+        return result.status_code, None
+    return status_code, result
+
+
+class IdempotencyService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def run(
+        self,
+        *,
+        user_id: int,
+        key: str | None,
+        request_hash: Callable[[], str],
+        call: Callable[[], Awaitable[Any]],
+        status_code: int = 200,
+    ) -> Any:
+        """
+        Run ``call`` once per (user, key). A repeat with the same request hash
+        gets the first submission's response, waiting for it if it is still
+        running in this process. Only 2xx responses are kept; after a failure
+        the key can be retried. Without a key ``call`` simply runs.
+        ``request_hash`` is called in a worker thread.
+        """
+        if key is None:
+            return await call()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            raise IdempotencyKeyInvalid(f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        slot = (user_id, key)
+        # hashes the whole upload; keep it off the event loop like the other file work
+        request_hash = await asyncio.to_thread(request_hash)
+        running = _in_flight.get(slot)
+        if running is not None:
+            if running[0] != request_hash:
+                raise IdempotencyMismatch("Idempotency-Key was already used for a different request")
+            # shielded: this caller going away must not cancel the first submission
+            await asyncio.wait({running[1]})
+            if running[1].cancelled():
+                raise IdempotencyInProgress("The original request was abandoned; retry")
+            return replay(*running[1].result())
+
+        future = asyncio.get_running_loop().create_future()
+        # nobody may be waiting; do not log "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        _in_flight[slot] = (request_hash, future)
+        try:
+            stored = await self._claim(user_id, key, request_hash)
+            if stored is not None:
+                future.set_result(stored)
+                return replay(*stored)
+            try:
+                result = await call()
+            except BaseException as e:
+                await self._forget(user_id, key)
+                if isinstance(e, asyncio.CancelledError):
+                    future.cancel()
+                else:
+                    future.set_exception(e)
+                raise
+            status, body = _outcome(result, status_code)
+            if 200 <= status < 300:
+                await self._complete(user_id, key, status, body)
+            else:
+                await self._forget(user_id, key)
+            future.set_result((status, body))
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            _in_flight.pop(slot, None)
+
+    async def _claim(self, user_id: int, key: str, request_hash: str) -> tuple[int, Any] | None:
+        """Take the key (None), or return the stored (status, body) of its completed submission."""
+        now = datetime.now(timezone.utc)
+        row = {
+            "user_id": user_id,
+            "key": key,
+            "request_hash": request_hash,
+            "status": "pending",
+            "response_status": None,
+            "response_sha": None,
+            "created_at": now,
+            "expires_at": now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS),
+        }
+        insert = _UPSERT_DIALECTS.get(self.db.bind.dialect.name)
+        if insert is not None:
+            stmt = insert(Idempotency_Key).values(row).on_conflict_do_nothing(index_elements=["user_id", "key"])
+            claimed = (await self.db.execute(stmt.returning(Idempotency_Key.id))).first() is not None
+        else:
+            claimed = False
+        # committed now so other workers see the key while this one runs
+        await self.db.commit()
+        if claimed:
+            return None
+
+        # expired, or pending for longer than any request may run (its worker died)
+        abandoned_before = now - timedelta(seconds=settings.REQUEST_DEADLINE_SECONDS * 2)
+        reusable = (Idempotency_Key.expires_at <= now) | (
+            (Idempotency_Key.status == "pending") & (Idempotency_Key.created_at < abandoned_before)
+        )
+        mine = (Idempotency_Key.user_id == user_id) & (Idempotency_Key.key == key)
+        existing = (await self.db.execute(
+            select(Idempotency_Key.request_hash, Idempotency_Key.status, Idempotency_Key.response_status,
+                   Idempotency_Key.response_sha, reusable.label("reusable"))
+            .where(mine)
+        )).first()
+        if existing is None or existing.reusable:
+            taken = await self.db.execute(
+                update(Idempotency_Key).where(mine, reusable).values(row)
+                if existing is not None
+                else Idempotency_Key.__table__.insert().values(row)
+            )
+            await self.db.commit()
+            if taken.rowcount == 1:
+                return None
+            raise IdempotencyInProgress("A request with this Idempotency-Key is in progress")
+
+        if existing.request_hash != request_hash:
+            raise IdempotencyMismatch("Idempotency-Key was already used for a different request")
+        if existing.status != "completed":
+            raise IdempotencyInProgress("A request with this Idempotency-Key is in progress")
+        blob = await BlobService(self.db).get(existing.response_sha) if existing.response_sha else None
+        return existing.response_status, blob.json() if blob else None
+
+    async def _complete(self, user_id: int, key: str, status: int, body: Any) -> None:
+        blob = Content_Blob.from_json(body) if body is not None else None
+        if blob is not None:
+            await BlobService(self.db).put(blob)
+        await self.db.execute(
+            update(Idempotency_Key)
+            .where(Idempotency_Key.user_id == user_id, Idempotency_Key.key == key)
+            .values(status="completed", response_status=status, response_sha=blob.sha256 if blob else None)
+        )
+        await self.db.commit()
+
+    async def _forget(self, user_id: int, key: str) -> None:
+        # the failed submission may have left the session mid-transaction
+        try:
+            await self.db.rollback()
+            await self.db.execute(
+                delete(Idempotency_Key)
+                .where(Idempotency_Key.user_id == user_id, Idempotency_Key.key == key, Idempotency_Key.status == "pending")
+            )
+            await self.db.commit()
+        except Exception:
+            # the row stays pending and is taken over once abandoned
+            logger.warning("could not release idempotency key for user %s", user_id, exc_info=True)
+
+    async def purge_expired(self, *, batch_size: int) -> int:
+        """Delete expired keys, committing every `batch_size` rows."""
+        removed = 0
+        while True:
+            batch = (
+                select(Idempotency_Key.id)
+                .where(Idempotency_Key.expires_at <= datetime.now(timezone.utc))
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            res = await self.db.execute(
+                delete(Idempotency_Key).where(Idempotency_Key.id.in_(batch)).execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+            removed += res.rowcount
+            if res.rowcount < batch_size:
+                return removed
+            await asyncio.sleep(0)
+
+
+async def purge_idempotency_keys_forever(session_factory: sessionmaker, *, interval: float, batch_size: int) -> None:
+    """Background task started by the app lifespan."""
+    while True:
+        try:
+            async with session_factory() as db:
+                removed = await IdempotencyService(db).purge_expired(batch_size=batch_size)
+            metrics.purged_rows.inc(removed, table=Idempotency_Key.__tablename__)
+            if removed:
+                logger.info("purged %d expired idempotency keys", removed)
+        except Exception:
+            logger.exception("idempotency key purge failed")
+        await asyncio.sleep(interval)
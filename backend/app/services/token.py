@@ -1,42 +1,129 @@
+import asyncio
+import logging
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy import select, insert, update, delete, literal, Boolean, DateTime, LargeBinary
 from datetime import datetime, timezone
+from app.core import metrics
+from app.core.security import token_digest
 from app.models.token import RefreshToken
 from fastapi import HTTPException
 
 
+logger = logging.getLogger(__name__)
+
+
 class TokenServices:
     def __init__(self, db: AsyncSession):
         self.db = db
 
 
     async def store_refresh(self, *, user_id: int, token: str, expires_at: datetime) -> RefreshToken:
-        rec = RefreshToken(user_id=user_id, token=token, expires_at=expires_at)
+        rec = RefreshToken(user_id=user_id, token_digest=token_digest(token), expires_at=expires_at)
         self.db.add(rec)
         await self.db.flush()
-        await self.db.refresh(rec)
         return rec
 
 
     async def get_valid(self, token: str) -> RefreshToken | None:
-        res = await self.db.execute(select(RefreshToken).where(RefreshToken.token == token))
-        rec = res.scalar_one_or_none()
-        if not rec:
-            return None
-        if rec.revoked:
-            return None
-        if rec.expires_at <= datetime.now(timezone.utc):
-            return None
-        return rec
+        res = await self.db.execute(
+            select(RefreshToken).where(
+                RefreshToken.token_digest == token_digest(token),
+                RefreshToken.revoked.is_(False),
+                RefreshToken.expires_at > datetime.now(timezone.utc),
+            )
+        )
+        return res.scalar_one_or_none()
 
 
     async def revoke(self, token: str):
-        q = await self.db.execute(
-            select(RefreshToken).where(RefreshToken.token == token)
+        now = datetime.now(timezone.utc)
+        res = await self.db.execute(
+            update(RefreshToken)
+            .where(RefreshToken.token_digest == token_digest(token))
+            # expired now as well, so the purge picks it up on its next pass
+            .values(revoked=True, expires_at=now)
+            .returning(RefreshToken.id)
         )
-        db_token = q.scalar_one_or_none()
-        if not db_token:
+        if res.scalar_one_or_none() is None:
             raise HTTPException(status_code=404, detail="Token not found")
 
-        db_token.revoked = True
-        self.db.add(db_token)
\ No newline at end of file
+
+    async def rotate(self, *, user_id: int, old_token: str, new_token: str, expires_at: datetime) -> bool:
+        """Revoke `old_token` and store `new_token` in its place.
+
+        Only a live token owned by `user_id` is rotated; returns False otherwise.
+        On PostgreSQL this is one statement (an UPDATE ... RETURNING feeding the
+        INSERT), so two requests racing with the same token cannot both succeed.
+        """
+        now = datetime.now(timezone.utc)
+        revoked = (
+            update(RefreshToken)
+            .where(
+                RefreshToken.token_digest == token_digest(old_token),
+                RefreshToken.user_id == user_id,
+                RefreshToken.revoked.is_(False),
+                RefreshToken.expires_at > now,
+            )
+            .values(revoked=True, expires_at=now)
+            .returning(RefreshToken.user_id)
+        )
+        new_row = {
+            "token_digest": literal(token_digest(new_token), LargeBinary),
+            "expires_at": literal(expires_at, DateTime(timezone=True)),
+            "revoked": literal(False, Boolean),
+            "created_at": literal(now, DateTime(timezone=True)),
+        }
+
+        if self.db.bind.dialect.name == "postgresql":
+            revoked = revoked.cte("revoked")
+            stmt = (
+                insert(RefreshToken)
+                .from_select(["user_id", *new_row], select(revoked.c.user_id, *new_row.values()))
+                .returning(RefreshToken.id)
+            )
+            return (await self.db.execute(stmt)).first() is not None
+
+        # SQLite has no data-modifying CTEs: two statements in one transaction,
+        # the UPDATE (which takes the write lock) deciding whether the INSERT runs
+        if (await self.db.execute(revoked)).first() is None:
+            return False
+        await self.db.execute(
+            insert(RefreshToken).values(user_id=user_id, token_digest=token_digest(new_token),
+                                        expires_at=expires_at, revoked=False, created_at=now)
+        )
+        return True
+
+
+    async def purge_expired(self, *, batch_size: int) -> int:
+        """Delete expired (and so revoked) tokens, committing every `batch_size` rows."""
+        removed = 0
+        while True:
+            batch = (
+                select(RefreshToken.id)
+                .where(RefreshToken.expires_at <= datetime.now(timezone.utc))
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            res = await self.db.execute(
+                delete(RefreshToken).where(RefreshToken.id.in_(batch)).execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+            removed += res.rowcount
+            if res.rowcount < batch_size:
+                return removed
+            await asyncio.sleep(0)  # let request handlers in between batches
+
+
+async def purge_tokens_forever(session_factory: sessionmaker, *, interval: float, batch_size: int) -> None:
+    """Background task started by the app lifespan."""
+    while True:
+        try:
+            async with session_factory() as db:
+                removed = await TokenServices(db).purge_expired(batch_size=batch_size)
+            metrics.purged_rows.inc(removed, table=RefreshToken.__tablename__)
+            if removed:
+                logger.info("purged %d expired refresh tokens", removed)
+        except Exception:
+            logger.exception("refresh token purge failed")
+        await asyncio.sleep(interval)
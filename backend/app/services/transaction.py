@@ -1,6 +1,10 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.analysis import Analysis_Requirement, Analysis_Result, Analysis_Dashboard
-from sqlalchemy import select
+from app.models.blob import Content_Blob
+from app.services.blob import BlobService
+from datetime import datetime
+from sqlalchemy import case, func, or_, select, tuple_, update
+from sqlalchemy.orm.attributes import set_committed_value
 
 class TransactionService:
     def __init__(self, db: AsyncSession):
@@ -14,37 +18,135 @@ class TransactionService:
             user_query=user_query,
         )
         self.db.add(transaction)
+        # committed up front so the upload is on record even if the analysis fails
         await self.db.commit()
-        await self.db.refresh(transaction)
         return transaction
     
     async def get_transaction(self, transaction_id: int) -> Analysis_Requirement:
         result = (await self.db.execute(select(Analysis_Requirement).where(Analysis_Requirement.id == transaction_id))).scalars().first()
         return result
     
-    async def create_analysis_result(self, *, transaction_id: int, graph_suggestions: dict, dashboard_code: str):
-        user_id = (await self.get_transaction(transaction_id)).user_id
+    async def list_history(self, *, user_id: int, limit: int, before: tuple[datetime, int] | None = None) -> tuple[list, bool]:
+        """
+        One page of a user's requirements, newest first, with per-requirement
+        output counts. Keyset pagination: ``before`` is the (uploaded_at, id) of
+        the last row of the previous page, so every page is an index range scan
+        on (user_id, uploaded_at, id) however deep it is. Only list columns are
+        selected; generated code, graph suggestions and recipes are never read.
+        Returns (rows, has_more).
+        """
+        def per_requirement(model, column):
+            # correlated subquery, answered from the (requirement_id, created_at) index
+            return select(column).where(model.requirement_id == Analysis_Requirement.id).scalar_subquery()
+
+        stmt = (
+            select(
+                Analysis_Requirement.id,
+                Analysis_Requirement.file_name,
+                Analysis_Requirement.user_query,
+                Analysis_Requirement.uploaded_at,
+                Analysis_Requirement.dataset_version,
+                per_requirement(Analysis_Result, func.count()).label("result_count"),
+                per_requirement(Analysis_Dashboard, func.count()).label("dashboard_count"),
+                per_requirement(Analysis_Result, func.max(Analysis_Result.created_at)).label("last_result_at"),
+                per_requirement(Analysis_Dashboard, func.max(Analysis_Dashboard.created_at)).label("last_dashboard_at"),
+            )
+            .where(Analysis_Requirement.user_id == user_id)
+            .order_by(Analysis_Requirement.uploaded_at.desc(), Analysis_Requirement.id.desc())
+            .limit(limit + 1)
+        )
+        if before is not None:
+            stmt = stmt.where(tuple_(Analysis_Requirement.uploaded_at, Analysis_Requirement.id) < tuple_(*before))
+        rows = (await self.db.execute(stmt)).all()
+        return rows[:limit], len(rows) > limit
+
+    async def find_cleaning_recipe(self, transaction: Analysis_Requirement) -> dict | None:
+        """
+        The requirement's own recipe, else the latest one the same user had fitted
+        on identical bytes (transaction.source_digest), else on a file with the
+        same columns (transaction.schema_hash). Whether the recipe may clean the
+        file, drift included, is checked when it is applied.
+        """
+        if transaction.cleaning_recipe:
+            return transaction.cleaning_recipe
+        keys = []
+        if transaction.source_digest:
+            keys.append(Analysis_Requirement.source_digest == transaction.source_digest)
+        if transaction.schema_hash:
+            keys.append(Analysis_Requirement.schema_hash == transaction.schema_hash)
+        if not keys:
+            return None
+        # identical bytes first, then the newest
+        order = [case((keys[0], 0), else_=1)] if transaction.source_digest else []
+        result = await self.db.execute(
+            select(Analysis_Requirement.cleaning_recipe)
+            .where(
+                Analysis_Requirement.user_id == transaction.user_id,
+                or_(*keys),
+                Analysis_Requirement.id != transaction.id,
+                Analysis_Requirement.cleaning_recipe.isnot(None),
+            )
+            .order_by(*order, Analysis_Requirement.id.desc())
+            .limit(1)
+        )
+        return result.scalars().first()
+
+    async def claim_dataset_version(self, transaction: Analysis_Requirement) -> int | None:
+        """
+        Move the requirement to the next dataset version, unless another append got
+        there first (compare-and-set on the current version). Returns the claimed
+        version, or None on conflict.
+        """
+        current = transaction.dataset_version or 0
+        result = await self.db.execute(
+            update(Analysis_Requirement)
+            .where(Analysis_Requirement.id == transaction.id, Analysis_Requirement.dataset_version == current)
+            .values(dataset_version=current + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            await self.db.rollback()
+            return None
+        await self.db.commit()
+        # keep the loaded object in step without marking it dirty
+        set_committed_value(transaction, "dataset_version", current + 1)
+        return current + 1
+
+    async def _store_artifacts(self, row, **blobs: Content_Blob | None) -> None:
+        """Write generated artifacts to Content_Blob and point row's <name>_sha columns at them."""
+        blobs = {name: blob for name, blob in blobs.items() if blob is not None}
+        await BlobService(self.db).put(*blobs.values())
+        for name, blob in blobs.items():
+            setattr(row, f"{name}_sha", blob.sha256)
+            # already in memory; spares the lazy load when the caller reads it back
+            set_committed_value(row, f"{name}_blob", blob)
+
+    async def create_analysis_result(self, *, transaction: Analysis_Requirement, graph_suggestions: dict, dashboard_code: str, cleaning_profile: list | None = None):
         analysis_result = Analysis_Result(
-            requirement_id=transaction_id,
-            user_id=user_id,
-            graph_suggestions=graph_suggestions,
-            dashboard_code=dashboard_code
+            requirement_id=transaction.id,
+            user_id=transaction.user_id,
+            cleaning_profile=cleaning_profile
+        )
+        await self._store_artifacts(
+            analysis_result,
+            graph_suggestions=Content_Blob.from_json(graph_suggestions) if graph_suggestions is not None else None,
+            dashboard_code=Content_Blob.from_text(dashboard_code) if dashboard_code is not None else None,
         )
         self.db.add(analysis_result)
-        await self.db.commit()  
-        await self.db.refresh(analysis_result)
+        await self.db.commit()
         return analysis_result
     
 
-    async def create_analysis_dashboard(self, *, transaction_id: int, dashboard_code: str):
-        user_id = (await self.get_transaction(transaction_id)).user_id
+    async def create_analysis_dashboard(self, *, transaction: Analysis_Requirement, dashboard_code: str, cleaning_profile: list | None = None):
         analysis_dashboard = Analysis_Dashboard(
-            requirement_id=transaction_id,
-            user_id=user_id,
-            dashboard_code=dashboard_code
+            requirement_id=transaction.id,
+            user_id=transaction.user_id,
+            cleaning_profile=cleaning_profile
+        )
+        await self._store_artifacts(
+            analysis_dashboard,
+            dashboard_code=Content_Blob.from_text(dashboard_code) if dashboard_code is not None else None,
         )
         self.db.add(analysis_dashboard)
-        await self.db.commit()  
-        await self.db.refresh(analysis_dashboard)
+        await self.db.commit()
         return analysis_dashboard
-        
\ No newline at end of file
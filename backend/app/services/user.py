@@ -1,7 +1,8 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 from app.models.user import User
-from app.core.security import decode_jwt
+from app.core import auth_cache
+from app.core.auth_cache import CachedUser
 from fastapi import HTTPException, status
 
 
@@ -18,8 +19,8 @@ class UserServices:
     async def create(self, *, email: str, hashed_password: str, full_name: str | None) -> User:
         user = User(email=email, hashed_password=hashed_password, full_name=full_name)
         self.db.add(user)
+        # the INSERT returns the id; the other columns were set client-side
         await self.db.flush()
-        await self.db.refresh(user)
         return user
 
 
@@ -28,17 +29,24 @@ class UserServices:
         return res.scalar_one_or_none()
     
 
-    async def get_current_user(self, token: str):
+    async def get_current_user(self, token: str) -> CachedUser:
         """
         Use in endpoints via a security scheme (e.g., OAuth2PasswordBearer) to pass the token.
         This function expects the raw token string.
+
+        Returns a CachedUser snapshot (id, email, is_active); in steady state
+        neither the token check nor the user lookup touches the database.
         """
-        payload = decode_jwt(token)
+        payload = auth_cache.decode_jwt_cached(token)
         if not payload or payload.get("type") != "access":
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid token")
-        user_id = payload.get("sub")
-        # repo = UserServices(self.db)
-        user = await self.get(int(user_id))
-        if not user:
-            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+        user_id = int(payload.get("sub"))
+        user = auth_cache.get_user(user_id)
+        if user is None:
+            db_user = await self.get(user_id)
+            if not db_user:
+                raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+            user = auth_cache.put_user(db_user)
+        if not user.is_active:
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Inactive user")
         return user
@@ -0,0 +1,289 @@
+"""
+Fit/transform split of the cleaning pipeline.
+
+Fitting runs the normal stages and records every statistic they learn from
+the data into a JSON-serializable CleaningRecipe:
+- the target dtypes chosen by optimize_memory,
+- the missing-data plan with its fill values and the null ratio per column,
+- the IQR bounds and medians of clean_numeric, and the share of values the
+  bounds clipped.
+
+Transforming applies those values to new data with the same columns and
+column types: the same export re-uploaded with more rows, or a batch appended
+to an analysed dataset. Nothing is learned from the new rows, so the KNN
+imputation is not run; its columns get the median they had at fit time.
+Before a recipe is applied, check() compares the new rows with the fit: a
+column whose null ratio, or share of values outside the fitted bounds, moved
+by more than sampling alone explains counts as drift, and the recipe is not
+used. clean_with_recipe then fits afresh; transform() raises. The text,
+duplicate and column-name stages are stateless and run unchanged.
+"""
+import hashlib
+import json
+import logging
+import math
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+from app.utils import data_cleaning as dc
+
+
+# bump when the recipe layout or the meaning of a stored value changes
+RECIPE_VERSION = 3
+
+# drift allowed beyond sampling noise, as a share of rows (see CleaningRecipe.check)
+MAX_NULL_RATIO_SHIFT = 0.1
+MAX_OUTSIDE_BOUNDS_SHIFT = 0.1
+
+logger = logging.getLogger(__name__)
+
+
+class RecipeNotApplicable(ValueError):
+    """The recipe cannot clean these rows: other columns, or data that drifted from the fit."""
+
+    def __init__(self, reasons: list[str]):
+        super().__init__("; ".join(reasons))
+        self.reasons = reasons
+
+
+def _dtype_name(dtype) -> str:
+    if isinstance(dtype, pd.StringDtype):
+        return f"string[{dtype.storage}]"
+    return str(dtype)
+
+
+def _dtype_kind(dtype) -> str:
+    # ints and floats share a kind: an int column turns float as soon as a batch has a blank
+    if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+        return "number"
+    return _dtype_name(dtype)
+
+
+def schema_fingerprint(df: pd.DataFrame) -> str:
+    """Hash of the column names and dtype kinds of a freshly loaded file."""
+    schema = [[str(col), _dtype_kind(dtype)] for col, dtype in df.dtypes.items()]
+    return hashlib.sha256(json.dumps(schema).encode()).hexdigest()[:16]
+
+
+def file_digest(file_path: str) -> str:
+    """sha256 of the file's bytes; an upload of identical bytes is the first recipe candidate."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _to_json(value):
+    # Postgres JSON rejects NaN/Infinity, and numpy scalars are not serializable
+    if hasattr(value, "item"):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None if math.isnan(value) else ("inf" if value > 0 else "-inf")
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _from_json(value):
+    if value == "inf":
+        return math.inf
+    if value == "-inf":
+        return -math.inf
+    return value
+
+
+@dataclass
+class CleaningRecipe:
+    schema_hash: str
+    source_digest: str = ""  # file_digest of the upload the statistics were fitted on
+    columns: list = field(default_factory=list)
+    version: int = RECIPE_VERSION
+    created_at: str = field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+    dtypes: dict = field(default_factory=dict)  # column -> dtype set by optimize_memory
+    missing: dict = field(default_factory=dict)  # drop_columns / strategies / fill_values / null_ratio
+    numeric: dict = field(default_factory=dict)  # column -> {"lower", "upper", "median", "outside"}
+
+    def check(self, df: pd.DataFrame) -> list[str]:
+        """
+        Why this recipe must not clean df (freshly loaded, like the fitted
+        file); empty when it may. A shift is drift when it exceeds the allowed
+        share plus 2/sqrt(rows), a bound on what sampling alone moves a
+        proportion by, so a small batch is not rejected for a few blanks.
+        """
+        if self.version != RECIPE_VERSION:
+            return [f"recipe version {self.version} is not {RECIPE_VERSION}"]
+        if self.schema_hash != schema_fingerprint(df):
+            return ["columns or column types differ from the fitted data"]
+        if df.empty:
+            return []
+
+        noise = 2 / math.sqrt(len(df))
+        reasons = []
+        null_ratio = df.isna().mean()
+        for col, fitted in self.missing.get("null_ratio", {}).items():
+            if col in null_ratio and abs(null_ratio[col] - fitted) > MAX_NULL_RATIO_SHIFT + noise:
+                reasons.append(f"{col}: {null_ratio[col]:.0%} missing, fitted on {fitted:.0%}")
+        for col, stats in self.numeric.items():
+            if col not in df:
+                continue
+            share = _outside_share(df[col], stats["lower"], stats["upper"])
+            if share is not None and share - stats.get("outside", 0.0) > MAX_OUTSIDE_BOUNDS_SHIFT + noise:
+                reasons.append(f"{col}: {share:.0%} outside the fitted bounds, fitted on {stats.get('outside', 0.0):.0%}")
+        return reasons
+
+    def missing_plan(self) -> dc.MissingDataPlan:
+        strategies = dict(self.missing.get("strategies", {}))
+        # KNN learns from the rows it fills; new rows get the median the column had at fit time
+        strategies.update({col: "mean_or_median" for col, s in strategies.items() if s == "knn"})
+        return dc.MissingDataPlan(
+            drop_columns=list(self.missing.get("drop_columns", [])),
+            strategies=strategies,
+            fill_values=dict(self.missing.get("fill_values", {})),
+        )
+
+    def to_dict(self) -> dict:
+        data = asdict(self)
+        data["missing"] = {
+            **self.missing,
+            "fill_values": {col: _to_json(v) for col, v in self.missing.get("fill_values", {}).items()},
+        }
+        data["numeric"] = {
+            col: {key: _to_json(v) for key, v in stats.items()} for col, stats in self.numeric.items()
+        }
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "CleaningRecipe":
+        data = dict(data)
+        data["numeric"] = {
+            col: {key: _from_json(v) for key, v in stats.items()} for col, stats in data.get("numeric", {}).items()
+        }
+        return cls(**data)
+
+
+def _outside_share(series: pd.Series, lower: float, upper: float) -> float | None:
+    values = pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[np.isfinite(values)]
+    if not len(values):
+        return None
+    return float(((values < lower) | (values > upper)).mean())
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Cast to the recipe's dtypes, skipping any cast the new values do not fit."""
+    with pd.option_context("mode.copy_on_write", True):
+        df = df.copy(deep=False)
+        for col, target in dtypes.items():
+            if col not in df or _dtype_name(df[col].dtype) == target:
+                continue
+            series = df[col]
+            if target == "float32":
+                new = dc._downcast_float(series)
+            elif pd.api.types.is_integer_dtype(series.dtype) and target.lower().startswith(("int", "uint")):
+                info = np.iinfo(np.dtype(target.lower()))
+                if series.count() and (series.min() < info.min or series.max() > info.max):
+                    continue
+                new = series.astype(target)
+            elif target == "category" or target.startswith("string"):
+                if pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+                    continue
+                new = series.astype(target)
+            else:
+                continue
+            df[col] = new
+    return df
+
+
+class _RecipeStages:
+    """Stateful stand-ins for the pipeline stages that learn from the data."""
+
+    def __init__(self, candidate: CleaningRecipe | None, source_digest: str = "", required: bool = False):
+        self.candidate = candidate
+        self.source_digest = source_digest
+        self.required = required  # transform only: raise instead of fitting when the candidate does not apply
+        self.recipe: CleaningRecipe | None = None
+        self.reused = False
+
+    def optimize_memory(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.candidate is not None:
+            reasons = self.candidate.check(df)
+            if not reasons:
+                self.recipe, self.reused = self.candidate, True
+                return apply_dtypes(df, self.recipe.dtypes)
+            if self.required:
+                raise RecipeNotApplicable(reasons)
+            logger.info("cleaning recipe not reused, fitting afresh: %s", "; ".join(reasons))
+
+        self.recipe = CleaningRecipe(
+            schema_hash=schema_fingerprint(df),
+            source_digest=self.source_digest,
+            columns=[str(c) for c in df.columns],
+        )
+        report = dc.MemoryReport()
+        out = dc.optimize_memory(df, report=report)
+        self.recipe.dtypes = {col: _dtype_name(out[col].dtype) for col in report.columns}
+        return out
+
+    def handle_missing_data(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.reused:
+            return dc.apply_missing_plan(df, self.recipe.missing_plan())
+        plan = dc.plan_missing_data(df)
+        # the fallback for KNN columns when the recipe is applied to new rows
+        knn_medians = {col: df[col].median() for col in plan.columns_for("knn")}
+        out = dc.apply_missing_plan(df, plan)
+        self.recipe.missing = {
+            "drop_columns": plan.drop_columns,
+            "strategies": plan.strategies,
+            "fill_values": {**plan.fill_values, **knn_medians},
+            "null_ratio": {col: ratio for col, ratio in plan.null_ratio.items() if col not in plan.drop_columns},
+        }
+        return out
+
+    def clean_numeric(self, df: pd.DataFrame) -> pd.DataFrame:
+        if self.reused:
+            return dc.clean_numeric(df, stats=self.recipe.numeric)
+        learned: dict = {}
+        out = dc.clean_numeric(df, learned=learned)
+        for col, stats in learned.items():
+            stats["outside"] = _outside_share(df[col], stats["lower"], stats["upper"]) or 0.0
+        self.recipe.numeric = learned
+        return out
+
+    def stages(self) -> list:
+        overrides = {
+            "optimize_memory": self.optimize_memory,
+            "handle_missing_data": self.handle_missing_data,
+            "clean_numeric": self.clean_numeric,
+        }
+        return [(name, overrides.get(name, fn)) for name, fn in dc.PIPELINE_STAGES]
+
+
+def clean_with_recipe(
+    file_path: str,
+    recipe: CleaningRecipe | None = None,
+    hooks: list[dc.StageHook] | None = None,
+    source_digest: str | None = None,
+) -> tuple[pd.DataFrame, CleaningRecipe, bool]:
+    """
+    Clean file_path with recipe when it passes CleaningRecipe.check for the
+    file, and fit a new recipe (stamped with source_digest, computed when not
+    given) otherwise. Returns (cleaned frame, recipe, reused).
+    """
+    run = _RecipeStages(recipe, source_digest or file_digest(file_path))
+    df = dc.run_stages(file_path, run.stages(), hooks)
+    return df, run.recipe, run.reused
+
+
+def transform(df: pd.DataFrame, recipe: CleaningRecipe) -> pd.DataFrame:
+    """
+    Clean rows already loaded (dataset_store.raw_frame) with recipe's
+    statistics only. Raises RecipeNotApplicable when check() rejects them.
+    """
+    run = _RecipeStages(recipe, required=True)
+    for _, stage in run.stages():
+        df = stage(df)
+    return df
@@ -1,47 +1,99 @@
 import pandas as pd
 import numpy as np
+import time
+import tracemalloc
+import warnings
+from dataclasses import dataclass, field
 from datetime import datetime
-from app.utils.llms import infer_column_type_llm, llm
+from functools import lru_cache
 
+from app.core.tracing import start_span
+from app.utils.dedup import first_occurrences, row_fingerprints
 
+try:
+    import resource  # POSIX only; peak RSS is skipped elsewhere
+except ImportError:
+    resource = None
 
-# custom KNN imputer to avoid sklearn dependency
-class KNNImputer:
-    def __init__(self, n_neighbors=5):
-        self.n_neighbors = n_neighbors
-
-    def fit_transform(self, X: pd.DataFrame) -> pd.DataFrame:
-        X_filled = X.copy()
-        data = X_filled.values
 
-        # loop over all missing cells
-        for row_idx, col_idx in zip(*np.where(pd.isna(data))):
-            row = data[row_idx, :]
+@lru_cache(maxsize=1)
+def _arrow_compute():
+    # pyarrow is imported on first use so it stays off the app's import path
+    try:
+        import pyarrow
+        import pyarrow.compute
+    except ImportError:
+        return None
+    return pyarrow
 
-            # mask for rows where this column is not NaN
-            valid_mask = ~pd.isna(data[:, col_idx])
 
-            # exclude current row
-            valid_mask[row_idx] = False  
 
-            # compute distances (ignore NaNs)
-            distances = []
-            for i, candidate in enumerate(data):
-                if valid_mask[i]:
-                    mask = ~pd.isna(row) & ~pd.isna(candidate)
-                    if mask.sum() == 0:
-                        continue
-                    dist = np.linalg.norm(row[mask] - candidate[mask])
-                    distances.append((dist, candidate[col_idx]))
+# custom KNN imputer to avoid sklearn dependency
+class KNNImputer:
+    """
+    NaN-aware KNN imputation. Distances use only the coordinates observed in
+    both rows (not rescaled), rows with nothing in common are never neighbours,
+    and neighbours are always taken from the original values, so the result
+    does not depend on the order in which cells are filled.
+    """
 
-            # sort by distance and pick k nearest neighbors
-            distances.sort(key=lambda x: x[0])
-            neighbors = [val for _, val in distances[:self.n_neighbors]]
+    # upper bound on the (query rows x rows) distance block, in bytes
+    block_bytes = 64 * 1024 * 1024
 
-            if neighbors:
-                data[row_idx, col_idx] = np.mean(neighbors)
+    def __init__(self, n_neighbors=5):
+        self.n_neighbors = n_neighbors
 
-        return pd.DataFrame(data, columns=X.columns)
+    def fit_transform(self, X: pd.DataFrame, target_columns=None) -> pd.DataFrame:
+        """
+        Impute the missing cells of target_columns (default: every column) using
+        all columns of X as features. The index of X is preserved.
+        """
+        targets = list(X.columns if target_columns is None else target_columns)
+        data = X.to_numpy(dtype=np.float64, na_value=np.nan)
+        observed = ~np.isnan(data)
+        zeroed = np.where(observed, data, 0.0)
+        obs_f = observed.astype(np.float64)
+        squares = zeroed * zeroed
+
+        target_idx = [X.columns.get_loc(c) for c in targets]
+        query_rows = np.flatnonzero(~observed[:, target_idx].all(axis=1))
+        filled = data.copy()
+        if query_rows.size == 0:
+            return X.copy()
+
+        n_rows = data.shape[0]
+        step = max(1, self.block_bytes // (8 * n_rows))
+        for start in range(0, query_rows.size, step):
+            rows = query_rows[start:start + step]
+            q, qo, qs = zeroed[rows], obs_f[rows], squares[rows]
+
+            # sum over co-observed dims of (q - x)^2, expanded into three matmuls
+            dist = qs @ obs_f.T - 2.0 * (q @ zeroed.T) + qo @ squares.T
+            np.maximum(dist, 0.0, out=dist)
+            dist = np.sqrt(dist)
+            dist[(qo @ obs_f.T) == 0] = np.inf
+            dist[np.arange(rows.size), rows] = np.inf
+
+            for j in target_idx:
+                need = np.flatnonzero(~observed[rows, j])
+                if need.size == 0:
+                    continue
+                d = dist[need]
+                d[:, ~observed[:, j]] = np.inf
+                k = min(self.n_neighbors, n_rows)
+                nearest = np.argpartition(d, k - 1, axis=1)[:, :k]
+                near_d = np.take_along_axis(d, nearest, axis=1)
+                near_v = np.where(np.isfinite(near_d), data[nearest, j], np.nan)
+                with np.errstate(invalid="ignore"):
+                    counts = np.isfinite(near_d).sum(axis=1)
+                    means = np.nansum(near_v, axis=1) / np.where(counts > 0, counts, 1)
+                has = counts > 0
+                filled[rows[need[has]], j] = means[has]
+
+        out = X.copy()
+        for j, col in zip(target_idx, targets):
+            out[col] = filled[:, j]
+        return out
 
 
 # -------------------------
@@ -59,11 +111,90 @@ def load_file(file_path: str) -> pd.DataFrame:
         df = pd.read_csv(file_path, encoding="latin-1", low_memory=False)
     return df
 
+# -------------------------
+# 1b. Memory Footprint
+# -------------------------
+@dataclass
+class MemoryReport:
+    before_bytes: int = 0
+    after_bytes: int = 0
+    columns: dict = field(default_factory=dict)  # column -> [old dtype, new dtype]
+
+    def to_dict(self) -> dict:
+        return {
+            "before_kb": round(self.before_bytes / 1024, 1),
+            "after_kb": round(self.after_bytes / 1024, 1),
+            "columns": dict(self.columns),
+        }
+
+
+def _downcast_float(series: pd.Series) -> pd.Series:
+    if series.dtype != np.float64:
+        return series
+    values = series.to_numpy()
+    narrow = values.astype(np.float32)
+    # only if every value survives the round trip (inf/NaN included)
+    with np.errstate(over="ignore"):
+        if np.array_equal(narrow.astype(np.float64), values, equal_nan=True):
+            return pd.Series(narrow, index=series.index, name=series.name)
+    return series
+
+
+def optimize_memory(
+    df: pd.DataFrame,
+    category_max_ratio: float = 0.5,
+    report: MemoryReport | None = None,
+) -> pd.DataFrame:
+    """
+    Shrink the frame before the heavier stages run:
+    - integers are downcast to the smallest width that holds their range,
+    - float64 columns become float32 when that loses nothing,
+    - string columns with at most category_max_ratio distinct values per
+      non-null value become category, the rest string[pyarrow].
+    Pass a MemoryReport to get before/after sizes and the dtype changes.
+    """
+    if report is not None:
+        report.before_bytes = int(df.memory_usage(deep=True).sum())
+
+    pa = _arrow_compute()
+    with pd.option_context("mode.copy_on_write", True):
+        df = df.copy(deep=False)
+        for col, dtype in df.dtypes.items():
+            series = df[col]
+            if pd.api.types.is_bool_dtype(dtype):
+                continue
+            if pd.api.types.is_integer_dtype(dtype):
+                new = pd.to_numeric(series, downcast="integer")
+            elif pd.api.types.is_float_dtype(dtype):
+                new = _downcast_float(series)
+            elif pd.api.types.is_object_dtype(dtype) and pd.api.types.infer_dtype(series, skipna=True) == "string":
+                non_null = series.count()
+                if non_null and series.nunique() <= category_max_ratio * non_null:
+                    new = series.astype("category")
+                elif pa is not None:
+                    new = series.astype("string[pyarrow]")
+                else:
+                    continue
+            else:
+                continue
+            if new.dtype != dtype:
+                df[col] = new
+                if report is not None:
+                    report.columns[col] = [str(dtype), str(new.dtype)]
+
+    if report is not None:
+        report.after_bytes = int(df.memory_usage(deep=True).sum())
+    return df
+
+
 # -------------------------
 # 2. Data Types & Formats
 # -------------------------
 # def fix_data_types(df: pd.DataFrame) -> pd.DataFrame:
 def fix_data_types(df: pd.DataFrame, llm) -> pd.DataFrame:
+    # imported here so the cleaning stages do not pull in the LLM stack
+    from app.utils.llms import infer_column_type_llm
+
     for col in df.columns:
         
         # If dtype still object, ask Gemini
@@ -90,133 +221,374 @@ def fix_data_types(df: pd.DataFrame, llm) -> pd.DataFrame:
 # -------------------------
 # 3. Missing Data
 # -------------------------
-def handle_missing_data(df: pd.DataFrame, threshold: float = 0.5) -> pd.DataFrame:
+@dataclass
+class MissingDataPlan:
     """
-    Handle missing values in the dataset using different strategies:
-    - Drop columns if more than threshold missing.
-    - Drop rows if only few rows missing (<5% overall).
-    - Impute numeric with mean/median based on skewness.
-    - Impute categorical with mode/constant.
-    - Use forward/backward fill for datetime or time-series data.
-    - KNN imputation for moderate missing values in numeric.
+    Strategy for every column with missing values, decided once from a single
+    null mask of the input frame. Strategies: "drop_rows", "mean_or_median",
+    "knn", "mode", "unknown", "ffill_bfill", "drop_column".
+
+    fill_values holds the mean/median/mode fills. apply_missing_plan records the
+    ones it computes, and reuses any that are already there, so a fitted plan
+    can be applied to new data without recomputing them.
     """
 
-    df = df.copy()
+    null_ratio: dict[str, float] = field(default_factory=dict)
+    drop_columns: list[str] = field(default_factory=list)
+    strategies: dict[str, str] = field(default_factory=dict)
+    fill_values: dict = field(default_factory=dict)
 
-    # 1. Drop columns with too many nulls
-    null_ratio = df.isnull().mean()
-    cols_to_drop = null_ratio[null_ratio > threshold].index
-    df.drop(columns=cols_to_drop, inplace=True)
+    def columns_for(self, strategy: str) -> list[str]:
+        return [col for col, s in self.strategies.items() if s == strategy]
 
-    # 2. Iterate column-wise
-    for col in df.columns:
-        missing_ratio = df[col].isnull().mean()
 
-        if missing_ratio == 0:  # no missing values
+def plan_missing_data(df: pd.DataFrame, threshold: float = 0.5) -> MissingDataPlan:
+    null_ratio = df.isna().mean()
+    plan = MissingDataPlan(null_ratio={col: float(r) for col, r in null_ratio.items()})
+
+    for col, ratio in null_ratio.items():
+        if ratio == 0:
+            continue
+        if ratio > threshold:
+            plan.drop_columns.append(col)
             continue
 
         # Drop rows if very few nulls (<5% of dataset)
-        if missing_ratio < 0.05:
-            df = df.dropna(subset=[col])
+        if ratio < 0.05:
+            plan.strategies[col] = "drop_rows"
             continue
 
-        # Numeric Columns
-        if pd.api.types.is_numeric_dtype(df[col]):
-            if missing_ratio < 0.2:  # small missingness
-                if abs(df[col].skew()) < 1:  # normally distributed
-                    df[col].fillna(df[col].mean(), inplace=True)
-                else:  # skewed data
-                    df[col].fillna(df[col].median(), inplace=True)
-            elif missing_ratio < 0.4:  # moderate missingness
-                # KNN Imputer (only on numeric subset)
-                imputer = KNNImputer(n_neighbors=3)
-                numeric_cols = df.select_dtypes(include=[np.number]).columns
-                df[numeric_cols] = imputer.fit_transform(df[numeric_cols])
+        dtype = df[col].dtype
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            if ratio < 0.2:
+                plan.strategies[col] = "mean_or_median"
+            elif ratio < 0.4:
+                plan.strategies[col] = "knn"
             else:
-                # If still lots of missing, drop column (safety)
-                df.drop(columns=[col], inplace=True)
-
-        # Categorical Columns
-        elif pd.api.types.is_categorical_dtype(df[col]) or df[col].dtype == "object":
-            if missing_ratio < 0.4:
-                mode_val = df[col].mode()[0] if not df[col].mode().empty else "Unknown"
-                df[col].fillna(mode_val, inplace=True)
-            else:
-                df[col].fillna("Unknown", inplace=True)
+                plan.strategies[col] = "drop_column"
+        elif isinstance(dtype, pd.CategoricalDtype) or pd.api.types.is_object_dtype(dtype) \
+                or pd.api.types.is_string_dtype(dtype):
+            plan.strategies[col] = "mode" if ratio < 0.4 else "unknown"
+        elif pd.api.types.is_datetime64_any_dtype(dtype):
+            plan.strategies[col] = "ffill_bfill"
+        else:
+            plan.strategies[col] = "unknown"
 
-        # Datetime Columns
-        elif pd.api.types.is_datetime64_any_dtype(df[col]):
-            try:
-                df[col].fillna(method="ffill", inplace=True)
-                df[col].fillna(method="bfill", inplace=True)
-            except:
-                df[col].fillna(df[col].mode()[0], inplace=True)
+    return plan
 
-        # Fallback (constant value)
-        else:
-            df[col].fillna("Unknown", inplace=True)
+
+def _fill_constant(series: pd.Series, value) -> pd.Series:
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        if value not in series.cat.categories:
+            series = series.cat.add_categories([value])
+        return series.fillna(value)
+    if pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype):
+        return series.fillna(value)
+    return series.astype(object).fillna(value)
+
+
+def _keep_float_width(values: pd.Series, dtype) -> pd.Series:
+    # imputation works in float64; keep float32 columns (see optimize_memory) float32
+    return values.astype(dtype) if pd.api.types.is_float_dtype(dtype) else values
+
+
+def apply_missing_plan(df: pd.DataFrame, plan: MissingDataPlan, summaries: dict | None = None) -> pd.DataFrame:
+    """
+    Apply a plan from plan_missing_data. summaries (column -> ColumnSummary)
+    overrides the in-frame skew/mean/median used for the mean_or_median fills.
+    """
+    with pd.option_context("mode.copy_on_write", True):
+        drop = [c for c in plan.drop_columns + plan.columns_for("drop_column") if c in df]
+        df = df.drop(columns=drop) if drop else df.copy(deep=False)
+        # a fitted plan may meet new data that lacks some of its columns
+        present = lambda strategy: [c for c in plan.columns_for(strategy) if c in df]
+
+        # one row drop for every low-missing column
+        row_cols = present("drop_rows")
+        if row_cols:
+            df = df.loc[df[row_cols].notna().all(axis=1)]
+
+        # one imputation over every KNN column, with all numeric columns as features
+        knn_cols = present("knn")
+        if knn_cols and len(df):
+            numeric_cols = [c for c in df.select_dtypes(include=[np.number]).columns]
+            imputed = KNNImputer(n_neighbors=3).fit_transform(df[numeric_cols], target_columns=knn_cols)
+            for col in knn_cols:
+                df[col] = _keep_float_width(imputed[col], df[col].dtype)
+
+        # mean for roughly symmetric columns, median for skewed ones
+        stat_cols = present("mean_or_median")
+        if stat_cols:
+            numeric = df[stat_cols].astype(np.float64)
+            unknown = [c for c in stat_cols if c not in plan.fill_values]
+            if unknown:
+                skew, mean, median = numeric[unknown].skew(), numeric[unknown].mean(), numeric[unknown].median()
+                for col in unknown:
+                    if summaries and col in summaries:
+                        summary = summaries[col]
+                        skew[col], mean[col], median[col] = summary.moments.skew, summary.moments.mean, summary.median
+                skewed = skew.abs().fillna(0) >= 1
+                plan.fill_values.update(mean.where(~skewed, median).items())
+            filled = numeric.fillna({col: plan.fill_values[col] for col in stat_cols})
+            for col in stat_cols:
+                df[col] = _keep_float_width(filled[col], df[col].dtype)
+
+        for col in present("mode"):
+            if col not in plan.fill_values:
+                mode = df[col].mode()
+                plan.fill_values[col] = mode.iloc[0] if not mode.empty else "Unknown"
+            df[col] = _fill_constant(df[col], plan.fill_values[col])
+
+        for col in present("unknown"):
+            df[col] = _fill_constant(df[col], "Unknown")
+
+        for col in present("ffill_bfill"):
+            df[col] = df[col].ffill().bfill()
 
     return df
 
 
+def handle_missing_data(df: pd.DataFrame, threshold: float = 0.5) -> pd.DataFrame:
+    """
+    Handle missing values in the dataset using different strategies:
+    - Drop columns if more than threshold missing.
+    - Drop rows if only few rows missing (<5% overall).
+    - Impute numeric with mean/median based on skewness.
+    - Impute categorical with mode/constant.
+    - Use forward/backward fill for datetime or time-series data.
+    - KNN imputation for moderate missing values in numeric.
+
+    Strategies are planned from one null mask (see plan_missing_data) and then
+    applied in bulk: a single row drop, a single KNN pass, vectorized fills.
+    """
+    return apply_missing_plan(df, plan_missing_data(df, threshold))
+
+
 
 # -------------------------
 # 4. Duplicates
 # -------------------------
-def remove_duplicates(df: pd.DataFrame) -> pd.DataFrame:
-    if df.duplicated().sum() > 0:
-        df = df.drop_duplicates()
-    return df
+def remove_duplicates(df: pd.DataFrame, subset=None) -> pd.DataFrame:
+    # rows are hashed once; see app.utils.dedup for the chunked/streaming version
+    if df.empty:
+        return df
+    keep = first_occurrences(row_fingerprints(df, subset))
+    return df if keep.all() else df[keep]
 
 
 # -------------------------
-# 5. Outliers (using IQR)
+# 5. Outliers (using IQR) + Numerical Cleaning
 # -------------------------
-def handle_outliers(df: pd.DataFrame) -> pd.DataFrame:
-    numeric_cols = df.select_dtypes(include=["int64", "float64"]).columns
-    for col in numeric_cols:
-        Q1 = df[col].quantile(0.25)
-        Q3 = df[col].quantile(0.75)
-        IQR = Q3 - Q1
-        lower, upper = Q1 - 1.5 * IQR, Q3 + 1.5 * IQR
-        df[col] = np.where(df[col] < lower, lower,
-                           np.where(df[col] > upper, upper, df[col]))
+def _numeric_columns(df: pd.DataFrame) -> list:
+    return [
+        col for col, dtype in df.dtypes.items()
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+    ]
+
+
+def _write_back(values: np.ndarray, dtype, index) -> pd.Series:
+    """Cast a float64 column back to its original dtype (ints are rounded)."""
+    series = pd.Series(values, index=index)
+    if pd.api.types.is_integer_dtype(dtype):
+        series = series.round()
+        if isinstance(dtype, np.dtype) and series.isna().any():
+            return series  # plain numpy ints cannot hold NaN
+    return series.astype(dtype)
+
+
+def numeric_stats_from_summaries(summaries: dict, whisker: float = 1.5) -> dict:
+    """column -> {"lower", "upper", "median"} from sketches.ColumnSummary objects."""
+    stats = {}
+    for col, summary in summaries.items():
+        lower, upper = summary.iqr_bounds(whisker)
+        stats[col] = {"lower": float(lower), "upper": float(upper), "median": float(summary.median)}
+    return stats
+
+
+def clean_numeric(
+    df: pd.DataFrame,
+    clip_outliers: bool = True,
+    fill_missing: bool = True,
+    summaries: dict | None = None,
+    stats: dict | None = None,
+    learned: dict | None = None,
+) -> pd.DataFrame:
+    """
+    Fused numeric stage: IQR clipping, inf replacement and median fill for every
+    numeric column (any int/float width, nullable or not) in one pass over a
+    single 2D float64 block. Quartiles ignore inf/NaN; +/-inf are clipped to the
+    column bounds, anything still missing is filled with the column median.
+
+    Bounds and medians can be supplied instead of computed: summaries (column ->
+    sketches.ColumnSummary, e.g. merged from the chunks of a file too large to
+    load at once) or stats (column -> {"lower", "upper", "median"}, e.g. from a
+    fitted cleaning recipe). Pass a dict as learned to collect the stats that
+    were computed here.
+    """
+    cols = _numeric_columns(df)
+    if not cols or df.empty:
+        return df
+
+    block = df[cols].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+    stats = {**numeric_stats_from_summaries(summaries or {}), **(stats or {})}
+    known = [j for j, col in enumerate(cols) if col in stats]
+    local = [j for j, col in enumerate(cols) if col not in stats]
+    lower, upper = np.full(len(cols), -np.inf), np.full(len(cols), np.inf)
+
+    with np.errstate(invalid="ignore"), warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns
+
+        if clip_outliers:
+            if local:
+                sub = block[:, local]
+                q1, q3 = np.nanquantile(np.where(np.isfinite(sub), sub, np.nan), [0.25, 0.75], axis=0)
+                iqr = q3 - q1
+                ok = np.isfinite(iqr)
+                lower[local] = np.where(ok, q1 - 1.5 * iqr, -np.inf)
+                upper[local] = np.where(ok, q3 + 1.5 * iqr, np.inf)
+            for j in known:
+                lower[j], upper[j] = stats[cols[j]]["lower"], stats[cols[j]]["upper"]
+            np.clip(block, lower, upper, out=block)
+
+        median = np.full(len(cols), np.nan)
+        if fill_missing:
+            block[np.isinf(block)] = np.nan
+            if local:
+                median[local] = np.nanmedian(block[:, local], axis=0)
+            for j in known:
+                median[j] = stats[cols[j]]["median"]
+            median = np.clip(median, lower, upper)
+            rows, col_idx = np.nonzero(np.isnan(block))
+            block[rows, col_idx] = median[col_idx]
+
+    if learned is not None:
+        for j in local:
+            learned[cols[j]] = {"lower": float(lower[j]), "upper": float(upper[j]), "median": float(median[j])}
+
+    with pd.option_context("mode.copy_on_write", True):
+        df = df.copy(deep=False)
+        for j, col in enumerate(cols):
+            df[col] = _write_back(block[:, j], df[col].dtype, df.index)
     return df
 
 
+def handle_outliers(df: pd.DataFrame) -> pd.DataFrame:
+    return clean_numeric(df, clip_outliers=True, fill_missing=False)
+
+
 # -------------------------
 # 6. Inconsistent Values
 # -------------------------
-def fix_inconsistent_values(df: pd.DataFrame) -> pd.DataFrame:
-    for col in df.select_dtypes(include="object").columns:
-        df[col] = df[col].astype(str).str.strip().str.title()
+TEXT_NOISE_PATTERN = r"[^a-zA-Z0-9\s]"
+# RE2 (Arrow) only treats [\t\n\f\r ] as \s; these spell out Python's Unicode \s
+_ARROW_SPACE = r"\s\p{Z}\x0b\x1c-\x1f\x{85}"
+_ARROW_NOISE_PATTERN = rf"[^a-zA-Z0-9{_ARROW_SPACE}]"
+_ARROW_SPACE_RUN = rf"[{_ARROW_SPACE}]+"
+
+
+def _text_columns(df: pd.DataFrame) -> list:
+    cols = []
+    for col, dtype in df.dtypes.items():
+        if isinstance(dtype, pd.CategoricalDtype):
+            if pd.api.types.is_string_dtype(dtype.categories.dtype):
+                cols.append(col)
+        elif pd.api.types.is_object_dtype(dtype) or pd.api.types.is_string_dtype(dtype):
+            cols.append(col)
+    return cols
+
+
+def _as_text(series: pd.Series) -> pd.Series:
+    # astype(str) alone turns NaN/None into the text "nan"/"None"
+    return series.where(series.isna(), series.astype(str))
+
+
+def _clean_string_series(series: pd.Series, normalize_case: bool, strip_noise: bool) -> pd.Series:
+    pa = _arrow_compute()
+    if pa is None:
+        out = _as_text(series).str.strip()
+        if normalize_case:
+            out = out.str.title()
+        if strip_noise:
+            out = out.str.replace(TEXT_NOISE_PATTERN, "", regex=True)
+            out = out.str.replace(r"\s+", " ", regex=True).str.strip()
+        return out
+
+    try:
+        values = pa.array(series, type=pa.string(), from_pandas=True)
+    except (pa.ArrowTypeError, pa.ArrowInvalid):
+        # mixed object column (numbers, dates, ...): stringify like astype(str)
+        values = pa.array(_as_text(series), type=pa.string(), from_pandas=True)
+
+    # one chain of Arrow kernels, no Python string per cell
+    pc = pa.compute
+    values = pc.utf8_trim_whitespace(values)
+    if normalize_case:
+        values = pc.utf8_title(values)
+    if strip_noise:
+        values = pc.replace_substring_regex(values, pattern=_ARROW_NOISE_PATTERN, replacement="")
+        values = pc.replace_substring_regex(values, pattern=_ARROW_SPACE_RUN, replacement=" ")
+        values = pc.utf8_trim_whitespace(values)
+    return pd.Series(pd.arrays.ArrowStringArray(pa.chunked_array([values])), index=series.index, name=series.name)
+
+
+def _clean_categories(series: pd.Series, normalize_case: bool, strip_noise: bool) -> pd.Series:
+    # only the categories are transformed; codes are remapped if cleaning merged some
+    cats = _clean_string_series(pd.Series(series.cat.categories), normalize_case, strip_noise)
+    inverse, uniques = pd.factorize(cats.to_numpy(dtype=object), use_na_sentinel=True)
+    if len(uniques) == len(cats) and (inverse >= 0).all():
+        return series.cat.rename_categories(uniques)
+    codes = series.cat.codes.to_numpy()
+    new_codes = np.where(codes >= 0, inverse[codes], -1)
+    return pd.Series(
+        pd.Categorical.from_codes(new_codes, categories=uniques, ordered=series.cat.ordered),
+        index=series.index, name=series.name,
+    )
+
+
+def clean_strings(df: pd.DataFrame, normalize_case: bool = True, strip_noise: bool = True) -> pd.DataFrame:
+    """
+    Fused text stage (fix_inconsistent_values + clean_text): trim, title-case,
+    drop characters outside [a-zA-Z0-9 whitespace], collapse whitespace. Runs on
+    Arrow compute kernels and returns string[pyarrow] columns when pyarrow is
+    installed; categorical columns only have their categories rewritten.
+    Missing values stay missing.
+    """
+    for col in _text_columns(df):
+        series = df[col]
+        if isinstance(series.dtype, pd.CategoricalDtype):
+            df[col] = _clean_categories(series, normalize_case, strip_noise)
+        else:
+            df[col] = _clean_string_series(series, normalize_case, strip_noise)
     return df
 
 
+def fix_inconsistent_values(df: pd.DataFrame) -> pd.DataFrame:
+    return clean_strings(df, normalize_case=True, strip_noise=False)
+
+
 # -------------------------
 # 7. Numerical Cleaning
 # -------------------------
 def clean_numerical(df: pd.DataFrame) -> pd.DataFrame:
-    for col in df.select_dtypes(include=["int64", "float64"]).columns:
-        df[col] = df[col].replace([np.inf, -np.inf], np.nan).fillna(df[col].median())
-    return df
+    return clean_numeric(df, clip_outliers=False, fill_missing=True)
 
 
 # -------------------------
 # 8. Text Cleaning
 # -------------------------
 def clean_text(df: pd.DataFrame) -> pd.DataFrame:
-    for col in df.select_dtypes(include="object").columns:
-        df[col] = df[col].str.replace(r"[^a-zA-Z0-9\s]", "", regex=True)
-        df[col] = df[col].str.replace(r"\s+", " ", regex=True).str.strip()
-    return df
+    return clean_strings(df, normalize_case=False, strip_noise=True)
 
 
 # -------------------------
 # 9. Column/Feature Issues
 # -------------------------
+def normalize_column_name(col: str) -> str:
+    return col.strip().lower().replace(" ", "_")
+
+
 def fix_columns(df: pd.DataFrame) -> pd.DataFrame:
-    df.columns = [col.strip().lower().replace(" ", "_") for col in df.columns]
+    df.columns = [normalize_column_name(col) for col in df.columns]
     return df
 
 
@@ -228,23 +600,184 @@ def final_touch(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
+# -------------------------
+# Stage Instrumentation
+# -------------------------
+class StageHook:
+    """
+    Base class for clean_pipeline hooks. Override what you need; the pipeline
+    calls before_stage/after_stage around every stage and finish once at the end.
+    The input of "load_file" is a path, so before_stage gets df=None for it.
+    When a stage raises, stage_failed is called instead of after_stage, and
+    finish still runs, with the last frame that was produced (None if loading
+    failed).
+    """
+
+    def before_stage(self, name: str, df: pd.DataFrame | None) -> None:
+        pass
+
+    def after_stage(self, name: str, df: pd.DataFrame) -> None:
+        pass
+
+    def stage_failed(self, name: str, error: BaseException) -> None:
+        pass
+
+    def finish(self, df: pd.DataFrame | None) -> None:
+        pass
+
+
+def _peak_rss_kb() -> int | None:
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss  # KiB on Linux
+
+
+class StageProfiler(StageHook):
+    """
+    Records wall time, CPU time, peak RSS growth and rows/columns in and out per
+    stage. With trace_memory=True it also records the tracemalloc peak of each
+    stage, which is exact but slows allocation-heavy stages noticeably. With
+    memory_usage=True it records the deep memory usage of each stage's output
+    frame, which costs a pass over every object column.
+    """
+
+    def __init__(self, trace_memory: bool = False, memory_usage: bool = False):
+        self.trace_memory = trace_memory
+        self.memory_usage = memory_usage
+        self.stages: list[dict] = []
+        self._current: dict = {}
+        self._started_tracing = False
+
+    def before_stage(self, name, df):
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            tracemalloc.reset_peak()
+        self._current = {
+            "stage": name,
+            "rows_in": None if df is None else int(df.shape[0]),
+            "cols_in": None if df is None else int(df.shape[1]),
+            "_rss": _peak_rss_kb(),
+            "_traced": tracemalloc.get_traced_memory()[0] if self.trace_memory else None,
+            "_wall": time.perf_counter(),
+            "_cpu": time.process_time(),
+        }
+
+    def after_stage(self, name, df):
+        wall = time.perf_counter()
+        cpu = time.process_time()
+        cur = self._current
+        entry = {
+            "stage": name,
+            "wall_ms": round((wall - cur["_wall"]) * 1000, 3),
+            "cpu_ms": round((cpu - cur["_cpu"]) * 1000, 3),
+            "rows_in": cur["rows_in"],
+            "cols_in": cur["cols_in"],
+            "rows_out": int(df.shape[0]),
+            "cols_out": int(df.shape[1]),
+        }
+        rss = _peak_rss_kb()
+        if rss is not None:
+            entry["peak_rss_kb"] = rss
+            entry["rss_growth_kb"] = rss - cur["_rss"]
+        if self.memory_usage:
+            entry["frame_kb"] = round(df.memory_usage(deep=True).sum() / 1024, 1)
+        if self.trace_memory:
+            entry["traced_peak_kb"] = round((tracemalloc.get_traced_memory()[1] - cur["_traced"]) / 1024, 1)
+        self.stages.append(entry)
+
+    def finish(self, df):
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def to_list(self) -> list[dict]:
+        return list(self.stages)
+
+
+class StageSpans(StageHook):
+    """Opens a tracing span per stage, as children of whatever span is current."""
+
+    def __init__(self):
+        self._open = None
+
+    def before_stage(self, name, df):
+        self._open = start_span(f"cleaning.{name}")
+        if df is not None:
+            self._open.set(rows_in=int(df.shape[0]), cols_in=int(df.shape[1]))
+
+    def after_stage(self, name, df):
+        self._open.set(rows_out=int(df.shape[0]), cols_out=int(df.shape[1]))
+        self._open.end()
+        self._open = None
+
+    def stage_failed(self, name, error):
+        if self._open is not None:
+            self._open.end(error)
+            self._open = None
+
+    def finish(self, df):
+        # a hook raising in after_stage can leave the span open; never leak it
+        if self._open is not None:
+            self._open.end()
+            self._open = None
+
+
 # -------------------------
 # Cleaning Pipeline
 # -------------------------
-def clean_pipeline(file_path: str) -> pd.DataFrame:
-    df = load_file(file_path)
-    # df = fix_data_types(df, llm)
-    df = handle_missing_data(df)
-    df = remove_duplicates(df)
-    df = handle_outliers(df)
-    df = fix_inconsistent_values(df)
-    df = clean_numerical(df)
-    df = clean_text(df)
-    df = fix_columns(df)
-    df = final_touch(df)
+# df = fix_data_types(df, get_llm()) would run right after load_file
+PIPELINE_STAGES = [
+    ("optimize_memory", optimize_memory),  # first, so every later stage works on the smaller frame
+    ("handle_missing_data", handle_missing_data),
+    ("remove_duplicates", remove_duplicates),
+    ("clean_numeric", clean_numeric),  # handle_outliers + clean_numerical, fused
+    ("clean_strings", clean_strings),  # fix_inconsistent_values + clean_text, fused
+    ("fix_columns", fix_columns),
+    ("final_touch", final_touch),
+]
+
+
+def run_stages(file_path: str, stages: list, hooks: list[StageHook] | None = None) -> pd.DataFrame:
+    """Load file_path and run (name, fn) stages over it, calling hooks around each."""
+    if not hooks:
+        # fast path: no per-stage bookkeeping at all when nobody is listening
+        df = load_file(file_path)
+        for _, stage in stages:
+            df = stage(df)
+        return df
+
+    # finish must run even when a stage raises: StageProfiler may have started
+    # tracemalloc for the whole process and StageSpans holds the stage's span open
+    name, df = "load_file", None
+    try:
+        for hook in hooks:
+            hook.before_stage(name, None)
+        df = load_file(file_path)
+        for hook in hooks:
+            hook.after_stage(name, df)
+
+        for name, stage in stages:
+            for hook in hooks:
+                hook.before_stage(name, df)
+            df = stage(df)
+            for hook in hooks:
+                hook.after_stage(name, df)
+    except BaseException as e:
+        for hook in hooks:
+            hook.stage_failed(name, e)
+        raise
+    finally:
+        for hook in hooks:
+            hook.finish(df)
     return df
 
 
+def clean_pipeline(file_path: str, hooks: list[StageHook] | None = None) -> pd.DataFrame:
+    return run_stages(file_path, PIPELINE_STAGES, hooks)
+
+
 # Example usage
 if __name__ == "__main__":
     import os
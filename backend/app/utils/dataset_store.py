@@ -0,0 +1,107 @@
+# app/utils/dataset_store.py
+"""
+Versioned columnar storage for uploaded datasets.
+
+Each requirement gets a directory with one Parquet part per version:
+
+    {DATASET_DIR}/{requirement_id}/part-00001.parquet   <- first analysis
+    {DATASET_DIR}/{requirement_id}/part-00002.parquet   <- first append
+    ...
+
+Parts hold the rows as uploaded (see raw_frame), not the cleaned frame the
+LLM prompts are built from: dashboards are generated against the raw CSV
+preview and must get the same values back from the dataset endpoint.
+
+Next to each part, clean-NNNNN.parquet holds the same rows cleaned with the
+requirement's recipe (fitted on version 1, applied unchanged to appends).
+Versions stored before cleaned parts existed have none.
+
+Parts are written to a temporary name and renamed into place, so a reader
+never sees a half-written version. Reading "since version N" only opens the
+parts after N, which is what lets dashboards poll for the delta.
+"""
+import os
+import re
+import uuid
+
+import pandas as pd
+
+from app.core.config import settings
+from app.utils.data_cleaning import load_file
+
+
+_PART = re.compile(r"^part-(\d{5})\.parquet$")
+
+
+def dataset_dir(requirement_id: int) -> str:
+    return os.path.join(settings.DATASET_DIR, str(requirement_id))
+
+
+def part_path(requirement_id: int, version: int, cleaned: bool = False) -> str:
+    prefix = "clean" if cleaned else "part"
+    return os.path.join(dataset_dir(requirement_id), f"{prefix}-{version:05d}.parquet")
+
+
+def versions(requirement_id: int) -> list[int]:
+    try:
+        names = os.listdir(dataset_dir(requirement_id))
+    except FileNotFoundError:
+        return []
+    return sorted(int(m.group(1)) for m in map(_PART.match, names) if m)
+
+
+def raw_frame(file_path: str) -> pd.DataFrame:
+    """
+    The upload as read_csv/read_excel returns it, with only the coercion Parquet
+    needs: column names become strings, and object columns mixing types
+    (numbers and text, ...) become text. Missing values stay missing.
+    """
+    df = load_file(file_path)
+    df.columns = [str(col) for col in df.columns]
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_object_dtype(series.dtype) and pd.api.types.infer_dtype(series, skipna=True) not in ("string", "empty"):
+            df[col] = series.where(series.isna(), series.astype(str))
+    return df
+
+
+def stage_part(requirement_id: int, df: pd.DataFrame) -> str:
+    """Write df next to the parts under a temporary name; publish it with publish_part."""
+    os.makedirs(dataset_dir(requirement_id), exist_ok=True)
+    tmp = os.path.join(dataset_dir(requirement_id), f".staged-{uuid.uuid4().hex}.parquet")
+    df.to_parquet(tmp, index=False)
+    return tmp
+
+
+def publish_part(staged_path: str, requirement_id: int, version: int, cleaned: bool = False) -> str:
+    path = part_path(requirement_id, version, cleaned)
+    os.replace(staged_path, path)
+    return path
+
+
+def discard_part(staged_path: str) -> None:
+    try:
+        os.remove(staged_path)
+    except FileNotFoundError:
+        pass
+
+
+def write_version(requirement_id: int, df: pd.DataFrame, version: int, cleaned: bool = False) -> str:
+    return publish_part(stage_part(requirement_id, df), requirement_id, version, cleaned)
+
+
+def read_since(
+    requirement_id: int, since_version: int = 0, up_to_version: int | None = None, cleaned: bool = False
+) -> pd.DataFrame:
+    """Rows of every version in (since_version, up_to_version], oldest first."""
+    wanted = [
+        v for v in versions(requirement_id)
+        if v > since_version and (up_to_version is None or v <= up_to_version)
+    ]
+    paths = [part_path(requirement_id, v, cleaned) for v in wanted]
+    if cleaned:
+        paths = [path for path in paths if os.path.exists(path)]
+    if not paths:
+        return pd.DataFrame()
+    parts = [pd.read_parquet(path) for path in paths]
+    return parts[0] if len(parts) == 1 else pd.concat(parts, ignore_index=True)
@@ -0,0 +1,90 @@
+# Request deadlines and client-disconnect cancellation for long-running work
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from fastapi import Request
+
+from app.core.config import settings
+
+
+_deadline: ContextVar[float | None] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def remaining() -> float | None:
+    """Seconds left before the current request's deadline, or None when unbounded."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def deadline_scope(seconds: float | None):
+    """Bound everything awaited inside to ``seconds``; nested scopes can only shorten it."""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def request_timeout(request: Request) -> float:
+    """
+    Deadline for a request: the client's ``X-Request-Timeout`` (seconds), capped by
+    settings. A value that is not a positive finite number counts as absent.
+    """
+    limit = settings.REQUEST_DEADLINE_SECONDS
+    header = request.headers.get("x-request-timeout")
+    try:
+        asked = float(header) if header else limit
+    except ValueError:
+        asked = limit
+    # 0, negatives and nan would otherwise clamp to an immediate 504, after the upload was saved
+    if not math.isfinite(asked) or asked <= 0:
+        asked = limit
+    return min(asked, limit)
+
+
+async def run_request_bound(request: Request, coro, *, timeout: float | None = None):
+    """
+    Await ``coro`` under the request deadline, cancelling it if the deadline
+    passes or the client goes away. Cancellation propagates into every LLM call
+    awaited inside, so abandoned requests stop holding quota and worker slots.
+    """
+    with deadline_scope(timeout):
+        task = asyncio.ensure_future(coro)  # copies the context, so the deadline is visible inside
+        try:
+            while True:
+                wait = settings.DISCONNECT_POLL_SECONDS
+                left = remaining()
+                if left is not None:
+                    if left <= 0:
+                        raise DeadlineExceeded("Request deadline exceeded")
+                    wait = min(wait, left)
+                done, _ = await asyncio.wait({task}, timeout=wait)
+                if done:
+                    return task.result()
+                if await request.is_disconnected():
+                    raise ClientDisconnected()
+        finally:
+            if not task.done():
+                task.cancel()
+                await asyncio.gather(task, return_exceptions=True)
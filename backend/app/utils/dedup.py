@@ -0,0 +1,160 @@
+"""
+Streaming row deduplication on 64-bit fingerprints.
+
+Every row is hashed once with ``pd.util.hash_pandas_object``. Duplicates are
+found within a chunk with a uint64 hashtable and across chunks against a
+sorted set of the fingerprints seen so far. Past ``max_memory_items`` fingerprints the set
+is spilled to sorted ``.npy`` runs on disk and probed through memory maps, so
+memory stays bounded however many chunks are fed in.
+
+Rows are compared by fingerprint only. Two different rows colliding on 64 bits
+is possible in principle but negligible at the sizes we clean (~1e-8 at 1e6
+unique rows).
+"""
+import os
+import shutil
+import tempfile
+from dataclasses import asdict, dataclass
+
+import numpy as np
+import pandas as pd
+
+
+def row_fingerprints(df: pd.DataFrame, subset=None) -> np.ndarray:
+    """One uint64 per row, from the values of ``subset`` (default: all columns)."""
+    frame = df if subset is None else df[list(subset)]
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy(dtype=np.uint64)
+
+
+def first_occurrences(fingerprints: np.ndarray) -> np.ndarray:
+    """Boolean mask of the first occurrence of every fingerprint (keep="first")."""
+    # pandas' uint64 hashtable: O(n), no sort
+    return ~pd.Series(fingerprints, copy=False).duplicated(keep="first").to_numpy()
+
+
+@dataclass
+class DedupReport:
+    rows_seen: int = 0
+    rows_kept: int = 0
+    within_chunk: int = 0  # duplicates of an earlier row in the same chunk
+    across_chunks: int = 0  # duplicates of a row from an earlier chunk
+    chunks: int = 0
+    spilled_runs: int = 0
+
+    @property
+    def duplicates(self) -> int:
+        return self.within_chunk + self.across_chunks
+
+    def to_dict(self) -> dict:
+        return {**asdict(self), "duplicates": self.duplicates}
+
+
+class FingerprintSet:
+    """Sorted uint64 set that spills to memory-mapped runs past ``max_memory_items``."""
+
+    # spilled runs are merged into one once there are this many
+    max_runs = 8
+
+    def __init__(self, max_memory_items: int = 5_000_000, spill_dir: str | None = None):
+        self.max_memory_items = max_memory_items
+        self.spill_dir = spill_dir
+        self._memory = np.empty(0, dtype=np.uint64)
+        self._runs: list[np.ndarray] = []
+        self._tmpdir: str | None = None
+        self.spills = 0
+
+    def __len__(self) -> int:
+        return self._memory.size + sum(run.size for run in self._runs)
+
+    def contains(self, fingerprints: np.ndarray) -> np.ndarray:
+        found = np.zeros(fingerprints.size, dtype=bool)
+        for sorted_fps in (self._memory, *self._runs):
+            if sorted_fps.size == 0:
+                continue
+            pos = np.searchsorted(sorted_fps, fingerprints)
+            hit = pos < sorted_fps.size
+            hit[hit] = sorted_fps[pos[hit]] == fingerprints[hit]
+            found |= hit
+        return found
+
+    def add(self, unique_fingerprints: np.ndarray) -> None:
+        """Add fingerprints that are unique and not yet in the set."""
+        if unique_fingerprints.size == 0:
+            return
+        merged = np.concatenate([self._memory, unique_fingerprints])
+        merged.sort(kind="stable")
+        self._memory = merged
+        if self._memory.size > self.max_memory_items:
+            self._spill(self._memory)
+            self._memory = np.empty(0, dtype=np.uint64)
+            if len(self._runs) >= self.max_runs:
+                merged = np.concatenate(self._runs)
+                merged.sort()
+                self._runs = []
+                self._spill(merged)
+
+    def _spill(self, sorted_fps: np.ndarray) -> None:
+        if self._tmpdir is None:
+            self._tmpdir = tempfile.mkdtemp(prefix="dedup-", dir=self.spill_dir)
+        path = os.path.join(self._tmpdir, f"run-{self.spills:05d}.npy")
+        np.save(path, sorted_fps)
+        self._runs.append(np.load(path, mmap_mode="r"))
+        self.spills += 1
+
+    def close(self) -> None:
+        self._runs = []
+        if self._tmpdir is not None:
+            shutil.rmtree(self._tmpdir, ignore_errors=True)
+            self._tmpdir = None
+
+
+class Deduplicator:
+    """
+    Drops rows already seen, keeping the first occurrence, over any number of
+    chunks. Use as a context manager (or call close()) to remove spill files.
+
+        with Deduplicator(subset=["id"]) as dedup:
+            for chunk in pd.read_csv(path, chunksize=100_000):
+                write(dedup.process(chunk))
+        print(dedup.report.to_dict())
+    """
+
+    def __init__(self, subset=None, max_memory_items: int = 5_000_000, spill_dir: str | None = None):
+        self.subset = subset
+        self.seen = FingerprintSet(max_memory_items=max_memory_items, spill_dir=spill_dir)
+        self.report = DedupReport()
+
+    def keep_mask(self, chunk: pd.DataFrame) -> np.ndarray:
+        fps = row_fingerprints(chunk, self.subset)
+        keep = first_occurrences(fps)
+        within = int(fps.size - keep.sum())
+
+        if len(self.seen):
+            earlier = self.seen.contains(fps) & keep
+            keep &= ~earlier
+            across = int(earlier.sum())
+        else:
+            across = 0
+        self.seen.add(fps[keep])
+
+        report = self.report
+        report.chunks += 1
+        report.rows_seen += int(fps.size)
+        report.rows_kept += int(keep.sum())
+        report.within_chunk += within
+        report.across_chunks += across
+        report.spilled_runs = self.seen.spills
+        return keep
+
+    def process(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        keep = self.keep_mask(chunk)
+        return chunk if keep.all() else chunk[keep]
+
+    def close(self) -> None:
+        self.seen.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,168 @@
+"""
+Fake chat model for load tests and offline development.
+
+Selected with ``LLM_PROVIDER=fake``. It recognises which registered prompt it
+was sent (by the system message), sleeps for a latency drawn from a
+configurable distribution and answers with a canned response that passes the
+same parsing and validation as a real Gemini reply. No network, no quota.
+
+Latency specs (seconds):
+    fixed:0.5
+    uniform:0.2,2
+    lognormal:15,0.6     median, sigma (long right tail, like Gemini)
+
+Canned responses can be overridden per prompt name with a JSON file
+(``FAKE_LLM_RESPONSES_FILE``), e.g. ``{"graphs_dashboard": "import React ..."}``.
+"""
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from typing import Any, Callable
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import Field, PrivateAttr
+
+from app.utils.prompts import registry as prompt_registry
+
+
+FAKE_DASHBOARD_CODE = """import React, { useState, useEffect } from "react";
+import { ResponsiveContainer, BarChart, Bar, XAxis, YAxis, Tooltip } from "recharts";
+
+const AutoVizDashboard = () => {
+  const [data, setData] = useState([]);
+  useEffect(() => {
+    let isMounted = true;
+    fetch("__ENDPOINT__").then((r) => r.json()).then((rows) => { if (isMounted) setData(rows); });
+    return () => { isMounted = false; };
+  }, []);
+  return (
+    <ResponsiveContainer width="100%" height={300}>
+      <BarChart data={data}><XAxis dataKey="__X__" /><YAxis /><Tooltip /><Bar dataKey="__Y__" /></BarChart>
+    </ResponsiveContainer>
+  );
+};
+
+export default AutoVizDashboard;
+"""
+
+FAKE_GRAPH_TYPES = ("bar", "line", "scatter", "pie", "area", "histogram")
+
+
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v.strip()]
+    kind = kind.strip().lower()
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0]
+    if kind == "uniform" and len(values) == 2:
+        low, high = values
+        return lambda rng: rng.uniform(low, high)
+    if kind == "lognormal" and len(values) == 2:
+        median, sigma = values
+        return lambda rng: rng.lognormvariate(math.log(median), sigma)
+    raise ValueError(f"Invalid fake LLM latency spec: '{spec}'")
+
+
+def _column_names(text: str) -> list[str]:
+    match = re.search(r"Column names(?: and types)?:\s*(.+)", text, re.IGNORECASE)
+    if not match:
+        return ["value"]
+    names = [re.sub(r"\s*\(.*\)$", "", c).strip() for c in match.group(1).split(",")]
+    return [n for n in names if n] or ["value"]
+
+
+def fake_graphs(columns: list[str], count: int = 6) -> dict:
+    graphs = []
+    for i in range(count):
+        x = columns[i % len(columns)]
+        y = columns[(i + 1) % len(columns)]
+        graphs.append({
+            "title": f"{y} by {x}",
+            "graph_type": FAKE_GRAPH_TYPES[i % len(FAKE_GRAPH_TYPES)],
+            "x_axis": {"feature": x, "aggregation": "none", "bin_size": None, "label": x},
+            "y_axis": {"feature": y, "aggregation": "sum", "label": y},
+            "group_by": None,
+            "filters": [],
+            "color_scheme": None,
+            "additional_params": {"stacked": False, "normalized": False, "show_trendline": False, "bins": None},
+        })
+    return {"graphs": graphs}
+
+
+class FakeChatModel(BaseChatModel):
+    latency: str = "fixed:0"
+    responses: dict[str, str] = Field(default_factory=dict)
+    seed: int | None = None
+
+    _sample: Callable[[random.Random], float] = PrivateAttr()
+    _rng: random.Random = PrivateAttr()
+    _prompt_by_system: dict[str, str] = PrivateAttr()
+
+    def model_post_init(self, __context: Any) -> None:
+        self._sample = parse_latency(self.latency)
+        self._rng = random.Random(self.seed)
+        self._prompt_by_system = {
+            str(spec.messages[0][1]): spec.name
+            for spec in prompt_registry.specs()
+            if spec.messages and spec.messages[0][0] == "system"
+        }
+
+    @classmethod
+    def from_settings(cls, settings) -> "FakeChatModel":
+        responses = {}
+        if settings.FAKE_LLM_RESPONSES_FILE:
+            with open(settings.FAKE_LLM_RESPONSES_FILE, encoding="utf-8") as f:
+                responses = json.load(f)
+        return cls(latency=settings.FAKE_LLM_LATENCY, responses=responses, seed=settings.FAKE_LLM_SEED)
+
+    @property
+    def _llm_type(self) -> str:
+        return "autoviz-fake"
+
+    def _prompt_name(self, messages) -> str | None:
+        for message in messages:
+            if message.type == "system":
+                return self._prompt_by_system.get(str(message.content))
+        return None
+
+    def _respond(self, messages) -> ChatResult:
+        name = self._prompt_name(messages)
+        text = "\n".join(str(m.content) for m in messages)
+        if name in self.responses:
+            content = self.responses[name]
+        elif name == "column_type":
+            content = "categorical"
+        elif name == "graph_suggestions":
+            content = json.dumps(fake_graphs(_column_names(text)))
+        elif name == "graph_repair":
+            count = re.search(r"Return exactly (\d+) corrected", text)
+            content = json.dumps(fake_graphs(_column_names(text), int(count.group(1)) if count else 1))
+        else:
+            columns = _column_names(text)
+            endpoint = re.search(r"https?://\S+/dataset/\d+", text)
+            content = (
+                FAKE_DASHBOARD_CODE
+                .replace("__ENDPOINT__", endpoint.group(0) if endpoint else "/api/analysis/dataset/0")
+                .replace("__X__", columns[0])
+                .replace("__Y__", columns[-1])
+            )
+        usage = {
+            "input_tokens": len(text.split()),
+            "output_tokens": len(content.split()),
+            "total_tokens": len(text.split()) + len(content.split()),
+        }
+        message = AIMessage(content=content, usage_metadata=usage, response_metadata={"prompt": name})
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self._sample(self._rng))
+        return self._respond(messages)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self._sample(self._rng))
+        return self._respond(messages)
@@ -1,12 +1,25 @@
 # app/utils/file_handler.py
 import os
+import uuid
 from fastapi import UploadFile
+from app.core.tracing import span
 
 UPLOAD_DIR = "app/uploads/"
 
 def save_file(file: UploadFile, user_id: str) -> str:
     os.makedirs(UPLOAD_DIR, exist_ok=True)
-    file_path = os.path.join(UPLOAD_DIR, f"{user_id}_{file.filename}")
-    with open(file_path, "wb") as f:
-        f.write(file.file.read())
+    # a fresh name per upload: resubmitting a file name must not overwrite (or, on a 429, delete)
+    # the input of an earlier analysis; the original name stays last so its extension still picks the reader
+    file_path = os.path.join(UPLOAD_DIR, f"{user_id}_{uuid.uuid4().hex}_{file.filename}")
+    with span("upload", **{"file.name": file.filename}) as s:
+        with open(file_path, "xb") as f:
+            s.set(**{"file.bytes": f.write(file.file.read())})
     return file_path
+
+
+def remove_file(file_path: str) -> None:
+    """Delete an upload once nothing needs it; already gone is fine."""
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,218 @@
+# Parsing, validation and local repair of LLM graph suggestions
+import difflib
+import json
+import re
+from typing import Any
+
+from pydantic import ValidationError
+
+from app.schemas.graph_spec import AGGREGATIONS, GRAPH_TYPES, GraphSpec
+
+
+NULLISH = {"", "null", "none", "n/a", "na"}
+
+GRAPH_TYPE_ALIASES = {
+    "column": "bar",
+    "bar_rows": "bar",
+    "bar_columns": "bar",
+    "side_by_side_bar": "grouped_bar",
+    "bar_side_by_side": "grouped_bar",
+    "clustered_bar": "grouped_bar",
+    "stacked": "stacked_bar",
+    "full_stacked": "full_stacked_bar",
+    "percent_stacked_bar": "full_stacked_bar",
+    "bar_and_line": "bar_line",
+    "combo": "bar_line",
+    "composed": "bar_line",
+    "boxplot": "box",
+    "box_and_whisker": "box",
+    "doughnut": "donut",
+    "hist": "histogram",
+    "heat_map": "heatmap",
+    "spider": "radar",
+}
+
+AGGREGATION_ALIASES = {
+    "average": "avg",
+    "mean": "avg",
+    "total": "sum",
+    "minimum": "min",
+    "maximum": "max",
+    "count_distinct": "count",
+    "nunique": "count",
+    "raw": "none",
+}
+
+
+def _norm(value: str) -> str:
+    return re.sub(r"[^0-9a-z]+", "_", str(value).strip().lower()).strip("_")
+
+
+def extract_json(raw_text: str) -> Any:
+    """Pull the first JSON object or array out of an LLM reply (fences and chatter tolerated)."""
+    text = raw_text.strip()
+    if text.startswith("```"):
+        text = re.sub(r"^```[a-zA-Z]*\s*|\s*```$", "", text)
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        pass
+
+    # Decode from each opening bracket instead of a greedy {.*} match, which
+    # swallows trailing prose containing a closing brace.
+    decoder = json.JSONDecoder()
+    for match in re.finditer(r"[\{\[]", text):
+        try:
+            parsed, _ = decoder.raw_decode(text, match.start())
+            return parsed
+        except json.JSONDecodeError:
+            continue
+    raise ValueError("LLM did not return valid JSON:\n" + raw_text)
+
+
+def graphs_from_payload(payload: Any) -> list:
+    if isinstance(payload, dict):
+        graphs = payload.get("graphs", [])
+    elif isinstance(payload, list):
+        graphs = payload
+    else:
+        graphs = []
+    return graphs if isinstance(graphs, list) else []
+
+
+class GraphSpecValidator:
+    """
+    Validates graph specs against a dataset's column list.
+
+    Lookups are precomputed once per dataset, so each graph costs one Pydantic
+    validation plus a few set/dict probes. Near-miss column names and enum
+    values are repaired locally; only graphs that still fail need the LLM again.
+    """
+
+    def __init__(self, columns, *, cutoff: float = 0.8):
+        self.columns = [str(c) for c in columns]
+        self.cutoff = cutoff
+        self._exact = set(self.columns)
+        self._by_norm = {}
+        for col in self.columns:
+            self._by_norm.setdefault(_norm(col), col)
+        self._norm_keys = list(self._by_norm)
+        self._graph_types = {_norm(t): t for t in GRAPH_TYPES}
+
+    # -------------------------
+    # Repair helpers
+    # -------------------------
+    def resolve_column(self, name) -> str | None:
+        if name is None:
+            return None
+        name = str(name)
+        if name in self._exact:
+            return name
+        key = _norm(name)
+        if key in self._by_norm:
+            return self._by_norm[key]
+        close = difflib.get_close_matches(key, self._norm_keys, n=1, cutoff=self.cutoff)
+        return self._by_norm[close[0]] if close else None
+
+    def resolve_graph_type(self, value) -> str | None:
+        if value is None:
+            return None
+        key = re.sub(r"_?(chart|plot|graph)_?", "_", _norm(value)).strip("_")
+        key = GRAPH_TYPE_ALIASES.get(key, key)
+        if key in self._graph_types:
+            return self._graph_types[key]
+        close = difflib.get_close_matches(key, list(self._graph_types), n=1, cutoff=0.75)
+        return self._graph_types[close[0]] if close else str(value)
+
+    @staticmethod
+    def resolve_aggregation(value) -> str:
+        if value is None or str(value).strip().lower() in NULLISH:
+            return "none"
+        key = _norm(value)
+        key = AGGREGATION_ALIASES.get(key, key)
+        if key in AGGREGATIONS:
+            return key
+        close = difflib.get_close_matches(key, AGGREGATIONS, n=1, cutoff=0.6)
+        return close[0] if close else str(value)
+
+    def _repair(self, graph: dict, errors: list[str]) -> dict:
+        graph = dict(graph)
+
+        def fix_feature(container: dict, where: str):
+            original = container.get("feature")
+            resolved = self.resolve_column(original)
+            if resolved is None:
+                errors.append(f"{where}.feature '{original}' is not a dataset column")
+            else:
+                container["feature"] = resolved
+
+        graph["graph_type"] = self.resolve_graph_type(graph.get("graph_type"))
+
+        for axis_name in ("x_axis", "y_axis"):
+            axis = graph.get(axis_name)
+            if not isinstance(axis, dict):
+                continue
+            axis = dict(axis)
+            axis["aggregation"] = self.resolve_aggregation(axis.get("aggregation"))
+            if isinstance(axis.get("bin_size"), str) and axis["bin_size"].strip().lower() in NULLISH:
+                axis["bin_size"] = None
+            fix_feature(axis, axis_name)
+            graph[axis_name] = axis
+
+        group_by = graph.get("group_by")
+        if isinstance(group_by, str) and group_by.strip().lower() in NULLISH:
+            graph["group_by"] = None
+        elif group_by is not None:
+            resolved = self.resolve_column(group_by)
+            if resolved is None:
+                errors.append(f"group_by '{group_by}' is not a dataset column")
+            else:
+                graph["group_by"] = resolved
+
+        filters = []
+        for i, flt in enumerate(graph.get("filters") or []):
+            feature = flt.get("feature") if isinstance(flt, dict) else None
+            if not feature or str(feature).startswith("<"):
+                continue  # the prompt shows a placeholder filter; drop empty or echoed ones
+            flt = dict(flt)
+            fix_feature(flt, f"filters[{i}]")
+            filters.append(flt)
+        graph["filters"] = filters
+
+        params = graph.get("additional_params")
+        if isinstance(params, dict):
+            graph["additional_params"] = {
+                k: (None if isinstance(v, str) and v.strip().lower() in NULLISH else v)
+                for k, v in params.items()
+            }
+        return graph
+
+    # -------------------------
+    # Validation
+    # -------------------------
+    def validate(self, graph: Any) -> tuple[GraphSpec | None, list[str]]:
+        if not isinstance(graph, dict):
+            return None, ["graph is not a JSON object"]
+        errors: list[str] = []
+        repaired = self._repair(graph, errors)
+        try:
+            spec = GraphSpec.model_validate(repaired)
+        except ValidationError as e:
+            errors.extend(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            return None, errors
+        if errors:
+            return None, errors
+        return spec, []
+
+    def validate_all(self, graphs: list) -> tuple[dict[int, GraphSpec], dict[int, tuple[Any, list[str]]]]:
+        """Split graphs into ``{index: spec}`` and ``{index: (raw_graph, errors)}``."""
+        valid, invalid = {}, {}
+        for i, graph in enumerate(graphs):
+            spec, errors = self.validate(graph)
+            if spec is None:
+                invalid[i] = (graph, errors)
+            else:
+                valid[i] = spec
+        return valid, invalid
@@ -0,0 +1,100 @@
+# Hedged requests: fire a duplicate call when the first one runs past a latency percentile
+import asyncio
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable
+
+from app.utils.deadline import DeadlineExceeded, remaining
+
+
+class LatencyTracker:
+    """Rolling window of successful call latencies per key (e.g. prompt name)."""
+
+    def __init__(self, window: int = 200):
+        self._samples: dict[str, deque] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, key: str, seconds: float) -> None:
+        self._samples[key].append(seconds)
+
+    def percentile(self, key: str, q: float, *, min_samples: int = 1) -> float | None:
+        samples = self._samples.get(key)
+        if not samples or len(samples) < min_samples:
+            return None
+        ordered = sorted(samples)
+        idx = min(len(ordered) - 1, max(0, round(q * (len(ordered) - 1))))
+        return ordered[idx]
+
+
+latency_tracker = LatencyTracker()
+
+
+async def hedged(
+    call: Callable[[], Awaitable[Any]],
+    *,
+    key: str,
+    parse: Callable[[Any], Any] | None = None,
+    hedge_delay: float | None = None,
+    max_hedges: int = 1,
+    tracker: LatencyTracker = latency_tracker,
+) -> Any:
+    """
+    Run ``call`` and, if it has not produced a valid result after ``hedge_delay``
+    seconds, start up to ``max_hedges`` duplicates. The first attempt whose
+    result survives ``parse`` wins and the others are cancelled. A failed or
+    invalid attempt triggers the next hedge immediately. The whole race is
+    bounded by the current request deadline.
+    """
+    loop = asyncio.get_running_loop()
+    started = {}
+    pending: set[asyncio.Task] = set()
+    last_error: BaseException | None = None
+    hedges_left = max_hedges
+
+    def launch():
+        task = asyncio.ensure_future(call())
+        started[task] = loop.time()
+        pending.add(task)
+
+    launch()
+    next_hedge = loop.time() + hedge_delay if hedge_delay is not None else None
+    try:
+        while pending:
+            timeout = None
+            if next_hedge is not None and hedges_left > 0:
+                timeout = max(0.0, next_hedge - loop.time())
+            left = remaining()
+            if left is not None:
+                if left <= 0:
+                    raise DeadlineExceeded(f"Deadline exceeded waiting for '{key}'")
+                timeout = left if timeout is None else min(timeout, left)
+
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                if hedges_left > 0 and next_hedge is not None and loop.time() >= next_hedge:
+                    hedges_left -= 1
+                    launch()
+                    next_hedge = loop.time() + hedge_delay
+                continue
+
+            for task in done:
+                pending.discard(task)
+                try:
+                    result = task.result()
+                    value = parse(result) if parse else result
+                except Exception as e:
+                    last_error = e
+                    continue
+                tracker.record(key, loop.time() - started[task])
+                return value
+
+            # every attempt so far failed; hedge right away instead of waiting
+            if not pending and hedges_left > 0:
+                hedges_left -= 1
+                launch()
+                next_hedge = loop.time() + hedge_delay if hedge_delay is not None else None
+
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
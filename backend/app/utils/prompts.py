@@ -0,0 +1,520 @@
+"""
+Prompt registry for the LLM helpers in ``app.utils.llms``.
+
+Each prompt is compiled into a ``ChatPromptTemplate`` once, on first use (or at
+startup through ``warmup()``), and its input variables are checked against what
+the caller sends. Runnable chains (``prompt | llm``) are cached per model
+instance, so a request only pays for formatting and the model call itself.
+
+Every prompt carries a hand-bumped ``version`` and a content hash; bump the
+version when the wording changes on purpose. ``registry.version_hash`` folds
+all prompt hashes together and is what response caches should key on. Hashes
+are computed from the raw messages, so reading them never imports LangChain.
+"""
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any
+
+
+@dataclass(frozen=True)
+class PromptSpec:
+    name: str
+    version: int
+    messages: list
+    input_variables: frozenset[str]
+    hash: str
+
+
+class PromptRegistry:
+    def __init__(self):
+        self._specs: dict[str, PromptSpec] = {}
+        self._templates: dict[str, Any] = {}
+        self._chains: dict[tuple[str, int], tuple[Any, Any]] = {}
+
+    def register(self, name: str, *, version: int, messages: list, input_variables: set[str]) -> PromptSpec:
+        if name in self._specs:
+            raise ValueError(f"Prompt '{name}' is already registered")
+
+        payload = json.dumps({"name": name, "version": version, "messages": messages}, sort_keys=True)
+        spec = PromptSpec(
+            name=name,
+            version=version,
+            messages=messages,
+            input_variables=frozenset(input_variables),
+            hash=hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16],
+        )
+        self._specs[name] = spec
+        return spec
+
+    def get(self, name: str) -> PromptSpec:
+        try:
+            return self._specs[name]
+        except KeyError:
+            raise KeyError(f"Unknown prompt '{name}'") from None
+
+    def specs(self) -> list[PromptSpec]:
+        return list(self._specs.values())
+
+    def template(self, name: str):
+        """Return the compiled ``ChatPromptTemplate`` for ``name``, building it once."""
+        template = self._templates.get(name)
+        if template is None:
+            from langchain_core.prompts import ChatPromptTemplate
+
+            spec = self.get(name)
+            template = ChatPromptTemplate.from_messages(spec.messages)
+            found = frozenset(template.input_variables)
+            if found != spec.input_variables:
+                raise ValueError(
+                    f"Prompt '{name}' expects variables {sorted(found)}, declared {sorted(spec.input_variables)}"
+                )
+            self._templates[name] = template
+        return template
+
+    def chain(self, name: str, llm):
+        """Return the cached ``prompt | llm`` runnable for this model instance."""
+        key = (name, id(llm))
+        cached = self._chains.get(key)
+        # id() can be reused after a model is garbage collected, so check identity too
+        if cached is None or cached[0] is not llm:
+            cached = (llm, self.template(name) | llm)
+            self._chains[key] = cached
+        return cached[1]
+
+    def warmup(self) -> None:
+        """Compile and validate every registered prompt up front."""
+        for name in self._specs:
+            self.template(name)
+
+    def cache_key(self, name: str, inputs: dict) -> str:
+        """Stable key for caching a response of prompt ``name`` to ``inputs``."""
+        payload = json.dumps(inputs, sort_keys=True, default=str)
+        return hashlib.sha256(f"{self.get(name).hash}:{payload}".encode("utf-8")).hexdigest()
+
+    def versions(self) -> dict[str, str]:
+        return {name: f"v{spec.version}-{spec.hash}" for name, spec in sorted(self._specs.items())}
+
+    @property
+    def version_hash(self) -> str:
+        joined = ",".join(f"{name}={spec.hash}" for name, spec in sorted(self._specs.items()))
+        return hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+
+
+# -------------------------
+# Column type inference
+# -------------------------
+COLUMN_TYPE_MESSAGES = [
+    (
+        "system",
+        "You are a data analyst. Based on column samples, classify the column type.",
+    ),
+    (
+        "human",
+        "Column name: {col_name}\n"
+        "Sample values: {samples}\n\n"
+        "Possible types: numeric, categorical, datetime, boolean, text, ID/code.\n"
+        "Which type best fits? Reply with only the type.",
+    ),
+]
+
+
+# -------------------------
+# Graph suggestions
+# -------------------------
+GRAPH_SUGGESTIONS_MESSAGES = [
+    (
+        "system",
+        "You are a data visualization expert. Based on the dataset columns and user query, "
+        "suggest the most relevant types of graphs to visualize the data.",
+    ),
+    (
+        "human",
+        "Column names: {col_names}\n"
+        "User query: {user_query}\n\n"
+        "Suggest exactly 6 graph types (choose only from: {charts_list}).\n"
+        "All the Graphs should be able to be plotted in a single dashboard.\n\n"
+        """When generating the list of graphs, return them strictly in JSON format. 
+            For each graph, specify ALL details required to plot it. Use the following schema for each graph object:
+
+            {{
+            "title": "<string> Title of the graph>",
+            "graph_type": "<string> (bar, line, scatter, histogram, pie, stacked_bar, heatmap, etc.)",
+            "x_axis": {{
+                "feature": "<string: column name from dataset>",
+                "aggregation": "<string: sum, avg, count, min, max, none>",
+                "bin_size": "<integer or null, required only for histogram or binned data>",
+                "label": "<string label to display>"
+            }},
+            "y_axis": {{
+                "feature": "<string: column name from dataset>",
+                "aggregation": "<string: sum, avg, count, min, max, none>",
+                "label": "<string label to display>"
+            }},
+            "group_by": "<string or null: feature to group data by>",
+            "filters": [
+                {{ "feature": "<string>", "condition": "<e.g., >, <, =>", "value": "<value>" }}
+            ],
+            "color_scheme": "<string or null: e.g., category10, viridis, etc.>",
+            "additional_params": {{
+                "stacked": "<true/false, for bar charts>",
+                "normalized": "<true/false, for percentages>",
+                "show_trendline": "<true/false, for scatter/line>",
+                "bins": "<integer, for histograms>"
+            }}
+            }}
+
+            Always make sure that:
+            1. The 'feature' values match dataset column names exactly.
+            2. Include 'aggregation' even if it's 'none'.
+            3. Provide bin_size only when graph_type = histogram or when binning is required.
+            4. Return an array of such graph objects under the key 'graphs'.
+            """,
+    ),
+]
+
+
+# -------------------------
+# Targeted repair of invalid graph suggestions
+# -------------------------
+GRAPH_REPAIR_MESSAGES = [
+    (
+        "system",
+        "You are a data visualization expert. You fix graph specifications that failed validation. "
+        "Return only JSON, no explanations.",
+    ),
+    (
+        "human",
+        "Column names: {col_names}\n"
+        "User query: {user_query}\n"
+        "Allowed graph types: {graph_types}\n"
+        "Allowed aggregations: {aggregations}\n\n"
+        "These graph specifications are invalid, each listed with its validation errors:\n"
+        "{invalid_graphs}\n\n"
+        "Return exactly {count} corrected graph objects, in the same order, as JSON under the key 'graphs'. "
+        "Keep the same schema and intent. Every 'feature' and 'group_by' value must be one of the column names exactly.",
+    ),
+]
+
+
+# -------------------------
+# Dashboard from graph suggestions
+# -------------------------
+DASHBOARD_MESSAGES = [
+    (
+        "system",
+        "You are a senior front-end engineer and expert in React and Recharts. "
+        "Your job is to generate clean, production-ready React code that runs directly in the browser. "
+        "Do not include markdown formatting, explanations, or comments — only pure React code. "
+        "All hooks (useState, useEffect, useMemo) must follow React's Rules of Hooks and never be called conditionally.",
+    ),
+    (
+        "human",
+        """Generate a **single complete React component** that visualizes data as per the specifications below.
+
+        ### Requirements:
+        - Must use **React (with hooks)** and **Recharts** only. No other libraries or frameworks.
+        - The component must:
+        1. Fetch data from the dataset endpoint: **{dataset_endpoint}**
+        2. Automatically re-fetch every **{refresh_ms} ms** using `setInterval` inside `useEffect`.
+        3. Handle **loading**, **empty**, and **error** states gracefully without breaking the layout.
+        4. Parse date/time fields with `new Date(value)` when `xType === "time"`.
+        5. Safely handle missing or malformed data (ignore charts that cannot be rendered).
+        6. Dynamically render **exactly 6 charts** in a **2x3 responsive grid** layout.
+        7. Include **legend**, **tooltip**, **axis labels**, and **responsive container**.
+        8. Use a minimal, modern design with consistent margins and font sizes.
+        - For `stacked_bar`, render multiple `<Bar>` components using the same `stackId`.
+        - For `histogram`, include a helper function that bins values into N buckets.
+        - Implement helper functions inside the same file:
+        - `groupBy`
+        - `aggregate`
+        - `binData`
+        - Use `useMemo` only for expensive computations like data aggregation or binning — never conditionally.
+        - All hooks (`useState`, `useEffect`, `useMemo`) must be **declared at the top level of the component**, never inside `if`, `for`, or `map` blocks.
+        - Wrap dynamic rendering logic in plain JavaScript conditions **after** hooks are declared.
+        - The component must recover safely from runtime errors (using try/catch around data parsing or chart generation).
+        - Use `useEffect` cleanup for the interval timer.
+
+        ### Technical Constraints:
+        - Do not wrap code inside markdown (no ```jsx or ``` blocks).
+        - Do not include any textual explanations or comments.
+        - Output must be **pure JavaScript/React code**, ready to run.
+        - Escape all backslashes and quotes properly to ensure valid JSON text.
+        - Ensure all JSX props use **double quotes ("")**.
+        - Do not use `eval`, `Function()`, or dynamic imports.
+        - Use consistent indentation and line breaks.
+
+        ### Inputs:
+        - **DATASET SCHEMA (JSON):**
+        {dataset_schema}
+
+        - **DASHBOARD SPEC (JSON):**
+        {dashboard_spec}
+
+        - **Allowed Chart Types:** {charts_list}
+
+        The generated component must dynamically adapt to the dataset schema and dashboard specification, while strictly following React's Rules of Hooks and ensuring stable hook ordering across renders.
+
+        Export the component as the **default export** named `AutoVizDashboard`.
+        """,
+    ),
+]
+
+
+# -------------------------
+# Single-call graphs + dashboard
+# -------------------------
+GRAPHS_DASHBOARD_MESSAGES = [
+    (
+        "system", """ 
+            1. NO explanations, NO comments
+            2. All code must be valid, executable JavaScript ready to run immediately
+            3. Escape all strings properly for JSON compatibility (escape backslashes and quotes)
+            4. Use double quotes ("") for ALL JSX attributes
+            5. Follow React Rules of Hooks strictly - ALL hooks must be declared at component top level
+            6. Never use hooks conditionally or inside loops, map functions, or if statements
+            7. Include comprehensive error handling with try-catch blocks
+            8. Ensure cleanup for useEffect timers and intervals
+
+            REACT HOOKS REQUIREMENTS:
+            - Declare ALL hooks (useState, useEffect, useMemo) at the TOP of the component before ANY conditional logic
+            - NEVER call hooks inside conditions, loops, or nested functions
+            - Use useMemo ONLY for expensive computations (data aggregation, binning) - never conditionally
+            - Place conditional rendering logic AFTER all hook declarations using plain JavaScript
+            - Example of CORRECT pattern:
+            const [data, setData] = useState([]);
+            const [loading, setLoading] = useState(true);
+            const [error, setError] = useState(null);
+            // ... all other hooks here first
+            // THEN conditional logic below
+
+            ERROR PREVENTION REQUIREMENTS:
+            - Wrap all data fetching in try-catch blocks with proper error states
+            - Validate data structure before rendering charts
+            - Provide fallback empty arrays/objects for undefined data
+            - Handle null/undefined values in data transformations
+            - Include loading states for asynchronous operations
+            - Use optional chaining (?.) for nested object access
+            - Implement cleanup functions in useEffect for intervals/timeouts
+            - Recover gracefully from runtime errors without crashing
+
+            TECHNICAL CONSTRAINTS:
+            - No eval(), Function(), or dynamic imports
+            - No markdown code blocks or triple backticks
+            - No textual explanations before or after code
+            - Consistent indentation (2 spaces)
+            - All strings must be properly escaped for JSON transmission
+            - Component must be a single default export"""
+    ),
+    (
+        "user",
+        """
+            Generate a complete React dashboard component based on the following specifications:
+            DATASET INFORMATION:
+            Column Names and Types: {column_info}
+            User Analysis Query: {user_query}
+            Sample Data Preview: {data_preview}
+            Data Fetch Endpoint: {api_endpoint}
+
+            DASHBOARD REQUIREMENTS:
+
+            1. GRAPH ANALYSIS:
+            - Analyze the columns and user query to identify EXACTLY 6 best graphs for visualization
+            - For each graph specify:
+                * Graph type from recharts (BarChart, LineChart, AreaChart, PieChart, ScatterChart, RadarChart, ComposedChart)
+                * Which columns map to X-axis, Y-axis, and any additional data keys
+                * Any required data transformations or aggregations
+                * Appropriate chart configuration (colors, labels, tooltips)
+            
+            2. KPI IDENTIFICATION:
+            - Identify 2-4 Key Performance Indicators relevant to the user query
+            - For each KPI provide:
+                * Clear metric name and description
+                * Exact calculation formula based on available columns
+                * Formatting (percentage, currency, number with units)
+                * Visual representation (card with icon, color-coded status)
+
+            3. COMPONENT STRUCTURE:
+            - Single functional React component with default export
+            - Import statements: React hooks, recharts components, fetch for data
+            - All hooks declared at top level before any conditional logic
+            - State management for: data, loading, error, processedData
+            - useEffect for data fetching from {api_endpoint}
+            - Data processing and transformation logic
+            - Responsive layout using Tailwind CSS
+
+            4. LAYOUT REQUIREMENTS:
+            - Display 2-4 KPI cards at the top in a responsive grid
+            - Below KPIs, display exactly 6 graphs in a 2x3 responsive grid
+            - Use Tailwind CSS classes: grid, grid-cols-1, md:grid-cols-2, lg:grid-cols-3, gap-4
+            - Ensure mobile responsiveness (stack on small screens)
+            - Each graph wrapped in ResponsiveContainer from recharts
+            - Consistent padding, margins, and spacing
+
+            5. RECHARTS CONFIGURATION:
+            - Import ResponsiveContainer, XAxis, YAxis, CartesianGrid, Tooltip, Legend
+            - Each chart must include:
+                * ResponsiveContainer with width="100%" and height="300"
+                * Proper axis labels with readable fontSize
+                * Tooltip for data point details
+                * Legend where applicable
+                * CartesianGrid with strokeDasharray="3 3" for readability
+                * Appropriate colors using Tailwind color palette
+            - Apply data transformations/aggregations as needed for each chart
+
+            6. DATA FETCHING PATTERN:
+                
+            const [data, setData] = useState([]);
+            const [loading, setLoading] = useState(true);
+            const [error, setError] = useState(null);
+
+            useEffect(() => {{
+            let isMounted = true;
+            const fetchData = async () => {{
+            try {{
+            const response = await fetch('{api_endpoint}');
+            if (!response.ok) throw new Error('Failed to fetch data');
+            const result = await response.json();
+            if (isMounted) {{
+            setData(Array.isArray(result) ? result : []);
+            setLoading(false);
+            }}
+            }} catch (err) {{
+            if (isMounted) {{
+            setError(err.message);
+            setLoading(false);
+            }}
+            }}
+            }};
+            fetchData();
+            return () => {{ isMounted = false; }};
+            }}, []);
+                
+                
+            7. DESIGN REQUIREMENTS:
+            - Modern, clean, professional aesthetic
+            - Consistent color scheme using Tailwind CSS utilities
+            - Clear typography hierarchy (text-xl, text-lg, text-sm)
+            - Card-based layout with shadows and rounded corners
+            - Proper spacing between elements (p-4, p-6, gap-4, gap-6)
+            - Loading skeleton or spinner during data fetch
+            - Error message display with retry option
+            - Smooth transitions and hover effects where appropriate
+
+            8. SPECIFIC ANTI-PATTERNS TO AVOID:
+            ❌ const someVar = useMemo(() => condition ? value : null, [deps]); // WRONG - conditional in useMemo
+            ✅ const someVar = useMemo(() => {{ return expensiveComputation(data); }}, [data]); // CORRECT
+
+            ❌ if (condition) {{ useState(value); }} // WRONG - conditional hook
+            ✅ const [value, setValue] = useState(initial); if (condition) {{ setValue(newValue); }} // CORRECT
+
+            ❌ data.map(item => {{ const [state] = useState(); }}) // WRONG - hook in loop
+            ✅ const [state] = useState(); const rendered = data.map(item => ...) // CORRECT
+
+            IMPORTANT OUTPUT FORMAT:
+            - Start directly with: import React, {{ useState, useEffect }} from "react";
+            - End with: export default DashboardComponent;
+            - NO explanatory text, NO markdown, NO comments
+            - Pure executable JavaScript/React code only
+            - Properly escaped strings for JSON transmission (use \\\\ for backslashes, \\" for quotes in strings)
+
+
+            OUTPUT FORMAT RULES:
+            1. Output ONLY valid JavaScript/React code
+            2. NO markdown blocks (no ``````jsx)
+            3. NO explanations or comments in code
+            4. NO text before or after the code
+            5. Start with imports, end with export default
+
+            REACT RULES OF HOOKS (CRITICAL):
+            1. All hooks MUST be at component top level
+            2. Never call hooks inside: if statements, loops, map/filter, nested functions
+            3. Hook call order must be identical on every render
+            4. Correct pattern:
+            - Declare ALL hooks first (useState, useEffect, useMemo, useCallback)
+            - Then write conditional logic
+            - Then return JSX
+
+            DATA SAFETY RULES:
+            1. Always check if data exists before using it
+            2. Use optional chaining: data?.field
+            3. Provide default values: data || []
+            4. Wrap transformations in try-catch
+            5. Handle loading and error states
+            6. Validate data types before rendering
+
+            GRAPH REQUIREMENTS:
+            1. Identify exactly 6 graphs suitable for the dataset
+            2. Each graph must use proper recharts components
+            3. Include ResponsiveContainer, axes, tooltip, legend
+            4. Apply aggregations if needed (sum, average, count, group by)
+            5. Use appropriate chart types for data relationships
+
+            KPI REQUIREMENTS:
+            1. Identify 2-4 meaningful KPIs from the data
+            2. Show clear calculations (e.g., "Total: sum(sales_amount)")
+            3. Format appropriately (currency, percentage, units)
+            4. Display in cards with visual hierarchy
+
+            STYLING REQUIREMENTS:
+            1. Use only Tailwind CSS utility classes
+            2. Responsive grid: grid grid-cols-1 md:grid-cols-2 lg:grid-cols-3
+            3. Consistent spacing: p-4, gap-4, rounded-lg, shadow-md
+            4. Professional color scheme
+            5. Clear typography: font-bold, text-xl, text-gray-600
+
+            ERROR HANDLING REQUIREMENTS:
+            1. Wrap fetch in try-catch
+            2. Show loading spinner during fetch
+            3. Display error message if fetch fails
+            4. Provide retry mechanism
+            5. Graceful degradation if chart data is invalid
+            6. Use error boundary pattern in useEffect cleanup
+    
+            Ensure:
+            - No conditional hooks
+            - No hooks in loops
+            - Proper string escaping for JSON
+            - Double quotes in JSX attributes
+            - useEffect cleanup for mounted check
+            - Try-catch around data operations
+
+            Generate the complete dashboard component now:""",
+        ),
+    ]
+
+
+registry = PromptRegistry()
+
+registry.register(
+    "column_type",
+    version=1,
+    messages=COLUMN_TYPE_MESSAGES,
+    input_variables={"col_name", "samples"},
+)
+registry.register(
+    "graph_suggestions",
+    version=1,
+    messages=GRAPH_SUGGESTIONS_MESSAGES,
+    input_variables={"col_names", "user_query", "charts_list"},
+)
+registry.register(
+    "graph_repair",
+    version=1,
+    messages=GRAPH_REPAIR_MESSAGES,
+    input_variables={"col_names", "user_query", "graph_types", "aggregations", "invalid_graphs", "count"},
+)
+registry.register(
+    "dashboard",
+    version=1,
+    messages=DASHBOARD_MESSAGES,
+    input_variables={"dataset_endpoint", "refresh_ms", "dataset_schema", "dashboard_spec", "charts_list"},
+)
+registry.register(
+    "graphs_dashboard",
+    version=1,
+    messages=GRAPHS_DASHBOARD_MESSAGES,
+    input_variables={"column_info", "user_query", "data_preview", "api_endpoint"},
+)
+
+PROMPTS_VERSION = registry.version_hash
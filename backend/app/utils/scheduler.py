@@ -0,0 +1,243 @@
+# Admission control and per-user fair scheduling for analysis work
+#
+# Every analysis / dashboard / append request takes a ticket before it runs.
+# Tickets carry an estimated cost (file size and column count) and wait in a
+# per-user FIFO; free slots go to the waiting user with the smallest virtual
+# start time (start-time fair queueing), so a user with ten queued uploads
+# gets a share of the slots, not all of them. Requests that cannot be served
+# in time are rejected up front with SchedulerSaturated (429 + Retry-After)
+# instead of queueing into a 504.
+#
+# The scheduler is per process; with several workers each enforces its limits.
+import asyncio
+import csv
+import math
+import os
+import time
+from collections import deque
+
+from app.core.config import settings
+from app.core.metrics import registry
+
+
+rejections = registry.counter("analysis_rejected_total", "Analyses turned away with 429, by reason.", ("reason",))
+
+
+class SchedulerSaturated(Exception):
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def estimate_cost(size_bytes: int, columns: int) -> float:
+    """Cost in units of "a small analysis": cleaning grows with size, prompts with columns."""
+    return (
+        1
+        + size_bytes / settings.ANALYSIS_COST_BYTES_PER_UNIT
+        + columns / settings.ANALYSIS_COST_COLUMNS_PER_UNIT
+    )
+
+
+def estimate_file_cost(file_path: str) -> float:
+    columns = 0
+    if file_path.endswith(".csv"):
+        # the header line is enough; the file itself is read by the cleaning stages
+        with open(file_path, newline="", encoding="utf-8", errors="replace") as f:
+            columns = len(next(csv.reader(f), []))
+    return estimate_cost(os.path.getsize(file_path), columns)
+
+
+class _User:
+    __slots__ = ("queue", "running", "last_finish")
+
+    def __init__(self):
+        self.queue: deque[Ticket] = deque()
+        self.running = 0
+        self.last_finish = 0.0  # virtual finish time of this user's latest ticket
+
+
+class Ticket:
+    """A place in the queue. Use as a context manager so it is always released."""
+
+    def __init__(self, scheduler: "AnalysisScheduler", user_id: int, cost: float, start_tag: float, seq: int):
+        self.scheduler = scheduler
+        self.user_id = user_id
+        self.cost = cost
+        self.start_tag = start_tag
+        self.seq = seq
+        self.state = "queued"  # -> running -> done
+        self.queued_at = time.monotonic()
+        self.started_at: float | None = None
+        self._turn = asyncio.get_running_loop().create_future()
+
+    async def run(self, coro):
+        """Wait for this ticket's turn, then await ``coro`` in its slot."""
+        try:
+            await self._turn
+        except BaseException:
+            coro.close()
+            self.release()
+            raise
+        try:
+            return await coro
+        finally:
+            self.release()
+
+    def release(self) -> None:
+        self.scheduler._release(self)
+
+    def __enter__(self) -> "Ticket":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.release()
+
+
+class AnalysisScheduler:
+    def __init__(
+        self,
+        *,
+        max_concurrent: int,
+        max_concurrent_per_user: int,
+        max_queued_per_user: int,
+        max_queued_cost: float,
+        weights: dict[int, float] | None = None,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_concurrent_per_user = max_concurrent_per_user
+        self.max_queued_per_user = max_queued_per_user
+        self.max_queued_cost = max_queued_cost
+        self.weights = weights or {}
+        self._users: dict[int, _User] = {}
+        self._vtime = 0.0
+        self._seq = 0
+        self.running = 0
+        self.queued = 0
+        self.queued_cost = 0.0
+        self.running_cost = 0.0
+        self.admitted = 0
+        self.rejected: dict[str, int] = {}
+        self.seconds_per_unit: float | None = None  # EWMA of run time / cost
+        self._waits: deque = deque(maxlen=1024)
+
+    # -- admission --------------------------------------------------------
+    def estimated_start(self) -> float | None:
+        """Seconds until a new ticket would get a slot, from observed run times (None until known)."""
+        if self.seconds_per_unit is None:
+            return None
+        if self.running < self.max_concurrent and not self.queued:
+            return 0.0
+        # everything queued runs first; running tickets are on average half done
+        return (self.queued_cost + self.running_cost / 2) * self.seconds_per_unit / self.max_concurrent
+
+    def _reject(self, reason: str, message: str):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        rejections.inc(reason=reason)
+        raise SchedulerSaturated(message, retry_after=max(1.0, self.estimated_start() or 0.0))
+
+    def admit(self, user_id: int, cost: float, *, deadline: float | None = None) -> Ticket:
+        """Queue a ticket, or raise SchedulerSaturated when it cannot be served in time."""
+        user = self._users.get(user_id)
+        if user is None:
+            user = self._users[user_id] = _User()
+        if len(user.queue) >= self.max_queued_per_user:
+            self._reject("user_queue", "Too many analyses queued for this user")
+        # an oversized job is still let into an empty queue, or it could never run
+        if self.queued and self.queued_cost + cost > self.max_queued_cost:
+            self._reject("queue_full", "Analysis queue is full")
+        start = self.estimated_start()
+        if deadline is not None and start is not None and start + cost * self.seconds_per_unit > deadline:
+            self._reject("deadline", "Analysis would not finish before the request deadline")
+
+        start_tag = max(self._vtime, user.last_finish)
+        user.last_finish = start_tag + cost / self.weights.get(user_id, 1.0)
+        self._seq += 1
+        ticket = Ticket(self, user_id, cost, start_tag, self._seq)
+        user.queue.append(ticket)
+        self.queued += 1
+        self.queued_cost += cost
+        self.admitted += 1
+        self._dispatch()
+        return ticket
+
+    # -- dispatch ---------------------------------------------------------
+    def _dispatch(self) -> None:
+        while self.running < self.max_concurrent:
+            best = None
+            for user in self._users.values():
+                if user.queue and user.running < self.max_concurrent_per_user:
+                    head = user.queue[0]
+                    if best is None or (head.start_tag, head.seq) < (best.start_tag, best.seq):
+                        best = head
+            if best is None:
+                return
+            user = self._users[best.user_id]
+            user.queue.popleft()
+            user.running += 1
+            self.running += 1
+            self.running_cost += best.cost
+            self.queued -= 1
+            self.queued_cost -= best.cost
+            self._vtime = max(self._vtime, best.start_tag)
+            best.state = "running"
+            best.started_at = time.monotonic()
+            self._waits.append(best.started_at - best.queued_at)
+            if not best._turn.done():  # cancelled waiters release themselves as soon as they resume
+                best._turn.set_result(None)
+
+    def _release(self, ticket: Ticket) -> None:
+        user = self._users.get(ticket.user_id)
+        if ticket.state == "queued":
+            user.queue.remove(ticket)
+            self.queued -= 1
+            self.queued_cost -= ticket.cost
+        elif ticket.state == "running":
+            user.running -= 1
+            self.running -= 1
+            self.running_cost -= ticket.cost
+            sample = (time.monotonic() - ticket.started_at) / ticket.cost
+            self.seconds_per_unit = sample if self.seconds_per_unit is None else 0.8 * self.seconds_per_unit + 0.2 * sample
+        else:
+            return
+        ticket.state = "done"
+        if not self.running and not self.queued:
+            # idle: nobody can be owed anything, start the virtual clock over
+            self._users.clear()
+            self._vtime = 0.0
+            self.queued_cost = self.running_cost = 0.0
+        self._dispatch()
+
+    def stats(self) -> dict:
+        waits = sorted(self._waits)
+        return {
+            "max_concurrent": self.max_concurrent,
+            "running": self.running,
+            "queued": self.queued,
+            "queued_cost": round(self.queued_cost, 3),
+            "users": sum(1 for u in self._users.values() if u.queue or u.running),
+            "admitted_total": self.admitted,
+            "rejected_total": dict(self.rejected),
+            "seconds_per_cost_unit": self.seconds_per_unit,
+            "queue_wait_p50_ms": waits[len(waits) // 2] * 1000 if waits else 0.0,
+            "queue_wait_p95_ms": waits[min(len(waits) - 1, math.ceil(len(waits) * 0.95) - 1)] * 1000 if waits else 0.0,
+        }
+
+
+_scheduler: AnalysisScheduler | None = None
+
+
+def analysis_scheduler() -> AnalysisScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = AnalysisScheduler(
+            max_concurrent=settings.ANALYSIS_MAX_CONCURRENT,
+            max_concurrent_per_user=settings.ANALYSIS_MAX_CONCURRENT_PER_USER,
+            max_queued_per_user=settings.ANALYSIS_MAX_QUEUED_PER_USER,
+            max_queued_cost=settings.ANALYSIS_MAX_QUEUED_COST,
+            weights=settings.ANALYSIS_USER_WEIGHTS,
+        )
+    return _scheduler
+
+
+registry.gauge("analysis_running", "Analyses holding a scheduler slot.", lambda: analysis_scheduler().running)
+registry.gauge("analysis_queued", "Analyses waiting for a scheduler slot.", lambda: analysis_scheduler().queued)
@@ -0,0 +1,246 @@
+"""
+Mergeable summaries for numeric columns, so outlier bounds and skew can be
+computed chunk by chunk (or on different workers) and combined afterwards.
+
+- QuantileSketch: KLL-style quantile sketch. Small inputs are kept exactly and
+  answered with the same linear interpolation as pandas; past ``exact_limit``
+  values it compacts and the rank error stays below about ``3 / k``.
+- Moments: streaming count/mean/M2/M3 with an exact merge, used for the
+  skew-based mean-vs-median decision.
+- ColumnSummary: both of the above for one column.
+"""
+import math
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+# worst rank error seen in benchmarks/sketch_accuracy.py is ~2.4 / k; keep headroom
+_ERROR_CONSTANT = 3.0
+
+
+class QuantileSketch:
+    def __init__(self, k: int = 200, exact_limit: int = 10_000, seed: int | None = None):
+        if k < 8:
+            raise ValueError("k must be at least 8")
+        self.k = k
+        self.exact_limit = exact_limit
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self.exact = True
+        # levels[h] holds items of weight 2**h; in exact mode only levels[0] is used
+        self.levels: list[np.ndarray] = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    @classmethod
+    def for_error(cls, epsilon: float, **kwargs) -> "QuantileSketch":
+        """Sketch sized for a normalized rank error of about ``epsilon``."""
+        return cls(k=max(8, math.ceil(_ERROR_CONSTANT / epsilon)), **kwargs)
+
+    @property
+    def rank_error(self) -> float:
+        return 0.0 if self.exact else _ERROR_CONSTANT / self.k
+
+    # -------------------------
+    # building
+    # -------------------------
+    def update(self, values) -> "QuantileSketch":
+        arr = np.asarray(values, dtype=np.float64).ravel()
+        arr = arr[np.isfinite(arr)]
+        if arr.size == 0:
+            return self
+        self.count += arr.size
+        self.min = min(self.min, float(arr.min()))
+        self.max = max(self.max, float(arr.max()))
+        self.levels[0] = np.concatenate([self.levels[0], arr])
+        self._settle()
+        return self
+
+    def merge(self, other: "QuantileSketch") -> "QuantileSketch":
+        if other.count == 0:
+            return self
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for h, items in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.exact = self.exact and other.exact
+        self._settle()
+        return self
+
+    def _capacity(self, level: int) -> int:
+        depth = len(self.levels) - level - 1
+        return max(2, math.ceil(self.k * (2 / 3) ** depth))
+
+    def _settle(self) -> None:
+        if self.exact:
+            if self.count <= self.exact_limit:
+                return
+            self.exact = False
+        while True:
+            level = next(
+                (h for h, items in enumerate(self.levels) if items.size > self._capacity(h)),
+                None,
+            )
+            if level is None:
+                return
+            self._compact(level)
+
+    def _compact(self, level: int) -> None:
+        items = np.sort(self.levels[level])
+        if items.size % 2:
+            # keep one item back so the promoted half has exactly the same weight
+            keep, items = items[-1:], items[:-1]
+        else:
+            keep = np.empty(0)
+        promoted = items[self._rng.integers(2)::2]
+        self.levels[level] = keep
+        if level + 1 == len(self.levels):
+            self.levels.append(np.empty(0))
+        self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+
+    # -------------------------
+    # queries
+    # -------------------------
+    def quantiles(self, qs) -> np.ndarray:
+        qs = np.asarray(qs, dtype=np.float64)
+        if self.count == 0:
+            return np.full(qs.shape, np.nan)
+        if self.exact:
+            return np.quantile(self.levels[0], qs)
+
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(lvl.size, 2 ** h, dtype=np.float64) for h, lvl in enumerate(self.levels)])
+        order = np.argsort(items, kind="stable")
+        items, cum = items[order], np.cumsum(weights[order])
+        ranks = qs * cum[-1]
+        idx = np.minimum(np.searchsorted(cum, ranks, side="left"), items.size - 1)
+        out = items[idx]
+        out[qs <= 0] = self.min
+        out[qs >= 1] = self.max
+        return out
+
+    def quantile(self, q: float) -> float:
+        return float(self.quantiles([q])[0])
+
+    def rank(self, value: float) -> float:
+        """Approximate fraction of values <= value."""
+        if self.count == 0:
+            return math.nan
+        total = sum(items.size * 2 ** h for h, items in enumerate(self.levels))
+        below = sum(np.count_nonzero(items <= value) * 2 ** h for h, items in enumerate(self.levels))
+        return below / total
+
+
+@dataclass
+class Moments:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    m3: float = 0.0
+
+    @classmethod
+    def of(cls, values) -> "Moments":
+        arr = np.asarray(values, dtype=np.float64).ravel()
+        arr = arr[np.isfinite(arr)]
+        if arr.size == 0:
+            return cls()
+        mean = float(arr.mean())
+        dev = arr - mean
+        return cls(count=int(arr.size), mean=mean, m2=float(np.dot(dev, dev)), m3=float(np.sum(dev ** 3)))
+
+    def update(self, values) -> "Moments":
+        return self.merge(Moments.of(values))
+
+    def merge(self, other: "Moments") -> "Moments":
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            self.count, self.mean, self.m2, self.m3 = other.count, other.mean, other.m2, other.m3
+            return self
+        na, nb = self.count, other.count
+        n = na + nb
+        delta = other.mean - self.mean
+        m3 = (
+            self.m3 + other.m3
+            + delta ** 3 * na * nb * (na - nb) / n ** 2
+            + 3 * delta * (na * other.m2 - nb * self.m2) / n
+        )
+        self.m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        self.m3 = m3
+        self.mean = self.mean + delta * nb / n
+        self.count = n
+        return self
+
+    @property
+    def skew(self) -> float:
+        """Bias-adjusted sample skewness, the same estimator as Series.skew()."""
+        n = self.count
+        if n < 3:
+            return math.nan
+        if self.m2 <= 1e-14 * max(1.0, self.mean ** 2) * n:
+            return 0.0
+        g1 = (self.m3 / n) / (self.m2 / n) ** 1.5
+        return math.sqrt(n * (n - 1)) / (n - 2) * g1
+
+
+@dataclass
+class ColumnSummary:
+    sketch: QuantileSketch = field(default_factory=QuantileSketch)
+    moments: Moments = field(default_factory=Moments)
+
+    def update(self, values) -> "ColumnSummary":
+        self.sketch.update(values)
+        self.moments.update(values)
+        return self
+
+    def merge(self, other: "ColumnSummary") -> "ColumnSummary":
+        self.sketch.merge(other.sketch)
+        self.moments.merge(other.moments)
+        return self
+
+    def iqr_bounds(self, whisker: float = 1.5) -> tuple[float, float]:
+        q1, q3 = self.sketch.quantiles([0.25, 0.75])
+        iqr = q3 - q1
+        return q1 - whisker * iqr, q3 + whisker * iqr
+
+    @property
+    def median(self) -> float:
+        return self.sketch.quantile(0.5)
+
+
+def summarize_chunks(chunks, columns=None, *, k: int = 200, exact_limit: int = 10_000) -> dict:
+    """
+    Build one ColumnSummary per numeric column from an iterable of DataFrames
+    (e.g. ``pd.read_csv(..., chunksize=...)``) without holding them all at once.
+    """
+    summaries: dict = {}
+    for chunk in chunks:
+        cols = columns if columns is not None else [
+            c for c, dtype in chunk.dtypes.items()
+            if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+        ]
+        for col in cols:
+            if col not in chunk:
+                continue
+            values = pd.to_numeric(chunk[col], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            if col not in summaries:
+                summaries[col] = ColumnSummary(QuantileSketch(k=k, exact_limit=exact_limit))
+            summaries[col].update(values)
+    return summaries
+
+
+def merge_summaries(*parts: dict) -> dict:
+    """Merge per-worker results of summarize_chunks, column by column."""
+    merged: dict = {}
+    for part in parts:
+        for col, summary in part.items():
+            if col in merged:
+                merged[col].merge(summary)
+            else:
+                merged[col] = summary
+    return merged
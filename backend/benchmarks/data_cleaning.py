@@ -0,0 +1,142 @@
+"""
+Micro-benchmarks for every ``app.utils.data_cleaning`` stage and the whole
+``clean_pipeline``.
+
+Each profile from ``benchmarks.datasets`` is written to CSV and loaded with
+``load_file``. The stages then run in pipeline order, so every stage is timed
+on the frame it really receives. Timings are the median of ``--repeat`` runs
+on fresh copies. Peak memory is the tracemalloc peak of one extra run.
+
+    python -m benchmarks.data_cleaning --save-baseline       # after an intended change
+    python -m benchmarks.data_cleaning --threshold 1.3      # exit 1 on regression
+
+The baseline is committed under benchmarks/baselines/. Running without one,
+or with a profile it does not cover, is an error rather than a silent pass.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from app.utils import data_cleaning as dc
+from benchmarks.datasets import PROFILES, get_profile, make_dataset
+
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "data_cleaning.json")
+# below this, differences are timer noise rather than regressions
+NOISE_FLOOR_MS = 2.0
+
+
+def _time(fn, make_input, repeat: int) -> tuple[float, float, object]:
+    runs, out = [], None
+    for _ in range(repeat):
+        arg = make_input()
+        start = time.perf_counter()
+        out = fn(arg)
+        runs.append((time.perf_counter() - start) * 1000)
+
+    arg = make_input()
+    tracemalloc.start()
+    fn(arg)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return statistics.median(runs), peak / 1024, out
+
+
+def bench_profile(name: str, *, repeat: int, seed: int, rows: int | None) -> dict:
+    profile = get_profile(name, **({"rows": rows} if rows else {}))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, f"{name}.csv")
+        make_dataset(profile, seed=seed).to_csv(path, index=False)
+
+        ms, kb, df = _time(dc.load_file, lambda: path, repeat)
+        results["load_file"] = {"ms": ms, "peak_kb": kb, "rows_out": len(df), "cols_out": df.shape[1]}
+
+        for stage, fn in dc.PIPELINE_STAGES:
+            ms, kb, out = _time(fn, df.copy, repeat)
+            results[stage] = {"ms": ms, "peak_kb": kb, "rows_out": len(out), "cols_out": out.shape[1]}
+            df = out
+
+        ms, kb, out = _time(dc.clean_pipeline, lambda: path, repeat)
+        results["clean_pipeline"] = {"ms": ms, "peak_kb": kb, "rows_out": len(out), "cols_out": out.shape[1]}
+    return results
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    regressions = []
+    for profile, stages in current.items():
+        for stage, stats in stages.items():
+            base = baseline.get(profile, {}).get(stage)
+            if not base:
+                continue
+            if stats["ms"] > base["ms"] * threshold and stats["ms"] - base["ms"] > NOISE_FLOOR_MS:
+                regressions.append(
+                    f"{profile}/{stage}: {stats['ms']:.1f} ms vs baseline {base['ms']:.1f} ms "
+                    f"(x{stats['ms'] / base['ms']:.2f})"
+                )
+            if stats["peak_kb"] > base["peak_kb"] * threshold and stats["peak_kb"] - base["peak_kb"] > 1024:
+                regressions.append(
+                    f"{profile}/{stage}: peak {stats['peak_kb']:.0f} KiB vs baseline {base['peak_kb']:.0f} KiB"
+                )
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["small", "wide", "numeric", "text_heavy", "missing_heavy"],
+                        choices=sorted(PROFILES))
+    parser.add_argument("--rows", type=int, help="override the row count of every profile")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", "--write-baseline", action="store_true", help="write results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.5, help="fail when a stage is this many times slower")
+    parser.add_argument("--json", dest="json_out", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name in args.profiles:
+        results[name] = bench_profile(name, repeat=args.repeat, seed=args.seed, rows=args.rows)
+        print(f"\n[{name}]")
+        print(f"  {'stage':<26}{'ms':>10}{'peak KiB':>12}{'rows':>9}{'cols':>6}")
+        for stage, stats in results[name].items():
+            print(f"  {stage:<26}{stats['ms']:>10.2f}{stats['peak_kb']:>12.0f}{stats['rows_out']:>9}{stats['cols_out']:>6}")
+
+    if args.json_out:
+        with open(args.json_out, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        baseline.update(results)
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline first")
+        return 2
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    missing = [name for name in results if name not in baseline]
+    if missing:
+        print(f"\nNo baseline for {', '.join(missing)} in {args.baseline}; run with --save-baseline first")
+        return 2
+    regressions = compare(results, baseline, args.threshold)
+    for line in regressions:
+        print("REGRESSION", line)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+"""
+Seeded synthetic datasets for the cleaning benchmarks.
+
+Each profile fixes the shape of a frame (rows, width, dtype mix, missingness,
+text length); the same profile and seed always produce the same frame.
+"""
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+import pandas as pd
+
+
+WORDS = (
+    "alpha beta gamma delta north south east west red green blue store online "
+    "retail premium basic order return refund  shipped pending  Ltd. Inc. & co"
+).split(" ")
+
+
+@dataclass(frozen=True)
+class DatasetProfile:
+    name: str
+    rows: int = 5_000
+    width: int = 12
+    # share of columns per kind; normalised, so only the ratios matter
+    dtype_mix: dict = field(default_factory=lambda: {
+        "float": 0.35, "int": 0.2, "category": 0.2, "text": 0.15, "datetime": 0.1,
+    })
+    missing_rate: float = 0.05  # fraction of cells set to NaN in columns that get missing values
+    missing_columns: float = 0.5  # fraction of columns that get missing values
+    duplicate_rate: float = 0.02
+    outlier_rate: float = 0.01
+    text_words: int = 4  # mean words per free-text cell
+    cardinality: int = 12  # distinct values per categorical column
+
+
+PROFILES = {
+    "small": DatasetProfile("small", rows=2_000),
+    "tall": DatasetProfile("tall", rows=50_000),
+    "wide": DatasetProfile("wide", rows=5_000, width=60),
+    "numeric": DatasetProfile("numeric", rows=20_000, dtype_mix={"float": 0.7, "int": 0.3}),
+    "text_heavy": DatasetProfile(
+        "text_heavy", rows=20_000, dtype_mix={"text": 0.6, "category": 0.3, "float": 0.1}, text_words=12,
+    ),
+    # moderate missingness exercises the KNN branch of handle_missing_data
+    "missing_heavy": DatasetProfile(
+        "missing_heavy", rows=400, missing_rate=0.3, missing_columns=0.8,
+        dtype_mix={"float": 0.6, "int": 0.2, "category": 0.2},
+    ),
+}
+
+
+def get_profile(name: str, **overrides) -> DatasetProfile:
+    return replace(PROFILES[name], **overrides) if overrides else PROFILES[name]
+
+
+def _column_kinds(profile: DatasetProfile, rng: np.random.Generator) -> list[str]:
+    kinds = list(profile.dtype_mix)
+    weights = np.array([profile.dtype_mix[k] for k in kinds], dtype=float)
+    counts = np.floor(weights / weights.sum() * profile.width).astype(int)
+    # hand out the rounding remainder to the largest shares
+    for i in np.argsort(-weights)[: profile.width - counts.sum()]:
+        counts[i] += 1
+    out = [k for k, n in zip(kinds, counts) for _ in range(n)]
+    rng.shuffle(out)
+    return out
+
+
+def _text(rng: np.random.Generator, rows: int, mean_words: int) -> np.ndarray:
+    lengths = np.maximum(1, rng.poisson(mean_words, rows))
+    words = rng.choice(WORDS, lengths.sum())
+    splits = np.cumsum(lengths)[:-1]
+    # leading/trailing blanks and mixed case exercise strip/title/regex cleanup
+    return np.array([" " + " ".join(chunk) + "  " for chunk in np.split(words, splits)], dtype=object)
+
+
+def make_dataset(profile: DatasetProfile | str, seed: int = 0) -> pd.DataFrame:
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    rng = np.random.default_rng(seed)
+    rows = profile.rows
+    data = {}
+    for i, kind in enumerate(_column_kinds(profile, rng)):
+        name = f"{kind.title()} Col {i}"
+        if kind == "float":
+            values = rng.lognormal(3, 1, rows)
+            outliers = rng.random(rows) < profile.outlier_rate
+            values[outliers] *= rng.choice([-50, 50], outliers.sum())
+            col = pd.Series(values.round(3))
+        elif kind == "int":
+            col = pd.Series(rng.integers(0, 1_000, rows), dtype="int64")
+        elif kind == "category":
+            levels = np.array([f" level {j} " if j % 3 else f"LEVEL {j}" for j in range(profile.cardinality)])
+            col = pd.Series(rng.choice(levels, rows), dtype=object)
+        elif kind == "text":
+            col = pd.Series(_text(rng, rows, profile.text_words))
+        elif kind == "datetime":
+            start = np.datetime64("2023-01-01")
+            col = pd.Series(start + rng.integers(0, 730, rows).astype("timedelta64[D]"))
+        else:
+            raise ValueError(f"Unknown column kind '{kind}'")
+
+        if rng.random() < profile.missing_columns and profile.missing_rate > 0:
+            # jitter the rate so columns land in different branches of the missing-data planner
+            rate = min(0.45, profile.missing_rate * rng.uniform(0.2, 1.4))
+            col = col.mask(rng.random(rows) < rate)
+        data[name] = col
+
+    df = pd.DataFrame(data)
+    n_dupes = int(rows * profile.duplicate_rate)
+    if n_dupes:
+        df = pd.concat([df, df.sample(n_dupes, random_state=seed)], ignore_index=True)
+    return df
@@ -0,0 +1,146 @@
+"""
+Latency of light users while one heavy user floods the analysis endpoint.
+
+Runs the app in-process (httpx ASGI transport) with the fake chat model. One
+user fires ``--heavy-requests`` dashboard requests with a large CSV at once;
+shortly after, ``--light-users`` other users send one small request each.
+Each mode is one run: "unlimited" lifts every scheduler limit (the old
+behaviour: everything runs at once and competes for the loop and the LLM),
+"fair" uses the scheduler limits given on the command line. Reports latency
+per class of user, 429s and how fast they came back.
+
+    python -m benchmarks.fair_scheduling
+    python -m benchmarks.fair_scheduling --heavy-requests 12 --heavy-rows 50000 --max-concurrent 2
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import types
+
+from benchmarks.load_test import configure_env, percentile, write_dataset
+
+
+MODES = ("unlimited", "fair")
+
+
+async def register(client, email: str) -> str:
+    creds = {"email": email, "password": "fair-password"}
+    await client.post("/api/auth/register", json={**creds, "full_name": email})
+    res = await client.post("/api/auth/login", data={"username": email, "password": creds["password"]})
+    res.raise_for_status()
+    return res.json()["access_token"]
+
+
+def configure_scheduler(mode: str, args) -> None:
+    from app.core.config import settings
+    from app.utils import scheduler
+
+    unlimited = mode == "unlimited"
+    settings.ANALYSIS_MAX_CONCURRENT = 10_000 if unlimited else args.max_concurrent
+    settings.ANALYSIS_MAX_CONCURRENT_PER_USER = 10_000 if unlimited else args.per_user
+    settings.ANALYSIS_MAX_QUEUED_PER_USER = 10_000 if unlimited else args.queued_per_user
+    settings.ANALYSIS_MAX_QUEUED_COST = float("inf") if unlimited else args.max_queued_cost
+    scheduler._scheduler = None  # rebuilt from settings on next use
+
+
+async def run_mode(client, mode: str, tokens: dict, heavy: bytes, light: bytes, args) -> dict:
+    configure_scheduler(mode, args)
+    results = []
+
+    async def one(kind: str, token: str, dataset: bytes, i: int):
+        start = time.perf_counter()
+        res = await client.post(
+            "/api/analysis/dashboard",
+            headers={"Authorization": f"Bearer {token}"},
+            data={"requirements": "Compare sales and profit across regions"},
+            files={"file": (f"{mode}_{kind}_{i}.csv", dataset, "text/csv")},
+        )
+        results.append((kind, res.status_code, time.perf_counter() - start))
+
+    async def lights():
+        await asyncio.sleep(args.light_delay)
+        await asyncio.gather(*(one("light", token, light, i) for i, token in enumerate(tokens["light"])))
+
+    await asyncio.gather(*(one("heavy", tokens["heavy"], heavy, i) for i in range(args.heavy_requests)), lights())
+
+    def ok(kind):
+        return [t for k, code, t in results if k == kind and code < 400]
+
+    rejected = [t for _, code, t in results if code == 429]
+    return {
+        "mode": mode,
+        "heavy_ok": len(ok("heavy")),
+        "heavy_p50_ms": percentile(ok("heavy"), 50) * 1000,
+        "light_ok": len(ok("light")),
+        "light_p50_ms": percentile(ok("light"), 50) * 1000,
+        "light_max_ms": max(ok("light"), default=0.0) * 1000,
+        "rejected": len(rejected),
+        "reject_max_ms": max(rejected, default=0.0) * 1000,
+        "errors": sum(code >= 400 and code != 429 for _, code, _ in results),
+    }
+
+
+async def main_async(args) -> list[dict]:
+    import httpx
+    from app.db.session import engine
+    from app.main import app
+    from benchmarks.load_test import prepare_database
+
+    await prepare_database()
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, rows in (("heavy", args.heavy_rows), ("light", args.light_rows)):
+            write_dataset(os.path.join(tmp, f"{name}.csv"), rows, args.seed)
+        with open(os.path.join(tmp, "heavy.csv"), "rb") as f:
+            heavy = f.read()
+        with open(os.path.join(tmp, "light.csv"), "rb") as f:
+            light = f.read()
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://fair", timeout=None) as client:
+            tokens = {
+                "heavy": await register(client, "heavy@example.com"),
+                "light": [await register(client, f"light{i}@example.com") for i in range(args.light_users)],
+            }
+            return [await run_mode(client, mode, tokens, heavy, light, args) for mode in args.modes]
+    finally:
+        await engine.dispose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--heavy-requests", type=int, default=10)
+    parser.add_argument("--heavy-rows", type=int, default=20_000)
+    parser.add_argument("--light-users", type=int, default=3)
+    parser.add_argument("--light-rows", type=int, default=200)
+    parser.add_argument("--light-delay", type=float, default=0.05, help="seconds after the heavy burst")
+    parser.add_argument("--llm-latency", default="fixed:0.5", help="fake LLM latency spec")
+    parser.add_argument("--max-concurrent", type=int, default=2)
+    parser.add_argument("--per-user", type=int, default=1)
+    parser.add_argument("--queued-per-user", type=int, default=4)
+    parser.add_argument("--max-queued-cost", type=float, default=64)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_env(types.SimpleNamespace(
+            database_url=f"sqlite+aiosqlite:///{os.path.join(tmp, 'fair.db')}",
+            llm_latency=args.llm_latency, seed=args.seed, db_pool_size=None, db_max_overflow=None,
+        ))
+        os.environ["DATASET_DIR"] = os.path.join(tmp, "datasets")
+        results = asyncio.run(main_async(args))
+
+    print(f"{'mode':>10} {'heavy ok':>9} {'heavy p50':>10} {'light ok':>9} {'light p50':>10} "
+          f"{'light max':>10} {'429s':>5} {'429 max ms':>11} {'err':>4}")
+    for r in results:
+        print(f"{r['mode']:>10} {r['heavy_ok']:>9} {r['heavy_p50_ms']:>10.1f} {r['light_ok']:>9} "
+              f"{r['light_p50_ms']:>10.1f} {r['light_max_ms']:>10.1f} {r['rejected']:>5} "
+              f"{r['reject_max_ms']:>11.1f} {r['errors']:>4}")
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
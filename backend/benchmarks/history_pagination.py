@@ -0,0 +1,166 @@
+"""
+Latency of the analysis history listing as a user's history grows.
+
+Seeds one user with N analyses (each with a dashboard carrying a realistic
+amount of generated code) among other users' rows, then times the first page
+and a page near the end of the history through TransactionService.list_history,
+next to the OFFSET query it replaces. Keyset pages should cost the same at any
+depth and any N; OFFSET pages grow with the depth.
+
+    python -m benchmarks.history_pagination
+    python -m benchmarks.history_pagination --sizes 1000 20000 --database-url postgresql+asyncpg://...
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+
+def configure_env(database_url: str) -> None:
+    os.environ["DATABASE_URL"] = database_url
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+
+
+async def seed(engine, user_id: int, rows: int, noise_users: int, code_bytes: int) -> None:
+    from sqlalchemy import insert
+    from app.models.analysis import Analysis_Dashboard, Analysis_Requirement
+    from app.models.blob import Content_Blob
+    from app.models.user import User
+
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    async with engine.begin() as conn:
+        await conn.execute(insert(User), [
+            {"id": uid, "email": f"user{uid}@example.com", "hashed_password": "-", "is_active": True,
+             "created_at": start}
+            for uid in range(user_id, user_id + noise_users + 1)
+        ])
+        owners = [user_id] * rows + [user_id + 1 + i % max(noise_users, 1) for i in range(rows * noise_users)]
+        requirements = [
+            {"user_id": owner, "file_name": f"data_{i}.csv", "file_path": f"/tmp/data_{i}.csv",
+             "user_query": "Compare sales across regions", "dataset_version": 1,
+             "uploaded_at": start + timedelta(minutes=i)}
+            for i, owner in enumerate(owners)
+        ]
+        ids = (await conn.execute(insert(Analysis_Requirement).returning(Analysis_Requirement.id), requirements)).scalars().all()
+        # distinct code per dashboard, so blob dedup does not shrink the table
+        blobs = [Content_Blob.from_text(f"# dashboard {i}\n" + "x" * code_bytes) for i in range(len(ids))]
+        await conn.execute(insert(Content_Blob.__table__), [
+            {c.name: getattr(blob, c.key) for c in Content_Blob.__table__.columns} for blob in blobs
+        ])
+        await conn.execute(insert(Analysis_Dashboard), [
+            {"requirement_id": rid, "user_id": owner, "dashboard_code_sha": blob.sha256,
+             "created_at": start + timedelta(minutes=i, seconds=30)}
+            for i, (rid, owner, blob) in enumerate(zip(ids, owners, blobs))
+        ])
+
+
+async def time_query(fn, repeat: int) -> float:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        await fn()
+        runs.append((time.perf_counter() - started) * 1000)
+    return statistics.median(runs)
+
+
+async def run_size(rows: int, args) -> dict:
+    from sqlalchemy import select
+    from app.db.session import Base, SessionLocal, engine
+    from app.models.analysis import Analysis_Dashboard, Analysis_Requirement
+    from app.models.blob import Content_Blob
+    from app.services.transaction import TransactionService
+    import app.models.user, app.models.token  # noqa: F401  register tables
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+    await seed(engine, user_id=1, rows=rows, noise_users=args.noise_users, code_bytes=args.code_bytes)
+
+    async with SessionLocal() as db:
+        service = TransactionService(db)
+        depth = max(0, rows - args.page_size * 2)
+
+        # the cursor a client would hold after paging down to `depth`
+        cursor_row = (await db.execute(
+            select(Analysis_Requirement.uploaded_at, Analysis_Requirement.id)
+            .where(Analysis_Requirement.user_id == 1)
+            .order_by(Analysis_Requirement.uploaded_at.desc(), Analysis_Requirement.id.desc())
+            .offset(depth).limit(1)
+        )).one()
+
+        async def keyset_first():
+            await service.list_history(user_id=1, limit=args.page_size)
+
+        async def keyset_deep():
+            await service.list_history(user_id=1, limit=args.page_size, before=tuple(cursor_row))
+
+        async def offset_deep():
+            # what a naive listing does: full rows, generated code included, OFFSET paging
+            stmt = (
+                select(Analysis_Requirement, Analysis_Dashboard, Content_Blob)
+                .outerjoin(Analysis_Dashboard, Analysis_Dashboard.requirement_id == Analysis_Requirement.id)
+                .outerjoin(Content_Blob, Content_Blob.sha256 == Analysis_Dashboard.dashboard_code_sha)
+                .where(Analysis_Requirement.user_id == 1)
+                .order_by(Analysis_Requirement.uploaded_at.desc(), Analysis_Requirement.id.desc())
+                .offset(depth).limit(args.page_size)
+            )
+            (await db.execute(stmt)).all()
+            db.expunge_all()
+
+        result = {
+            "rows": rows,
+            "keyset_first_ms": await time_query(keyset_first, args.repeat),
+            "keyset_deep_ms": await time_query(keyset_deep, args.repeat),
+            "offset_deep_ms": await time_query(offset_deep, args.repeat),
+        }
+
+        if engine.dialect.name == "sqlite":
+            from sqlalchemy import text
+            compiled = (
+                select(Analysis_Requirement.id)
+                .where(Analysis_Requirement.user_id == 1)
+                .order_by(Analysis_Requirement.uploaded_at.desc(), Analysis_Requirement.id.desc())
+                .limit(args.page_size)
+            ).compile(engine, compile_kwargs={"literal_binds": True})
+            plan = (await db.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))).all()
+            result["plan"] = "; ".join(row[-1] for row in plan)
+    return result
+
+
+async def main_async(args) -> list[dict]:
+    from app.db.session import engine
+
+    try:
+        return [await run_size(rows, args) for rows in args.sizes]
+    finally:
+        await engine.dispose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 20000])
+    parser.add_argument("--page-size", type=int, default=20)
+    parser.add_argument("--noise-users", type=int, default=2, help="other users, each with as many rows")
+    parser.add_argument("--code-bytes", type=int, default=20_000, help="size of each stored dashboard_code")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--database-url", default=None, help="defaults to a throwaway SQLite file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure_env(args.database_url or f"sqlite+aiosqlite:///{os.path.join(tmp, 'history.db')}")
+        results = asyncio.run(main_async(args))
+
+    print(f"{'rows':>8} {'keyset p1 ms':>13} {'keyset deep ms':>15} {'offset deep ms':>15}")
+    for r in results:
+        print(f"{r['rows']:>8} {r['keyset_first_ms']:>13.2f} {r['keyset_deep_ms']:>15.2f} {r['offset_deep_ms']:>15.2f}")
+    if "plan" in results[-1]:
+        print("plan:", results[-1]["plan"])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Event-loop lag during a burst of concurrent logins.
+
+Runs the app in-process (httpx ASGI transport) on a throwaway SQLite file,
+registers one user, then fires ``--logins`` logins ``--concurrency`` at a time
+while a probe requests ``GET /`` every 20 ms. Each mode in ``--workers`` is
+one run: 0 hashes inline on the event loop (the old behaviour), N > 0 uses the
+bcrypt thread pool. Reports login latency, probe latency and loop lag.
+
+    python -m benchmarks.login_burst
+    python -m benchmarks.login_burst --rounds 12 --logins 64 --concurrency 16 --workers 0 2 4
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+from benchmarks.load_test import LoopLagMonitor, percentile
+
+
+CREDS = {"email": "burst@example.com", "password": "burst-password"}
+
+
+async def probe(client, stop: asyncio.Event, interval: float, latencies: list[float]) -> None:
+    # measured from when the probe was due, so time spent waiting for a blocked loop counts
+    due = time.perf_counter()
+    while not stop.is_set():
+        await client.get("/")
+        latencies.append(time.perf_counter() - due)
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+
+
+async def run_mode(client, workers: int, args) -> dict:
+    from app.core import security
+    from app.core.config import settings
+
+    security.shutdown_password_hasher()
+    settings.PASSWORD_HASH_WORKERS = workers
+    settings.PASSWORD_HASH_MAX_PENDING = max(args.logins, 1)
+
+    logins, probes, statuses = [], [], []
+    sem = asyncio.Semaphore(args.concurrency)
+    monitor = LoopLagMonitor()
+    stop = asyncio.Event()
+
+    async def one():
+        async with sem:
+            start = time.perf_counter()
+            res = await client.post("/api/auth/login", data={"username": CREDS["email"], "password": CREDS["password"]})
+            logins.append(time.perf_counter() - start)
+            statuses.append(res.status_code)
+
+    monitor.start()
+    prober = asyncio.ensure_future(probe(client, stop, args.probe_interval, probes))
+    started = time.perf_counter()
+    await asyncio.gather(*(one() for _ in range(args.logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+    await monitor.stop()
+
+    return {
+        "workers": workers,
+        "errors": sum(code >= 400 for code in statuses),
+        "logins_per_s": args.logins / elapsed,
+        "login_p50_ms": percentile(logins, 50) * 1000,
+        "login_p95_ms": percentile(logins, 95) * 1000,
+        "probe_p50_ms": percentile(probes, 50) * 1000,
+        "probe_max_ms": max(probes, default=0.0) * 1000,
+        "lag_p99_ms": percentile(monitor.samples, 99) * 1000,
+        "lag_max_ms": max(monitor.samples, default=0.0) * 1000,
+        "hasher": security.password_hasher().stats(),
+    }
+
+
+async def main_async(args) -> list[dict]:
+    import httpx
+    from app.db.session import engine
+    from app.main import app
+    from benchmarks.load_test import prepare_database
+
+    await prepare_database()
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://burst", timeout=None) as client:
+            res = await client.post("/api/auth/register", json={**CREDS, "full_name": "Burst"})
+            res.raise_for_status()
+            return [await run_mode(client, workers, args) for workers in args.workers]
+    finally:
+        await engine.dispose()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_ROUNDS")
+    parser.add_argument("--logins", type=int, default=32)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--workers", type=int, nargs="+", default=[0, 4])
+    parser.add_argument("--probe-interval", type=float, default=0.02)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(tmp, 'burst.db')}"
+        os.environ.setdefault("JWT_SECRET_KEY", "login-burst")
+        os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+        results = asyncio.run(main_async(args))
+
+    print(f"{'workers':>7} {'err':>4} {'login/s':>8} {'login p50':>10} {'login p95':>10} "
+          f"{'probe p50':>10} {'probe max':>10} {'lag p99':>8} {'lag max':>8}")
+    for r in results:
+        print(f"{r['workers']:>7} {r['errors']:>4} {r['logins_per_s']:>8.1f} {r['login_p50_ms']:>10.1f} "
+              f"{r['login_p95_ms']:>10.1f} {r['probe_p50_ms']:>10.1f} {r['probe_max_ms']:>10.1f} "
+              f"{r['lag_p99_ms']:>8.1f} {r['lag_max_ms']:>8.1f}")
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""
+Accuracy and speed check for ``app.utils.sketches``.
+
+Every case is split into chunks, each chunk gets its own sketch, and the
+sketches are merged the way a chunked or distributed cleaning run would do it.
+The script checks that:
+
+- exact mode (small inputs) matches ``Series.quantile`` / ``Series.skew``,
+- the normalized rank error of the merged sketch stays within ``rank_error``,
+- merged moments give the same skew as pandas on the full column.
+
+tests/test_sketches.py asserts the same bounds at test-suite sizes; this
+script is for larger inputs and reports the speed against pandas as well.
+
+    python -m benchmarks.sketch_accuracy                  # exit 1 on violation
+    python -m benchmarks.sketch_accuracy --rows 2000000 --k 400
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.utils.sketches import ColumnSummary, QuantileSketch, merge_summaries
+
+
+QS = np.linspace(0.01, 0.99, 99)
+
+
+def _distributions(rows: int, rng: np.random.Generator) -> dict[str, np.ndarray]:
+    return {
+        "uniform": rng.uniform(size=rows),
+        "normal": rng.normal(size=rows),
+        "lognormal": rng.lognormal(sigma=1.5, size=rows),
+        "cauchy": rng.standard_cauchy(size=rows),
+        "sorted": np.sort(rng.normal(size=rows)),
+        "few_distinct": rng.integers(0, 20, size=rows).astype(float),
+    }
+
+
+def _max_rank_error(values: np.ndarray, estimates: np.ndarray) -> float:
+    ordered = np.sort(values)
+    lo = np.searchsorted(ordered, estimates, side="left") / ordered.size
+    hi = np.searchsorted(ordered, estimates, side="right") / ordered.size
+    # an estimate is perfect if the target rank falls anywhere in its tie run
+    err = np.where(QS < lo, lo - QS, np.where(QS > hi, QS - hi, 0.0))
+    return float(err.max())
+
+
+def _summarize(values: np.ndarray, chunks: int, k: int, exact_limit: int, seed: int) -> ColumnSummary:
+    parts = []
+    for i, chunk in enumerate(np.array_split(values, chunks)):
+        summary = ColumnSummary(QuantileSketch(k=k, exact_limit=exact_limit, seed=seed + i))
+        parts.append({"x": summary.update(chunk)})
+    return merge_summaries(*parts)["x"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--chunks", type=int, default=16)
+    parser.add_argument("--k", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    failures = []
+
+    # exact mode
+    for name, values in _distributions(5_000, rng).items():
+        summary = _summarize(values, 4, args.k, exact_limit=10_000, seed=args.seed)
+        series = pd.Series(values)
+        if not summary.sketch.exact or not np.allclose(summary.sketch.quantiles(QS), series.quantile(QS).to_numpy()):
+            failures.append(f"exact/{name}: quantiles differ from pandas")
+        if not np.isclose(summary.moments.skew, series.skew(), rtol=1e-9, atol=1e-12):
+            failures.append(f"exact/{name}: skew {summary.moments.skew} != {series.skew()}")
+
+    # approximate mode
+    print(f"{'case':<14}{'rank err':>10}{'bound':>10}{'skew err':>12}{'sketch ms':>11}{'exact ms':>10}")
+    for name, values in _distributions(args.rows, rng).items():
+        start = time.perf_counter()
+        summary = _summarize(values, args.chunks, args.k, exact_limit=10_000, seed=args.seed)
+        estimates = summary.sketch.quantiles(QS)
+        sketch_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        series = pd.Series(values)
+        series.quantile(QS)
+        exact_ms = (time.perf_counter() - start) * 1000
+
+        err = _max_rank_error(values, estimates)
+        bound = summary.sketch.rank_error
+        skew_err = abs(summary.moments.skew - series.skew()) / max(1.0, abs(series.skew()))
+        print(f"{name:<14}{err:>10.4f}{bound:>10.4f}{skew_err:>12.2e}{sketch_ms:>11.1f}{exact_ms:>10.1f}")
+        if err > bound:
+            failures.append(f"{name}: rank error {err:.4f} exceeds bound {bound:.4f}")
+        if skew_err > 1e-6:
+            failures.append(f"{name}: merged skew off by {skew_err:.2e}")
+
+    for failure in failures:
+        print("FAIL", failure)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
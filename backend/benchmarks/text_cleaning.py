@@ -0,0 +1,98 @@
+"""
+Benchmark of the fused Arrow text stage (``clean_strings``) against the
+object-dtype ``str`` chain it replaced (fix_inconsistent_values + clean_text).
+
+For each profile the frame is loaded from CSV as the pipeline would load it.
+Both implementations run on fresh copies and must produce the same strings.
+The script reports the median time, the tracemalloc peak (Python heap), the
+Arrow pool growth and the deep memory usage of the resulting text columns.
+
+    python -m benchmarks.text_cleaning
+    python -m benchmarks.text_cleaning --profiles text_heavy --rows 200000
+"""
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from app.utils import data_cleaning as dc
+from benchmarks.datasets import get_profile, make_dataset
+
+
+def legacy_text_stages(df: pd.DataFrame) -> pd.DataFrame:
+    for col in df.select_dtypes(include="object").columns:
+        df[col] = df[col].astype(str).str.strip().str.title()
+    for col in df.select_dtypes(include="object").columns:
+        df[col] = df[col].str.replace(r"[^a-zA-Z0-9\s]", "", regex=True)
+        df[col] = df[col].str.replace(r"\s+", " ", regex=True).str.strip()
+    return df
+
+
+def _measure(fn, df: pd.DataFrame, repeat: int) -> dict:
+    pa = dc._arrow_compute()
+    runs = []
+    for _ in range(repeat):
+        frame = df.copy()
+        start = time.perf_counter()
+        out = fn(frame)
+        runs.append((time.perf_counter() - start) * 1000)
+
+    out = frame = None  # drop the timed runs' results so the Arrow delta is this run only
+    frame = df.copy()
+    arrow_before = pa.total_allocated_bytes() if pa else 0
+    tracemalloc.start()
+    out = fn(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    arrow_after = pa.total_allocated_bytes() if pa else 0
+
+    text_cols = dc._text_columns(out)
+    return {
+        "ms": statistics.median(runs),
+        "py_peak_kb": peak / 1024,
+        "arrow_kb": (arrow_after - arrow_before) / 1024,
+        "result_kb": out[text_cols].memory_usage(deep=True, index=False).sum() / 1024,
+        "out": out,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--profiles", nargs="+", default=["text_heavy", "wide"])
+    parser.add_argument("--rows", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if dc._arrow_compute() is None:
+        print("pyarrow is not installed; clean_strings falls back to the pandas str chain")
+
+    ok = True
+    print(f"{'profile':<12}{'impl':<8}{'ms':>10}{'py peak KiB':>13}{'arrow KiB':>11}{'result KiB':>12}")
+    for name in args.profiles:
+        profile = get_profile(name, **({"rows": args.rows} if args.rows else {}))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, f"{name}.csv")
+            make_dataset(profile, seed=args.seed).to_csv(path, index=False)
+            df = dc.handle_missing_data(dc.load_file(path))
+
+        legacy = _measure(legacy_text_stages, df, args.repeat)
+        fused = _measure(dc.clean_strings, df, args.repeat)
+        for label, res in (("legacy", legacy), ("arrow", fused)):
+            print(f"{name:<12}{label:<8}{res['ms']:>10.1f}{res['py_peak_kb']:>13.0f}"
+                  f"{res['arrow_kb']:>11.0f}{res['result_kb']:>12.0f}")
+
+        for col in dc._text_columns(legacy["out"]):
+            if not legacy["out"][col].equals(fused["out"][col].astype(object)):
+                print(f"MISMATCH {name}.{col}")
+                ok = False
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,47 @@
+import asyncio
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read at import, so the environment is set before anything imports the app.
+# Tests always get their own throwaway database and the fake chat model, never the real ones.
+_tmp = tempfile.mkdtemp(prefix="autoviz-tests-")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(_tmp, 'test.db')}"
+os.environ["DATASET_DIR"] = os.path.join(_tmp, "datasets")
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret")
+os.environ["LLM_PROVIDER"] = "fake"
+os.environ["FAKE_LLM_LATENCY"] = "fixed:0"
+os.environ["FAKE_LLM_SEED"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+# run from backend/, like the app and the benchmarks
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def run():
+    """asyncio.run for app code; the engine's connections belong to that loop, so they are closed after."""
+    from app.db.session import engine
+
+    def run(coro):
+        async def main():
+            try:
+                return await coro
+            finally:
+                await engine.dispose()
+
+        return asyncio.run(main())
+
+    return run
+
+
+@pytest.fixture(autouse=True)
+def _fresh_auth_cache():
+    """Every test recreates the database, so user ids repeat; a cached user must not leak into the next test."""
+    from app.core import auth_cache
+
+    auth_cache.clear()
+    yield
+    auth_cache.clear()
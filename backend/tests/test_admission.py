@@ -0,0 +1,59 @@
+"""Requests turned away by the analysis scheduler must not leave their upload behind, nor take an earlier one."""
+import httpx
+import pytest
+
+from app.utils.scheduler import SchedulerSaturated
+from benchmarks.load_test import prepare_database, write_dataset
+
+
+class _Saturated:
+    def admit(self, user_id, cost, deadline=None):
+        raise SchedulerSaturated("Too many analyses queued", retry_after=2.5)
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # save_file writes under ./app/uploads
+    path = tmp_path / "sales.csv"
+    write_dataset(str(path), 50, seed=0)
+    return path.read_bytes()
+
+
+@pytest.mark.parametrize("endpoint", ["analyze", "dashboard"])
+def test_rejected_upload_is_removed(run, dataset, tmp_path, monkeypatch, endpoint):
+    from app.main import app
+    from app.routes import analysis
+
+    uploads = tmp_path / "app" / "uploads"
+    admitted = {}
+
+    async def scenario():
+        await prepare_database()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            creds = {"email": "admission@example.com", "password": "admission-password"}
+            await client.post("/api/auth/register", json={**creds, "full_name": "Admission"})
+            res = await client.post("/api/auth/login", data={"username": creds["email"], "password": creds["password"]})
+            res.raise_for_status()
+
+            async def submit():
+                return await client.post(
+                    f"/api/analysis/{endpoint}",
+                    headers={"Authorization": f"Bearer {res.json()['access_token']}"},
+                    data={"requirements": "Compare sales across regions"},
+                    files={"file": ("sales.csv", dataset, "text/csv")},
+                )
+
+            first = await submit()
+            assert first.status_code < 300, first.text
+            admitted["files"] = sorted(p for p in uploads.iterdir() if p.is_file())
+            # the same file name again, now turned away
+            monkeypatch.setattr(analysis, "analysis_scheduler", _Saturated)
+            return await submit()
+
+    res = run(scenario())
+
+    assert res.status_code == 429, res.text
+    assert res.headers["Retry-After"] == "3"
+    # only the rejected upload is gone; the admitted analysis keeps its input
+    assert len(admitted["files"]) == 1
+    assert sorted(p for p in uploads.iterdir() if p.is_file()) == admitted["files"]
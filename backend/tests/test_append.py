@@ -0,0 +1,106 @@
+"""Appending rows to an analysed dataset: cleaned with the fitted recipe, versioned, safe under concurrency."""
+import asyncio
+import io
+
+import httpx
+import pandas as pd
+import pytest
+
+from app.utils.cleaning_recipe import CleaningRecipe
+from benchmarks.load_test import prepare_database, write_dataset
+
+
+@pytest.fixture
+def csv(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # save_file writes under ./app/uploads
+
+    def csv(rows, seed, **changes):
+        path = tmp_path / f"batch_{seed}.csv"
+        write_dataset(str(path), rows, seed=seed)
+        df = pd.read_csv(path)
+        for col, factor in changes.items():
+            df[col] = df[col] * factor
+        return df.to_csv(index=False).encode()
+
+    return csv
+
+
+async def _analysed(client, dataset: bytes) -> tuple[dict, int]:
+    await prepare_database()
+    creds = {"email": "append@example.com", "password": "append-password"}
+    await client.post("/api/auth/register", json={**creds, "full_name": "Append"})
+    res = await client.post("/api/auth/login", data={"username": creds["email"], "password": creds["password"]})
+    auth = {"Authorization": f"Bearer {res.json()['access_token']}"}
+    res = await client.post(
+        "/api/analysis/dashboard",
+        headers=auth,
+        data={"requirements": "Compare sales across regions"},
+        files={"file": ("sales.csv", dataset, "text/csv")},
+    )
+    assert res.status_code == 200, res.text
+    return auth, res.json()["transaction_id"]
+
+
+def _append(client, auth, requirement_id, batch: bytes):
+    return client.post(
+        f"/api/analysis/{requirement_id}/append",
+        headers=auth,
+        files={"file": ("more.csv", batch, "text/csv")},
+    )
+
+
+def _client():
+    from app.main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_appended_rows_are_cleaned_with_the_fitted_recipe(run, csv, tmp_path):
+    from app.db.session import SessionLocal
+    from app.models.analysis import Analysis_Requirement
+
+    async def scenario():
+        async with _client() as client:
+            auth, requirement_id = await _analysed(client, csv(300, seed=0))
+            # every Sales value far above the fitted upper bound
+            drifted = await _append(client, auth, requirement_id, csv(200, seed=1, Sales=50))
+            appended = await _append(client, auth, requirement_id, csv(100, seed=2))
+            raw = await client.get(f"/api/analysis/dataset/{requirement_id}", params={"since_version": 1})
+            cleaned = await client.get(
+                f"/api/analysis/dataset/{requirement_id}", params={"since_version": 1, "cleaned": "true"}
+            )
+        async with SessionLocal() as db:
+            recipe = (await db.get(Analysis_Requirement, requirement_id)).cleaning_recipe
+        return drifted, appended, raw, cleaned, CleaningRecipe.from_dict(recipe)
+
+    drifted, appended, raw, cleaned, recipe = run(scenario())
+
+    assert drifted.status_code == 422 and "Sales" in drifted.json()["detail"]
+    assert appended.status_code == 201, appended.text
+    assert appended.json()["dataset_version"] == 2
+    assert appended.json()["rows_appended"] == 100
+    assert raw.headers["X-Dataset-Version"] == "2"
+    assert len(raw.json()) == 100
+    assert cleaned.status_code == 200, cleaned.text
+    rows = pd.read_json(io.StringIO(cleaned.text))
+    assert len(rows) == appended.json()["rows_cleaned"]
+    # column names normalised and values clipped to the bounds fitted on version 1
+    bounds = recipe.numeric["Sales"]
+    assert rows["sales"].between(bounds["lower"], bounds["upper"]).all()
+    # only the analysed upload is left; both appended batches were removed
+    assert [p.name.endswith("_sales.csv") for p in (tmp_path / "app" / "uploads").iterdir() if p.is_file()] == [True]
+
+
+def test_concurrent_appends_do_not_share_an_upload(run, csv):
+    async def scenario():
+        async with _client() as client:
+            auth, requirement_id = await _analysed(client, csv(300, seed=0))
+            batch = csv(100, seed=2)
+            return await asyncio.gather(*(_append(client, auth, requirement_id, batch) for _ in range(4)))
+
+    responses = run(scenario())
+
+    # each append either lands as its own version or loses the version race; never a 500
+    assert {r.status_code for r in responses} <= {201, 409}, [r.text for r in responses]
+    versions = sorted(r.json()["dataset_version"] for r in responses if r.status_code == 201)
+    assert versions == list(range(2, 2 + len(versions)))
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, update
+
+from app.models.blob import Content_Blob
+from benchmarks.load_test import prepare_database
+
+
+async def _age(db, *shas, hours=2):
+    await db.execute(
+        update(Content_Blob)
+        .where(Content_Blob.sha256.in_(shas))
+        .values(last_used_at=datetime.now(timezone.utc) - timedelta(hours=hours))
+    )
+    await db.commit()
+
+
+def test_purge_deletes_only_stale_unreferenced_blobs(run):
+    from app.db.session import SessionLocal
+    from app.models.analysis import Analysis_Dashboard, Analysis_Requirement
+    from app.models.user import User
+    from app.services.blob import BlobService
+
+    async def scenario():
+        await prepare_database()
+        kept, orphan, fresh_orphan, reused = (Content_Blob.from_text(f"code {i}") for i in range(4))
+        async with SessionLocal() as db:
+            user = User(email="blobs@example.com", hashed_password="x")
+            requirement = Analysis_Requirement(user=user, file_name="a.csv", file_path="a.csv", user_query="q")
+            db.add(Analysis_Dashboard(user=user, requirement=requirement, dashboard_code_sha=kept.sha256))
+            await BlobService(db).put(kept, orphan, fresh_orphan, reused)
+            await db.commit()
+            await _age(db, kept.sha256, orphan.sha256, reused.sha256)
+
+            # dedup hit: about to be referenced again, so it counts as used now
+            await BlobService(db).put(Content_Blob.from_text("code 3"))
+            await db.commit()
+
+            removed = await BlobService(db).purge_unreferenced(batch_size=1, grace_seconds=3600)
+            left = set((await db.execute(select(Content_Blob.sha256))).scalars())
+            return removed, left
+
+    removed, left = run(scenario())
+    texts = {Content_Blob.from_text(f"code {i}").sha256: i for i in range(4)}
+    assert removed == 1
+    assert {texts[sha] for sha in left} == {0, 2, 3}
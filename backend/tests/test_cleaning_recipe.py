@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+import pytest
+
+from app.utils import dataset_store
+from app.utils.cleaning_recipe import CleaningRecipe, RecipeNotApplicable, clean_with_recipe, transform
+
+
+def write_sales(path, rows=400, mean=1000.0, seed=0, missing_units=0.0):
+    rng = np.random.default_rng(seed)
+    units = rng.integers(1, 50, size=rows).astype(float)
+    units[rng.random(rows) < missing_units] = np.nan
+    pd.DataFrame({
+        "Region": rng.choice(["north", "south", None], size=rows),
+        "Sales": rng.normal(mean, 150, size=rows).round(2),
+        "Units": units,
+    }).to_csv(path, index=False)
+    return str(path)
+
+
+def test_recipe_is_reused_for_identical_bytes(tmp_path):
+    first = write_sales(tmp_path / "a.csv")
+    fitted_df, recipe, reused = clean_with_recipe(first)
+    assert not reused
+
+    again = write_sales(tmp_path / "b.csv")  # another upload of the same export
+    # through JSON, as it is stored on the requirement
+    df, reused_recipe, reused = clean_with_recipe(again, recipe=CleaningRecipe.from_dict(recipe.to_dict()))
+
+    assert reused
+    assert reused_recipe is not recipe and reused_recipe.numeric == recipe.numeric
+    pd.testing.assert_frame_equal(df, fitted_df)
+
+
+def test_changed_data_is_fitted_afresh(tmp_path):
+    _, recipe, _ = clean_with_recipe(write_sales(tmp_path / "a.csv"))
+    # same schema, new figures: the old IQR bounds would clip nearly all of them
+    changed = write_sales(tmp_path / "b.csv", mean=5000.0, seed=1)
+
+    df, new_recipe, reused = clean_with_recipe(changed, recipe=recipe)
+
+    assert not reused
+    assert new_recipe.source_digest != recipe.source_digest
+    assert new_recipe.numeric["Sales"]["lower"] > recipe.numeric["Sales"]["upper"]
+    fresh_df, fresh_recipe, _ = clean_with_recipe(changed)
+    assert new_recipe.numeric == fresh_recipe.numeric
+    pd.testing.assert_frame_equal(df, fresh_df)
+
+
+def test_new_rows_of_the_same_export_are_transformed(tmp_path):
+    # a quarter of Units is blank, which the fit imputes with KNN
+    _, recipe, _ = clean_with_recipe(write_sales(tmp_path / "a.csv", missing_units=0.25))
+    assert recipe.missing["strategies"]["Units"] == "knn"
+    more = write_sales(tmp_path / "b.csv", rows=300, seed=2, missing_units=0.25)
+
+    df, used, reused = clean_with_recipe(more, recipe=CleaningRecipe.from_dict(recipe.to_dict()))
+
+    assert reused and used.numeric == recipe.numeric
+    # no KNN over the new rows: their blanks get the median Units had at fit time
+    blank = pd.read_csv(more)["Units"].isna().to_numpy()
+    assert len(df) == len(blank)
+    assert (df["units"][blank] == recipe.missing["fill_values"]["Units"]).all()
+    # bounds are the fitted ones, not recomputed
+    assert df["sales"].between(recipe.numeric["Sales"]["lower"], recipe.numeric["Sales"]["upper"]).all()
+
+
+def test_transform_rejects_drifted_rows(tmp_path):
+    _, recipe, _ = clean_with_recipe(write_sales(tmp_path / "a.csv"))
+
+    small = dataset_store.raw_frame(write_sales(tmp_path / "small.csv", rows=5, seed=3, missing_units=0.4))
+    assert len(transform(small, recipe)) > 0  # a few blanks in a small batch are not drift
+
+    shifted = dataset_store.raw_frame(write_sales(tmp_path / "b.csv", mean=5000.0, seed=1))
+    with pytest.raises(RecipeNotApplicable, match="Sales"):
+        transform(shifted, recipe)
+    other = dataset_store.raw_frame(write_sales(tmp_path / "c.csv")).drop(columns=["Units"])
+    with pytest.raises(RecipeNotApplicable, match="columns"):
+        transform(other, recipe)
+
+
+def test_recipes_of_an_older_layout_are_not_reused(tmp_path):
+    path = write_sales(tmp_path / "a.csv")
+    _, recipe, _ = clean_with_recipe(path)
+    legacy = {**recipe.to_dict(), "version": 1, "source_digest": ""}
+
+    _, _, reused = clean_with_recipe(path, recipe=CleaningRecipe.from_dict(legacy))
+
+    assert not reused
@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils import data_cleaning as dc
+
+
+@pytest.fixture(params=["arrow", "pandas"])
+def text_backend(request, monkeypatch):
+    if request.param == "pandas":
+        monkeypatch.setattr(dc, "_arrow_compute", lambda: None)
+    elif dc._arrow_compute() is None:
+        pytest.skip("pyarrow not installed")
+    return request.param
+
+
+@pytest.mark.parametrize("values, first", [
+    (["  north  east ", None, "south-west", np.nan], "North East"),
+    (["north", 7, None, np.nan, pd.Timestamp("2024-01-02")], "North"),  # mixed object column
+])
+def test_clean_strings_keeps_missing_values_missing(text_backend, values, first):
+    df = pd.DataFrame({"region": pd.Series(values, dtype=object)})
+
+    out = dc.clean_strings(df.copy())["region"]
+
+    assert out.isna().tolist() == df["region"].isna().tolist()
+    assert not out.dropna().isin(["nan", "None", "Nan", "<NA>"]).any()
+    assert out.iloc[0] == first
+
+
+def test_hooks_are_finished_when_a_stage_raises(tmp_path):
+    import tracemalloc
+
+    path = tmp_path / "sales.csv"
+    pd.DataFrame({"sales": [1.0, 2.0, 3.0]}).to_csv(path, index=False)
+
+    class Spans(dc.StageSpans):
+        opened = []
+
+        def before_stage(self, name, df):
+            super().before_stage(name, df)
+            self.opened.append(self._open)
+
+    def broken(df):
+        raise ValueError("bad stage")
+
+    assert not tracemalloc.is_tracing()
+    profiler, spans = dc.StageProfiler(trace_memory=True), Spans()
+    with pytest.raises(ValueError):
+        dc.run_stages(str(path), [("optimize_memory", dc.optimize_memory), ("broken", broken)], [profiler, spans])
+
+    assert not tracemalloc.is_tracing()
+    assert [s.name for s in spans.opened] == ["cleaning.load_file", "cleaning.optimize_memory", "cleaning.broken"]
+    assert all(s.end_ns is not None for s in spans.opened)
+    assert spans.opened[-1].error == "ValueError: bad stage"
@@ -0,0 +1,19 @@
+import pytest
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.utils.deadline import request_timeout
+
+
+def _request(timeout: str | None) -> Request:
+    headers = [(b"x-request-timeout", timeout.encode())] if timeout is not None else []
+    return Request({"type": "http", "method": "POST", "path": "/", "headers": headers})
+
+
+@pytest.mark.parametrize("header", [None, "", "soon", "0", "-5", "nan", "inf", "-inf", "1e9"])
+def test_unusable_or_excessive_timeouts_get_the_configured_deadline(header):
+    assert request_timeout(_request(header)) == settings.REQUEST_DEADLINE_SECONDS
+
+
+def test_a_shorter_timeout_is_honoured():
+    assert request_timeout(_request("2.5")) == min(2.5, settings.REQUEST_DEADLINE_SECONDS)
@@ -0,0 +1,35 @@
+import threading
+
+from benchmarks.load_test import prepare_database
+
+
+def test_request_hash_runs_off_the_event_loop(run):
+    from app.db.session import SessionLocal
+    from app.models.user import User
+    from app.services.idempotency import IdempotencyService
+
+    loop_thread = threading.get_ident()
+    hashed_in = []
+
+    def request_hash():
+        hashed_in.append(threading.get_ident())
+        return "0" * 64
+
+    async def call():
+        return {"ok": True}
+
+    async def scenario():
+        await prepare_database()
+        async with SessionLocal() as db:
+            db.add(User(id=1, email="idem@example.com", full_name="Idem", hashed_password="x"))
+            await db.commit()
+            service = IdempotencyService(db)
+            first = await service.run(user_id=1, key="k", request_hash=request_hash, call=call)
+            again = await service.run(user_id=1, key="k", request_hash=request_hash, call=call)
+            return first, again
+
+    first, again = run(scenario())
+
+    assert first == {"ok": True}
+    assert again.headers["Idempotent-Replayed"] == "true"
+    assert len(hashed_in) == 2 and loop_thread not in hashed_in
@@ -0,0 +1,15 @@
+import math
+
+from app.core.metrics import Registry
+
+
+def test_histogram_ignores_non_finite_observations():
+    histogram = Registry().histogram("work_seconds", "Work.", ("stage",), buckets=(0.1, 1.0))
+
+    for value in (0.05, 0.5, 5.0, math.nan, math.inf, -math.inf):
+        histogram.observe(value, stage="clean")
+
+    assert histogram.count(stage="clean") == 3
+    lines = histogram.collect()
+    assert 'work_seconds_bucket{stage="clean",le="+Inf"} 3' in lines
+    assert 'work_seconds_sum{stage="clean"} 5.55' in lines
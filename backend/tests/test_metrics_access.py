@@ -0,0 +1,39 @@
+"""Capacity figures (/metrics, /api/system/*) are for admins and the scraper only."""
+import httpx
+
+from app.core.config import settings
+from benchmarks.load_test import prepare_database
+
+
+def test_metrics_need_an_admin_or_the_scrape_token(run, monkeypatch):
+    from app.main import app
+
+    monkeypatch.setattr(settings, "METRICS_TOKEN", "scrape-token")
+
+    async def scenario():
+        await prepare_database()
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            creds = {"email": "metrics@example.com", "password": "metrics-password"}
+            user = (await client.post("/api/auth/register", json={**creds, "full_name": "Metrics"})).json()
+            res = await client.post("/api/auth/login", data={"username": creds["email"], "password": creds["password"]})
+            as_user = {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+            async def status(path, headers=None):
+                return (await client.get(path, headers=headers)).status_code
+
+            before = [
+                await status("/metrics"),
+                await status("/metrics", {"Authorization": "Bearer wrong"}),
+                await status("/metrics", as_user),
+                await status("/metrics", {"Authorization": "Bearer scrape-token"}),
+                await status("/api/system/db-pool", {"Authorization": "Bearer scrape-token"}),
+            ]
+            monkeypatch.setattr(settings, "ADMIN_USER_IDS", [user["id"]])
+            after = [await status("/metrics", as_user), await status("/api/system/db-pool", as_user)]
+            return before, after
+
+    before, after = run(scenario())
+
+    # the scrape token opens /metrics only, not the /system endpoints
+    assert before == [401, 401, 403, 200, 401]
+    assert after == [200, 200]
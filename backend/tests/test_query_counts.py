@@ -0,0 +1,89 @@
+"""Database round trips per request on the analysis hot paths (see app.db.query_counter)."""
+import httpx
+import pytest
+
+from app.db import query_counter
+from app.db.query_counter import count_queries
+from benchmarks.load_test import prepare_database, write_dataset
+
+
+@pytest.fixture
+def dataset(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # save_file writes under ./app/uploads
+    path = tmp_path / "sales.csv"
+    write_dataset(str(path), 200, seed=0)
+    return path.read_bytes()
+
+
+def _client():
+    from app.db.session import engine
+    from app.main import app
+
+    query_counter.install(engine)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def _login(client) -> dict:
+    await prepare_database()
+    creds = {"email": "counts@example.com", "password": "counts-password"}
+    await client.post("/api/auth/register", json={**creds, "full_name": "Counts"})
+    res = await client.post("/api/auth/login", data={"username": creds["email"], "password": creds["password"]})
+    res.raise_for_status()
+    return {"Authorization": f"Bearer {res.json()['access_token']}"}
+
+
+def test_dashboard_round_trips(run, dataset):
+    async def scenario():
+        async with _client() as client:
+            auth = await _login(client)
+            counts = []
+            for _ in range(2):
+                with count_queries() as count:
+                    res = await client.post(
+                        "/api/analysis/dashboard",
+                        headers=auth,
+                        data={"requirements": "Compare sales across regions"},
+                        files={"file": ("sales.csv", dataset, "text/csv")},
+                    )
+                assert res.status_code == 200, res.text
+                counts.append(count)
+            return counts
+
+    first, second = run(scenario())
+
+    # user lookup, requirement insert, recipe lookup, recipe/version update,
+    # blob + dashboard inserts, in three short transactions; no refreshes or re-fetches
+    assert first.by_verb == {"SELECT": 2, "INSERT": 3, "UPDATE": 1}
+    assert first.commits == 3
+    # the token's user now comes from the auth cache
+    assert second.by_verb == {"SELECT": 1, "INSERT": 3, "UPDATE": 1}
+    assert second.commits == 3
+
+
+def test_history_round_trips(run, dataset):
+    async def scenario():
+        async with _client() as client:
+            auth = await _login(client)
+            for _ in range(3):
+                res = await client.post(
+                    "/api/analysis/dashboard",
+                    headers=auth,
+                    data={"requirements": "Compare sales across regions"},
+                    files={"file": ("sales.csv", dataset, "text/csv")},
+                )
+                assert res.status_code == 200, res.text
+            with count_queries() as page:
+                res = await client.get("/api/analysis/history", headers=auth, params={"limit": 2})
+            assert res.status_code == 200 and len(res.json()["items"]) == 2
+            with count_queries() as next_page:
+                res = await client.get(
+                    "/api/analysis/history", headers=auth, params={"limit": 2, "cursor": res.json()["next_cursor"]}
+                )
+            assert res.status_code == 200 and len(res.json()["items"]) == 1
+            return page, next_page
+
+    page, next_page = run(scenario())
+
+    # one aggregated SELECT per page, whatever the number of items; no N+1
+    assert page.by_verb == {"SELECT": 1}
+    assert next_page.by_verb == {"SELECT": 1}
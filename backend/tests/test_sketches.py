@@ -0,0 +1,93 @@
+"""Error bounds of app.utils.sketches; benchmarks/sketch_accuracy.py reports the same at larger sizes."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.utils.sketches import ColumnSummary, QuantileSketch, merge_summaries, summarize_chunks
+
+
+QS = np.linspace(0.01, 0.99, 99)
+SEED = 0
+RANK_ERROR = 0.015  # 3 / k for the default k=200
+
+
+def distributions(rows: int) -> dict[str, np.ndarray]:
+    rng = np.random.default_rng(SEED)
+    return {
+        "uniform": rng.uniform(size=rows),
+        "normal": rng.normal(size=rows),
+        "lognormal": rng.lognormal(sigma=1.5, size=rows),
+        "cauchy": rng.standard_cauchy(size=rows),
+        "sorted": np.sort(rng.normal(size=rows)),
+        "few_distinct": rng.integers(0, 20, size=rows).astype(float),
+    }
+
+
+def max_rank_error(values: np.ndarray, estimates: np.ndarray) -> float:
+    ordered = np.sort(values)
+    lo = np.searchsorted(ordered, estimates, side="left") / ordered.size
+    hi = np.searchsorted(ordered, estimates, side="right") / ordered.size
+    # an estimate is perfect if the target rank falls anywhere in its tie run
+    err = np.where(QS < lo, lo - QS, np.where(QS > hi, QS - hi, 0.0))
+    return float(err.max())
+
+
+def summarize(values: np.ndarray, chunks: int, exact_limit: int = 10_000) -> ColumnSummary:
+    parts = []
+    for i, chunk in enumerate(np.array_split(values, chunks)):
+        summary = ColumnSummary(QuantileSketch(k=200, exact_limit=exact_limit, seed=SEED + i))
+        parts.append({"x": summary.update(chunk)})
+    return merge_summaries(*parts)["x"]
+
+
+@pytest.mark.parametrize("name, values", distributions(5_000).items())
+def test_small_inputs_stay_exact_through_merge(name, values):
+    summary = summarize(values, chunks=4)
+    series = pd.Series(values)
+
+    assert summary.sketch.exact
+    assert summary.sketch.rank_error == 0.0
+    np.testing.assert_allclose(summary.sketch.quantiles(QS), series.quantile(QS).to_numpy())
+    assert summary.moments.skew == pytest.approx(series.skew(), rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize("name, values", distributions(200_000).items())
+def test_merged_sketch_rank_error(name, values):
+    summary = summarize(values, chunks=16)
+    series = pd.Series(values)
+
+    assert not summary.sketch.exact
+    assert summary.sketch.rank_error <= RANK_ERROR
+    assert max_rank_error(values, summary.sketch.quantiles(QS)) <= RANK_ERROR
+    # moments merge exactly whatever the sketch does
+    assert summary.moments.skew == pytest.approx(series.skew(), rel=1e-6, abs=1e-6)
+
+
+def test_merge_crossing_exact_limit_switches_to_sketch():
+    values = distributions(30_000)["normal"]
+    left = QuantileSketch(k=200, exact_limit=20_000, seed=SEED).update(values[:15_000])
+    right = QuantileSketch(k=200, exact_limit=20_000, seed=SEED + 1).update(values[15_000:])
+    assert left.exact and right.exact
+
+    merged = left.merge(right)
+
+    assert not merged.exact
+    assert merged.count == values.size
+    assert (merged.min, merged.max) == (values.min(), values.max())
+    assert max_rank_error(values, merged.quantiles(QS)) <= RANK_ERROR
+
+
+def test_summarize_chunks_matches_pandas_iqr_on_small_frames():
+    rng = np.random.default_rng(SEED)
+    df = pd.DataFrame({"a": rng.normal(size=3_000), "b": rng.integers(0, 50, size=3_000), "c": ["x"] * 3_000})
+    df.loc[::7, "a"] = np.nan
+
+    summaries = summarize_chunks(df.iloc[i:i + 600] for i in range(0, len(df), 600))
+
+    assert set(summaries) == {"a", "b"}
+    for col, summary in summaries.items():
+        q1, q3 = df[col].quantile([0.25, 0.75])
+        lower, upper = summary.iqr_bounds()
+        assert lower == pytest.approx(q1 - 1.5 * (q3 - q1))
+        assert upper == pytest.approx(q3 + 1.5 * (q3 - q1))
+        assert summary.median == pytest.approx(df[col].median())